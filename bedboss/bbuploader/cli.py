@@ -1,6 +1,10 @@
 import typer
 
 from bedboss._version import __version__
+from bedboss.bbuploader.constants import (
+    DEFAULT_PREFETCH_FILES,
+    DEFAULT_PREFETCH_MAX_SIZE,
+)
 
 app_bbuploader = typer.Typer(
     pretty_exceptions_short=False,
@@ -64,6 +68,15 @@ def upload_all(
     lite: bool = typer.Option(
         False, help="Run the pipeline in lite mode. [Default: False]"
     ),
+    prefetch: int = typer.Option(
+        DEFAULT_PREFETCH_FILES,
+        help="Number of files downloaded in background, while current file is processed. "
+        f"Used only with preload. [Default: {DEFAULT_PREFETCH_FILES}]",
+    ),
+    prefetch_max_size: int = typer.Option(
+        DEFAULT_PREFETCH_MAX_SIZE,
+        help="Maximum size of prefetched, not yet processed files (in bytes)",
+    ),
 ):
     from .main import upload_all as upload_all_function
 
@@ -87,6 +100,8 @@ def upload_all(
         overwrite=overwrite,
         overwrite_bedset=overwrite_bedset,
         lite=lite,
+        prefetch=prefetch,
+        prefetch_max_size=prefetch_max_size,
     )
 
 
@@ -131,6 +146,15 @@ def upload_gse(
     lite: bool = typer.Option(
         False, help="Run the pipeline in lite mode. [Default: False]"
     ),
+    prefetch: int = typer.Option(
+        DEFAULT_PREFETCH_FILES,
+        help="Number of files downloaded in background, while current file is processed. "
+        f"Used only with preload. [Default: {DEFAULT_PREFETCH_FILES}]",
+    ),
+    prefetch_max_size: int = typer.Option(
+        DEFAULT_PREFETCH_MAX_SIZE,
+        help="Maximum size of prefetched, not yet processed files (in bytes)",
+    ),
 ):
     from .main import upload_gse as upload_gse_function
 
@@ -150,6 +174,8 @@ def upload_gse(
         overwrite=overwrite,
         overwrite_bedset=overwrite_bedset,
         lite=lite,
+        prefetch=prefetch,
+        prefetch_max_size=prefetch_max_size,
     )
 
 
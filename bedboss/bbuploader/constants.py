@@ -11,3 +11,15 @@ class STATUS:
     PARTIAL = "PARTIAL"
     PROCESSING = "PROCESSING"
     SKIPPED = "SKIPPED"
+
+
+# number of GEO files that are downloaded in background, while current sample is processed
+DEFAULT_PREFETCH_FILES = 2
+# maximum size of prefetched files, that were not processed yet (in bytes)
+DEFAULT_PREFETCH_MAX_SIZE = 1024 * 1024 * 1024 * 5
+
+# processing statuses are committed to the database in batches:
+# after this number of status changes ...
+DEFAULT_STATUS_BATCH_SIZE = 50
+# ... or after this number of seconds since the last commit
+DEFAULT_STATUS_FLUSH_INTERVAL = 30
@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import Literal, Union
+from typing import List, Literal, Tuple, Union
 
 import peppy
 from bbconf import BedBaseAgent
@@ -14,6 +14,8 @@ from sqlalchemy.orm import Session
 
 from bedboss.bbuploader.constants import (
     DEFAULT_GEO_TAG,
+    DEFAULT_PREFETCH_FILES,
+    DEFAULT_PREFETCH_MAX_SIZE,
     FILE_FOLDER_NAME,
     PKG_NAME,
     STATUS,
@@ -23,6 +25,8 @@ from bedboss.bbuploader.models import (
     BedBossRequired,
     ProjectProcessingStatus,
 )
+from bedboss.bbuploader.prefetch import GeoFilePrefetcher, PrefetchItem
+from bedboss.bbuploader.status_writer import StatusWriter
 from bedboss.bbuploader.utils import create_gsm_sub_name
 from bedboss.bedboss import run_all
 from bedboss.bedbuncher.bedbuncher import run_bedbuncher
@@ -56,6 +60,8 @@ def upload_all(
     overwrite=False,
     overwrite_bedset=False,
     lite=False,
+    prefetch: int = DEFAULT_PREFETCH_FILES,
+    prefetch_max_size: int = DEFAULT_PREFETCH_MAX_SIZE,
 ):
     """
     This is main function that is responsible for processing bed files from PEPHub.
@@ -78,6 +84,8 @@ def upload_all(
         and failed files.
     :param reinit_skipper: reinitialize skipper, if set to True, skipper will be reinitialized and all logs files will be cleaned
     :param lite: lite mode, where skipping statistic processing for memory optimization and time saving
+    :param prefetch: number of files downloaded in background, while current file is processed (used with preload)
+    :param prefetch_max_size: maximum size of prefetched, not yet processed files in bytes
     """
 
     phc = PEPHubClient()
@@ -158,6 +166,8 @@ def upload_all(
                     overwrite=overwrite,
                     overwrite_bedset=overwrite_bedset,
                     lite=lite,
+                    prefetch=prefetch,
+                    prefetch_max_size=prefetch_max_size,
                 )
             except Exception as err:
                 _LOGGER.error(
@@ -290,6 +300,8 @@ def upload_gse(
     overwrite=False,
     overwrite_bedset=True,
     lite=False,
+    prefetch: int = DEFAULT_PREFETCH_FILES,
+    prefetch_max_size: int = DEFAULT_PREFETCH_MAX_SIZE,
 ):
     """
     Upload bed files from GEO series to BedBase
@@ -310,6 +322,8 @@ def upload_gse(
     :param overwrite: overwrite existing bedfiles
     :param overwrite_bedset: overwrite existing bedset
     :param lite: lite mode, where skipping statistic processing for memory optimization and time saving
+    :param prefetch: number of files downloaded in background, while current file is processed (used with preload)
+    :param prefetch_max_size: maximum size of prefetched, not yet processed files in bytes
 
     :return: None
     """
@@ -361,6 +375,8 @@ def upload_gse(
                 use_skipper=use_skipper,
                 reinit_skipper=reinit_skipper,
                 lite=lite,
+                prefetch=prefetch,
+                prefetch_max_size=prefetch_max_size,
             )
         except Exception as e:
             _LOGGER.error(f"Processing of '{gse}' failed with error: {e}")
@@ -414,6 +430,8 @@ def _upload_gse(
     reinit_skipper: bool = False,
     preload: bool = True,
     lite=False,
+    prefetch: int = DEFAULT_PREFETCH_FILES,
+    prefetch_max_size: int = DEFAULT_PREFETCH_MAX_SIZE,
 ) -> ProjectProcessingStatus:
     """
     Upload bed files from GEO series to BedBase
@@ -433,6 +451,9 @@ def _upload_gse(
     :param reinit_skipper: reinitialize skipper, if set to True, skipper will be reinitialized and all logs will be
     :param preload: pre - download files to the local folder (used for faster reproducibility)
     :param lite: lite mode, where skipping statistic processing for memory optimization and time saving
+    :param prefetch: number of files downloaded in background, while current file is processed (used with preload).
+        If 0, files are downloaded one by one right before processing.
+    :param prefetch_max_size: maximum size of prefetched, not yet processed files in bytes
     :return: None
     """
     if isinstance(bedbase_config, str):
@@ -449,11 +470,9 @@ def _upload_gse(
         project = pep_standardizer(project)
 
     project_status = ProjectProcessingStatus(number_of_samples=len(project.samples))
-    uploaded_files = []
+    status_writer = StatusWriter(sa_session)
     gse_status_sa_model.number_of_files = len(project.samples)
-    sa_session.commit()
-
-    total_sample_number = len(project.samples)
+    status_writer.mark()
 
     if use_skipper:
         skipper_obj = Skipper(output_path=outfolder, name=gse)
@@ -463,9 +482,173 @@ def _upload_gse(
     else:
         skipper_obj = None
 
+    # statistics are not precomputed in one R session (bedstat_batch) as in insert_pep:
+    # files are downloaded a few at a time by the prefetcher (within its size budget),
+    # and a batch over the whole series would need all of its files downloaded first
+    if preload and prefetch > 0:
+        prefetcher = GeoFilePrefetcher(
+            _get_prefetch_items(
+                project=project,
+                outfolder=outfolder,
+                genome=genome,
+                skipper_obj=skipper_obj,
+            ),
+            depth=prefetch,
+            max_size=prefetch_max_size,
+        )
+    else:
+        prefetcher = None
+
+    try:
+        with status_writer:
+            project_status, uploaded_files = _process_gse_samples(
+                project=project,
+                project_status=project_status,
+                bedbase_config=bedbase_config,
+                outfolder=outfolder,
+                genome=genome,
+                sa_session=sa_session,
+                status_writer=status_writer,
+                gse_status_sa_model=gse_status_sa_model,
+                skipper_obj=skipper_obj,
+                prefetcher=prefetcher,
+                gse=gse,
+                overwrite=overwrite,
+                preload=preload,
+                lite=lite,
+            )
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+    if create_bedset and uploaded_files:
+        _LOGGER.info(f"Creating bedset for: '{gse}'")
+        run_bedbuncher(
+            bedbase_config=bedbase_config,
+            record_id=gse,
+            bed_set=uploaded_files,
+            output_folder=os.path.join(outfolder, "outputs"),
+            name=gse,
+            description=project.description,
+            heavy=False,
+            upload_pephub=True,
+            upload_s3=True,
+            no_fail=True,
+            force_overwrite=overwrite_bedset,
+            lite=lite,
+        )
+
+    else:
+        _LOGGER.info(f"Skipping bedset creation for: '{gse}'")
+
+    _LOGGER.info(f"Processing of '{gse}' is finished with success!")
+    return project_status
+
+
+def _get_geo_file_path(outfolder: str, project_sample: peppy.Sample) -> str:
+    """
+    Get local path, where GEO file of the sample should be downloaded. (Creates gsm subfolder)
+
+    :param outfolder: working directory
+    :param project_sample: peppy sample with file url
+    :return: absolute path to the local file
+    """
+    sample_gsm = project_sample.get("sample_geo_accession", "").lower()
+    gsm_folder = create_gsm_sub_name(sample_gsm)
+    files_path = os.path.join(outfolder, FILE_FOLDER_NAME, gsm_folder)
+    os.makedirs(files_path, exist_ok=True)
+    return os.path.abspath(os.path.join(files_path, project_sample.file))
+
+
+def _get_geo_file_size(project_sample: peppy.Sample) -> int:
+    """
+    Get size of the GEO file of the sample, reported by GEO
+
+    :param project_sample: peppy sample
+    :return: size of the file in bytes, or 0 if it is unknown
+    """
+    try:
+        return int(project_sample.get("file_size") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _get_prefetch_items(
+    project: peppy.Project,
+    outfolder: str,
+    genome: str = None,
+    skipper_obj: Skipper = None,
+) -> List[PrefetchItem]:
+    """
+    Get list of files that should be downloaded for the project, in the processing order.
+    Samples that will be skipped (processed locally or with different genome) are excluded.
+
+    :param project: GEO project
+    :param outfolder: working directory
+    :param genome: reference genome, that will be processed. If None, all genomes will be processed
+    :param skipper_obj: skipper object
+    :return: list of files to prefetch
+    """
+    items = []
+    for counter, project_sample in enumerate(project.samples):
+        sample_gsm = project_sample.get("sample_geo_accession", "").lower()
+        if skipper_obj and skipper_obj.is_processed(sample_gsm):
+            continue
+        if genome and project_sample.get("ref_genome") != genome:
+            continue
+        items.append(
+            PrefetchItem(
+                key=str(counter),
+                url=project_sample.file_url,
+                path=_get_geo_file_path(outfolder, project_sample),
+                size=_get_geo_file_size(project_sample),
+            )
+        )
+    return items
+
+
+def _process_gse_samples(
+    project: peppy.Project,
+    project_status: ProjectProcessingStatus,
+    bedbase_config: BedBaseAgent,
+    outfolder: str,
+    genome: Union[str, None],
+    sa_session: Session,
+    status_writer: StatusWriter,
+    gse_status_sa_model: GeoGseStatus,
+    skipper_obj: Union[Skipper, None],
+    prefetcher: Union[GeoFilePrefetcher, None],
+    gse: str,
+    overwrite: bool = False,
+    preload: bool = True,
+    lite: bool = False,
+) -> Tuple[ProjectProcessingStatus, List[str]]:
+    """
+    Process all samples of the GEO project, and upload them to BedBase
+
+    :param project: GEO project
+    :param project_status: project processing status
+    :param bedbase_config: bbagent object
+    :param outfolder: working directory
+    :param genome: reference genome to upload to database. If None, all genomes will be processed
+    :param sa_session: opened session to the database
+    :param status_writer: batched writer of sample statuses
+    :param gse_status_sa_model: sqlalchemy model for project status
+    :param skipper_obj: skipper object, or None if skipper is not used
+    :param prefetcher: background downloader of the files, or None if files are downloaded one by one
+    :param gse: GEO series number
+    :param overwrite: overwrite existing bedfiles
+    :param preload: pre - download files to the local folder
+    :param lite: lite mode
+    :return: project processing status and list of uploaded bed file ids
+    """
+    uploaded_files = []
+    total_sample_number = len(project.samples)
+
     for counter, project_sample in enumerate(project.samples):
         _LOGGER.info(f">> Processing {counter+1} / {total_sample_number}")
         sample_gsm = project_sample.get("sample_geo_accession", "").lower()
+        sample_key = str(counter)
 
         # if int(project_sample.get("file_size") or 0) > 10000000:
         #     _LOGGER.info(f"Skipping: '{sample_gsm}' - file size is too big")
@@ -484,14 +667,16 @@ def _upload_gse(
             bed_sample=project_sample,
         )
 
-        sample_status = sa_session.scalar(
-            select(GeoGsmStatus).where(
-                and_(
-                    GeoGsmStatus.sample_name == required_metadata.sample_name,
-                    GeoGsmStatus.gse_status_id == gse_status_sa_model.id,
+        # pending status changes don't have to be sent to the database before this query
+        with sa_session.no_autoflush:
+            sample_status = sa_session.scalar(
+                select(GeoGsmStatus).where(
+                    and_(
+                        GeoGsmStatus.sample_name == required_metadata.sample_name,
+                        GeoGsmStatus.gse_status_id == gse_status_sa_model.id,
+                    )
                 )
             )
-        )
 
         if not sample_status:
             sample_status = GeoGsmStatus(
@@ -500,13 +685,14 @@ def _upload_gse(
                 gsm=sample_gsm,
                 status=STATUS.PROCESSING,
             )
-            sa_session.add(sample_status)
-            sa_session.commit()
+            status_writer.add(sample_status)
         else:
             if sample_status.status == STATUS.SUCCESS and not overwrite:
                 _LOGGER.info(
                     f"Skipping: '{required_metadata.sample_name}' - already processed"
                 )
+                if prefetcher:
+                    prefetcher.discard(sample_key)
                 uploaded_files.append(sample_status.bed_id)
                 project_status.number_of_processed += 1
                 continue
@@ -520,7 +706,7 @@ def _upload_gse(
                 )
                 sample_status.status = STATUS.SKIPPED
 
-                sa_session.commit()
+                status_writer.mark()
                 project_status.number_of_skipped += 1
 
                 continue
@@ -529,16 +715,18 @@ def _upload_gse(
             f"Processing global_sample_id: '{required_metadata.pep.global_sample_id}' file: '{required_metadata.sample_name}' gse: '{gse}'"
         )
         sample_status.status = STATUS.PROCESSING
-        sa_session.commit()
+        status_writer.mark()
 
         if preload:
-            gsm_folder = create_gsm_sub_name(sample_gsm)
-            files_path = os.path.join(outfolder, FILE_FOLDER_NAME, gsm_folder)
-            os.makedirs(files_path, exist_ok=True)
-            file_abs_path = os.path.abspath(
-                os.path.join(files_path, project_sample.file)
-            )
-            download_file(project_sample.file_url, file_abs_path, no_fail=True)
+            file_abs_path = prefetcher.get(sample_key) if prefetcher else None
+            if not file_abs_path:
+                file_abs_path = _get_geo_file_path(outfolder, project_sample)
+                download_file(
+                    project_sample.file_url,
+                    file_abs_path,
+                    no_fail=True,
+                    size=_get_geo_file_size(project_sample) or None,
+                )
         else:
             file_abs_path = required_metadata.file_path
 
@@ -587,27 +775,6 @@ def _upload_gse(
             if skipper_obj:
                 skipper_obj.add_failed(sample_gsm, f"Error: {str(exc)}")
 
-        sa_session.commit()
-
-    if create_bedset and uploaded_files:
-        _LOGGER.info(f"Creating bedset for: '{gse}'")
-        run_bedbuncher(
-            bedbase_config=bedbase_config,
-            record_id=gse,
-            bed_set=uploaded_files,
-            output_folder=os.path.join(outfolder, "outputs"),
-            name=gse,
-            description=project.description,
-            heavy=False,  # TODO: set to False because can't handle bedset > 10 files
-            upload_pephub=True,
-            upload_s3=True,
-            no_fail=True,
-            force_overwrite=overwrite_bedset,
-            lite=lite,
-        )
-
-    else:
-        _LOGGER.info(f"Skipping bedset creation for: '{gse}'")
+        status_writer.mark()
 
-    _LOGGER.info(f"Processing of '{gse}' is finished with success!")
-    return project_status
+    return project_status, uploaded_files
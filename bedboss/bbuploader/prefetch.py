@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Union
+
+from bedboss.bbuploader.constants import (
+    DEFAULT_PREFETCH_FILES,
+    DEFAULT_PREFETCH_MAX_SIZE,
+    PKG_NAME,
+)
+from bedboss.utils import download_file
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+
+class PrefetchItem(NamedTuple):
+    key: str
+    url: str
+    path: str
+    size: int = 0
+
+
+class GeoFilePrefetcher:
+    """
+    Bounded background downloader of GEO files.
+
+    Files are downloaded in the order they were provided, at most `depth` files ahead
+    of the file that is currently processed. Files that were downloaded, but not
+    consumed yet can't exceed `max_size` bytes (at least one file is always
+    downloaded, so processing can't get stuck on a big file).
+    """
+
+    def __init__(
+        self,
+        items: List[PrefetchItem],
+        depth: int = DEFAULT_PREFETCH_FILES,
+        max_size: int = DEFAULT_PREFETCH_MAX_SIZE,
+    ):
+        """
+        :param items: list of files to download, in processing order
+        :param depth: number of files that can be downloaded ahead
+        :param max_size: maximum size of downloaded, but not consumed files (in bytes)
+        """
+        self.depth = max(depth, 1)
+        self.max_size = max_size
+
+        self._queue: List[PrefetchItem] = list(items)
+        self._futures: Dict[str, Future] = {}
+        self._reserved: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.depth, thread_name_prefix="geo-prefetch"
+        )
+
+        self._schedule()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _schedule(self) -> None:
+        """
+        Start downloading next files, until depth or size budget is reached.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            while self._queue and len(self._futures) < self.depth:
+                item = self._queue[0]
+                reserved_size = sum(self._reserved.values())
+                if self._futures and reserved_size + item.size > self.max_size:
+                    break
+                self._queue.pop(0)
+                self._reserved[item.key] = item.size
+                self._futures[item.key] = self._executor.submit(self._download, item)
+
+    def _download(self, item: PrefetchItem) -> str:
+        """
+        Download one file and update size reservation with the real file size.
+        """
+        # size reported by GEO is verified by the downloader
+        download_file(item.url, item.path, no_fail=True, size=item.size or None)
+        if os.path.exists(item.path):
+            with self._lock:
+                if item.key in self._reserved:
+                    self._reserved[item.key] = os.path.getsize(item.path)
+        return item.path
+
+    def get(self, key: str) -> Union[str, None]:
+        """
+        Wait until the file is downloaded and mark it as consumed.
+
+        :param key: key of the file
+        :return: local path to the file, or None if key is unknown
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                # was not scheduled yet (e.g. size budget was reached), so download it now
+                item = next((k for k in self._queue if k.key == key), None)
+                if item is None:
+                    return None
+                self._queue.remove(item)
+                self._reserved[key] = item.size
+                future = self._executor.submit(self._download, item)
+                self._futures[key] = future
+
+        path = future.result()
+        self._release(key)
+        return path
+
+    def discard(self, key: str) -> None:
+        """
+        Mark file as not needed. If it wasn't scheduled yet, it won't be downloaded.
+
+        :param key: key of the file
+        """
+        with self._lock:
+            self._queue = [item for item in self._queue if item.key != key]
+            future = self._futures.get(key)
+        if future is not None:
+            future.add_done_callback(lambda _: self._release(key))
+
+    def _release(self, key: str) -> None:
+        """
+        Remove file from the prefetch budget and schedule next downloads.
+        """
+        with self._lock:
+            self._futures.pop(key, None)
+            self._reserved.pop(key, None)
+        self._schedule()
+
+    def close(self) -> None:
+        """
+        Cancel all scheduled downloads.
+        """
+        with self._lock:
+            self._closed = True
+            self._queue = []
+        self._executor.shutdown(wait=True, cancel_futures=True)
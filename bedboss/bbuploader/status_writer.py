@@ -0,0 +1,132 @@
+import atexit
+import logging
+import signal
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from bedboss.bbuploader.constants import (
+    DEFAULT_STATUS_BATCH_SIZE,
+    DEFAULT_STATUS_FLUSH_INTERVAL,
+    PKG_NAME,
+)
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# signals, that terminate the process by default. They are converted to SystemExit,
+# so pending statuses are flushed while the stack unwinds
+TERMINATION_SIGNALS = (signal.SIGTERM, signal.SIGHUP)
+
+
+class StatusWriter:
+    """
+    Batched writer of GEO processing statuses (GeoGsmStatus / GeoGseStatus).
+
+    Status changes are made on the SQLAlchemy objects as usual, but instead of
+    committing after every change, changes are registered in the writer and
+    committed in batches: every `batch_size` changes, when `flush_interval`
+    seconds passed since the last commit, and when the writer is closed.
+
+    Used as a context manager, pending changes are also committed if processing
+    fails with an exception, on SIGTERM/SIGHUP and at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        batch_size: int = DEFAULT_STATUS_BATCH_SIZE,
+        flush_interval: float = DEFAULT_STATUS_FLUSH_INTERVAL,
+    ):
+        """
+        :param session: opened session to the database
+        :param batch_size: maximum number of not committed status changes
+        :param flush_interval: maximum time (in seconds) between commits of status changes
+        """
+        self.session = session
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._previous_handlers = {}
+
+    def __enter__(self):
+        self._register_handlers()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.flush()
+        except Exception as err:
+            if exc_type is None:
+                raise
+            _LOGGER.error(f"Unable to save processing statuses: {err}")
+        finally:
+            self._unregister_handlers()
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of status changes that are not committed yet
+        """
+        return self._pending
+
+    def add(self, status_model) -> None:
+        """
+        Add new status object to the session
+
+        :param status_model: sqlalchemy status object (e.g. GeoGsmStatus)
+        """
+        self.session.add(status_model)
+        self.mark()
+
+    def mark(self) -> None:
+        """
+        Register status change and commit the batch if one of the thresholds is reached
+        """
+        self._pending += 1
+        if (
+            self._pending >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Commit all pending status changes
+        """
+        if self._pending:
+            _LOGGER.debug(f"Saving {self._pending} processing status changes")
+            self.session.commit()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _flush_at_exit(self) -> None:
+        try:
+            self.flush()
+        except Exception as err:
+            _LOGGER.error(f"Unable to save processing statuses at exit: {err}")
+
+    def _handle_signal(self, signum, frame):
+        _LOGGER.warning(
+            f"Received signal {signal.Signals(signum).name}, saving processing statuses."
+        )
+        raise SystemExit(128 + signum)
+
+    def _register_handlers(self) -> None:
+        atexit.register(self._flush_at_exit)
+        # signal handlers can be set only in the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in TERMINATION_SIGNALS:
+            if signal.getsignal(signum) == signal.SIG_DFL:
+                self._previous_handlers[signum] = signal.signal(
+                    signum, self._handle_signal
+                )
+
+    def _unregister_handlers(self) -> None:
+        atexit.unregister(self._flush_at_exit)
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        self._previous_handlers = {}
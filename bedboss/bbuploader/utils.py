@@ -1,8 +1,8 @@
 import logging
 import os
-import urllib.request
 
 from bedboss.bbuploader.constants import PKG_NAME
+from bedboss.downloader import get_downloader
 
 _LOGGER = logging.getLogger(PKG_NAME)
 
@@ -18,7 +18,7 @@ def download_file(file_url: str, local_file_path: str, force: bool = False) -> N
     """
     if force or not os.path.isfile(local_file_path):
         _LOGGER.info(f"Downloading file: '{file_url}' to: '{local_file_path}'")
-        urllib.request.urlretrieve(file_url, local_file_path)
+        get_downloader().download(file_url, local_file_path)
     else:
         _LOGGER.info(f"File {local_file_path} already exists. Skipping downloading.")
 
@@ -0,0 +1,177 @@
+import logging
+from hashlib import md5
+from pathlib import Path
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+
+from bedboss.const import PKG_NAME
+from bedboss.exceptions import BedBossException
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+GZIP_MAGIC_NUMBER = b"\x1f\x8b"
+MAX_SKIPPED_ROWS = 5
+
+
+class BedRegions:
+    """
+    Columnar, in-memory representation of a BED file.
+
+    The file is parsed once and regions are stored as NumPy arrays:
+    chromosome codes (index into chrom_names), starts and ends.
+    Remaining columns of the file are kept in the `extra` data frame.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        chrom_names: np.ndarray,
+        chrom_codes: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        extra: pd.DataFrame = None,
+    ):
+        """
+        :param path: path to the bed file
+        :param chrom_names: unique chromosome names, in order of first appearance
+        :param chrom_codes: index of the chromosome name of each region
+        :param starts: start positions of regions
+        :param ends: end positions of regions
+        :param extra: columns of the bed file after the third one
+        """
+        self.path = str(path)
+        self.chrom_names = chrom_names
+        self.chrom_codes = chrom_codes
+        self.starts = starts
+        self.ends = ends
+        self.extra = extra if extra is not None else pd.DataFrame(index=range(0))
+        self._identifier = None
+
+    @classmethod
+    def from_file(cls, bedfile: Union[str, Path]) -> "BedRegions":
+        """
+        Parse bed file (plain or gzipped). Up to 5 header rows are skipped.
+
+        :param bedfile: path to the bed file
+        :return: BedRegions object
+        :raises BedBossException: if the file can't be parsed
+        """
+        df = _read_bed(str(bedfile))
+
+        chrom_codes, chrom_names = pd.factorize(df[0].astype(str), sort=False)
+        extra = df.iloc[:, 3:].reset_index(drop=True)
+        extra.columns = range(3, 3 + len(extra.columns))
+
+        return cls(
+            path=bedfile,
+            chrom_names=np.asarray(chrom_names, dtype=object),
+            chrom_codes=chrom_codes.astype(np.int32),
+            starts=df[1].to_numpy(dtype=np.int64),
+            ends=df[2].to_numpy(dtype=np.int64),
+            extra=extra,
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __repr__(self) -> str:
+        return f"BedRegions({self.path}, n={len(self)})"
+
+    @property
+    def chroms(self) -> np.ndarray:
+        """
+        Chromosome name of each region
+        """
+        return self.chrom_names[self.chrom_codes]
+
+    @property
+    def widths(self) -> np.ndarray:
+        """
+        Width of each region
+        """
+        return self.ends - self.starts
+
+    @property
+    def identifier(self) -> str:
+        """
+        Digest of the bed file. Identical to geniml RegionSet(path).identifier
+        """
+        if self._identifier is None:
+            chrs = ",".join(self.chroms.tolist())
+            starts = ",".join(map(str, self.starts.tolist()))
+            ends = ",".join(map(str, self.ends.tolist()))
+
+            chr_digest = md5(chrs.encode("utf-8")).hexdigest()
+            start_digest = md5(starts.encode("utf-8")).hexdigest()
+            end_digest = md5(ends.encode("utf-8")).hexdigest()
+
+            self._identifier = md5(
+                ",".join([chr_digest, start_digest, end_digest]).encode("utf-8")
+            ).hexdigest()
+        return self._identifier
+
+    def chrom_max_ends(self) -> Dict[str, int]:
+        """
+        Max end position of regions for each chromosome
+
+        :return: dict where keys are chrom names and values are the max end position
+        """
+        max_ends = np.zeros(len(self.chrom_names), dtype=np.int64)
+        np.maximum.at(max_ends, self.chrom_codes, self.ends)
+        return {
+            chrom: int(max_end)
+            for chrom, max_end in zip(self.chrom_names.tolist(), max_ends.tolist())
+        }
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Data frame with all columns of the bed file (columns are numbered from 0)
+        """
+        df = pd.DataFrame({0: self.chroms, 1: self.starts, 2: self.ends})
+        return pd.concat([df, self.extra], axis=1)
+
+
+def _read_bed(bedfile: str) -> pd.DataFrame:
+    """
+    Read bed file into a data frame, skipping header rows if needed.
+    Rows are skipped the same way as in geniml RegionSet, so digests are the same.
+
+    :param bedfile: path to the bed file
+    :return: data frame with columns numbered from 0
+    """
+    with open(bedfile, "rb") as f:
+        compression = "gzip" if f.read(2) == GZIP_MAGIC_NUMBER else None
+
+    for skipped_rows in range(MAX_SKIPPED_ROWS + 1):
+        try:
+            df = pd.read_csv(
+                bedfile,
+                sep="\t",
+                header=None,
+                compression=compression,
+                skiprows=skipped_rows,
+            )
+        except (pd.errors.ParserError, pd.errors.EmptyDataError):
+            continue
+
+        df = df.dropna(axis=1)
+        if len(df.columns) < 3 or df.empty:
+            continue
+        try:
+            df[1] = pd.to_numeric(df[1])
+            df[2] = pd.to_numeric(df[2])
+        except (ValueError, TypeError):
+            continue
+        if not (
+            pd.api.types.is_integer_dtype(df[1])
+            and pd.api.types.is_integer_dtype(df[2])
+        ):
+            continue
+
+        if skipped_rows > 0:
+            _LOGGER.info(f"Skipped {skipped_rows} rows to parse bed file {bedfile}")
+        return df
+
+    raise BedBossException(f"Unable to parse bed file: {bedfile}")
@@ -1,17 +1,26 @@
-import datetime
 import logging
+import multiprocessing
 import os
 import subprocess
-from typing import Union
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import Deque, Dict, List, Tuple, Union
 
 import bbconf
 import pephubclient
 import peppy
 import pypiper
-import yaml
 from bbconf.bbagent import BedBaseAgent
 from bbconf.const import DEFAULT_LICENSE
 from bbconf.models.base_models import FileModel
+from bbconf.models.bed_models import BedMetadataBasic
 from eido import validate_project
 from geniml.bbclient import BBClient
 from pephubclient.helpers import MessageHandler as m
@@ -19,9 +28,21 @@ from pephubclient.helpers import is_registry_path
 
 from bedboss._version import __version__
 from bedboss.bedbuncher import run_bedbuncher
+from bedboss.bedbuncher.bedset_loader import fetch_bed
 from bedboss.bedmaker.bedmaker import make_all
-from bedboss.bedstat.bedstat import bedstat
-from bedboss.const import BEDBOSS_PEP_SCHEMA_PATH, PKG_NAME
+from bedboss.bedmaker.utils import get_genome_asset_digest
+from bedboss.bedstat.bedstat import bedstat, bedstat_batch
+from bedboss.bedstat.plot_renderer import resolve_plots
+from bedboss.bedstat.region_stats import calculate_region_stats
+from bedboss.checkpoint import Checkpoint
+from bedboss.const import (
+    BEDBOSS_PEP_SCHEMA_PATH,
+    PKG_NAME,
+    REPROCESS_CHECKPOINT_FILE,
+    REPROCESS_DOWNLOAD_WORKERS,
+    REPROCESS_PAGE_SIZE,
+    REPROCESS_STATS_BATCH_SIZE,
+)
 from bedboss.exceptions import BedBossException
 from bedboss.models import (
     BedClassificationUpload,
@@ -31,7 +52,15 @@ from bedboss.models import (
     StatsUpload,
 )
 from bedboss.refgenome_validator.main import ReferenceValidator
+from bedboss.refgenome_validator.models import CompatibilityConcise
 from bedboss.skipper import Skipper
+from bedboss.stage_cache import (
+    file_digest,
+    get_stage_cache,
+    plot_files,
+    stage_cache_key,
+)
+from bedboss.stage_runner import Stage, run_stages
 from bedboss.utils import calculate_time, get_genome_digest, standardize_genome_name
 from bedboss.utils import standardize_pep as pep_standardizer
 
@@ -77,6 +106,11 @@ def run_all(
     upload_s3: bool = False,
     upload_pephub: bool = False,
     lite: bool = False,
+    gc_workers: int = 1,
+    gc_approximate: bool = False,
+    stage_cache: bool = True,
+    sort_memory: int = None,
+    sort_temp_dir: str = None,
     # Universes
     universe: bool = False,
     universe_method: str = None,
@@ -110,6 +144,12 @@ def run_all(
     :param bool upload_s3: whether to upload to s3
     :param bool upload_pephub: whether to push bedfiles and metadata to pephub [Default: False]
     :param bool lite: whether to run lite version of the pipeline [Default: False]
+    :param int gc_workers: number of processes used to calculate GC content [Default: 1]
+    :param bool gc_approximate: estimate mean GC content from a sample of regions (large files only) [Default: False]
+    :param int sort_memory: memory limit (in bytes) for sorting the bed file before bigBed conversion [Default: 512 MB]
+    :param str sort_temp_dir: folder for temporary files created during sorting [Default: outfolder]
+    :param bool stage_cache: reuse results of stages (bigBed, statistics, reference validation)
+        calculated before for the same file, from any output folder [Default: True]
 
     :param bool universe: whether to add the sample as the universe [Default: False]
     :param str universe_method: method used to create the universe [Default: None]
@@ -142,6 +182,8 @@ def run_all(
     else:
         stop_pipeline = False
 
+    cache = get_stage_cache() if stage_cache else None
+
     bed_metadata = make_all(
         input_file=input_file,
         input_type=input_type,
@@ -153,31 +195,123 @@ def run_all(
         chrom_sizes=chrom_sizes,
         lite=lite,
         pm=pm,
+        stage_cache=cache,
+        sort_memory=sort_memory,
+        sort_temp_dir=sort_temp_dir,
     )
     if not other_metadata:
         other_metadata = {"sample_name": name}
 
+    # results of stages calculated before for this file (and the same parameters)
+    cache_keys = {}
+    cached_results = {}
+    if cache:
+        # input files are identified by content, and GC content by the refgenie fasta asset
+        fasta_digest = (
+            None if lite else get_genome_asset_digest(genome, rfg_config=rfg_config)
+        )
+        if fasta_digest:
+            cache_keys["bedstat"] = stage_cache_key(
+                bed_metadata.bed_digest,
+                "bedstat",
+                params=dict(
+                    genome=genome,
+                    fasta=fasta_digest,
+                    ensdb=file_digest(ensdb),
+                    open_signal_matrix=file_digest(open_signal_matrix),
+                    gc_approximate=gc_approximate,
+                ),
+            )
+        if validate_reference:
+            cache_keys["reference_validation"] = stage_cache_key(
+                bed_metadata.bed_digest, "reference_validation"
+            )
+        for stage_name, key in cache_keys.items():
+            result = cache.get(key, outfolder)
+            if result is not None:
+                cached_results[stage_name] = result
+        if "reference_validation" in cached_results:
+            cached_results["reference_validation"] = {
+                genome_name: CompatibilityConcise(**compatibility)
+                for genome_name, compatibility in cached_results[
+                    "reference_validation"
+                ].items()
+            }
+
+    # stages below depend only on the BED file, so they are executed concurrently
+    stages = []
     if lite:
-        statistics_dict = {}
-    else:
-        statistics_dict = bedstat(
-            bedfile=bed_metadata.bed_file,
-            outfolder=outfolder,
-            genome=genome,
-            ensdb=ensdb,
-            bed_digest=bed_metadata.bed_digest,
-            open_signal_matrix=open_signal_matrix,
-            just_db_commit=just_db_commit,
-            rfg_config=rfg_config,
-            pm=pm,
+        # basic statistics are cheap, so they are reported in lite mode too
+        stages.append(
+            Stage(
+                name="region_stats",
+                func=calculate_region_stats,
+                kwargs=dict(regions=bed_metadata.bed_regions or bed_metadata.bed_file),
+            )
+        )
+    elif "bedstat" not in cached_results:
+        stages.append(
+            Stage(
+                name="bedstat",
+                func=bedstat,
+                kwargs=dict(
+                    bedfile=bed_metadata.bed_regions or bed_metadata.bed_file,
+                    outfolder=outfolder,
+                    genome=genome,
+                    ensdb=ensdb,
+                    bed_digest=bed_metadata.bed_digest,
+                    open_signal_matrix=open_signal_matrix,
+                    just_db_commit=just_db_commit,
+                    rfg_config=rfg_config,
+                    pm=pm,
+                    gc_workers=gc_workers,
+                    gc_approximate=gc_approximate,
+                    defer_plots=True,
+                ),
+            )
+        )
+    if validate_reference and "reference_validation" not in cached_results:
+        _LOGGER.info("Validating reference genome")
+        stages.append(
+            Stage(
+                name="reference_validation",
+                func=ReferenceValidator().determine_compatibility,
+                kwargs=dict(
+                    bedfile=bed_metadata.bed_regions or bed_metadata.bed_file,
+                    concise=True,
+                ),
+            )
         )
+    if bed_metadata.bigbed_file:
+        stages.append(
+            Stage(
+                name="genome_digest", func=get_genome_digest, kwargs=dict(genome=genome)
+            )
+        )
+
+    stage_results, _ = run_stages(stages)
+
+    statistics_dict = (
+        stage_results.get("bedstat")
+        or cached_results.get("bedstat")
+        or stage_results.get("region_stats", {})
+    )
+    # plots are rendered in the background, wait for them before the upload
+    resolve_plots(statistics_dict)
+    for stage_name, key in cache_keys.items():
+        if stage_results.get(stage_name):
+            cache.put(
+                key,
+                stage_results[stage_name],
+                outfolder,
+                files=plot_files(stage_results[stage_name]),
+            )
+    stage_results.update(cached_results)
     statistics_dict["bed_type"] = bed_metadata.bed_type
     statistics_dict["bed_format"] = bed_metadata.bed_format.value
 
-    if bed_metadata.bigbed_file:
-        genome_digest = get_genome_digest(genome)
-    else:
-        genome_digest = None
+    genome_digest = stage_results.get("genome_digest")
+    ref_valid_stats = stage_results.get("reference_validation")
 
     stats = StatsUpload(**statistics_dict)
     plots = PlotsUpload(**statistics_dict)
@@ -209,14 +343,6 @@ def run_all(
         bed_format=bed_metadata.bed_format.value,
     )
 
-    if validate_reference:
-        _LOGGER.info("Validating reference genome")
-        ref_valid_stats = ReferenceValidator().determine_compatibility(
-            bedfile=bed_metadata.bed_file, concise=True
-        )
-    else:
-        ref_valid_stats = None
-
     if update:
         bbagent.bed.update(
             identifier=bed_metadata.bed_digest,
@@ -268,6 +394,58 @@ def run_all(
     return bed_metadata.bed_digest
 
 
+# BedBaseAgent of the current worker process (see _init_pep_worker)
+_WORKER_BBAGENT: Union[BedBaseAgent, None] = None
+
+
+def _init_pep_worker(bedbase_config: str) -> None:
+    """
+    Initialize worker process of insert_pep: create BedBaseAgent, that is shared by all samples
+    processed in this process
+
+    :param bedbase_config: bedbase configuration file path
+    :return: None
+    """
+    global _WORKER_BBAGENT
+    _WORKER_BBAGENT = BedBaseAgent(bedbase_config)
+
+
+def _run_pep_sample(
+    sample_kwargs: dict, output_folder: str
+) -> Tuple[str, Union[str, None], Union[str, None]]:
+    """
+    Run bedboss pipeline for one PEP sample inside a worker process.
+
+    Every worker writes pipeline logs to its own subfolder, so pypiper lock and flag files
+    of concurrent samples don't collide.
+
+    :param sample_kwargs: arguments of run_all function (without bedbase_config and pm)
+    :param output_folder: output folder of the pipeline
+    :return: tuple of (sample name, bed digest, error). Digest is None if processing failed.
+    """
+    sample_name = sample_kwargs["name"]
+    pm = pypiper.PipelineManager(
+        name=f"bedboss-worker-{os.getpid()}",
+        outfolder=os.path.join(
+            os.path.abspath(output_folder), "workers", f"worker_{os.getpid()}"
+        ),
+        version=__version__,
+        recover=True,
+        multi=True,
+    )
+    try:
+        bed_id = run_all(bedbase_config=_WORKER_BBAGENT, pm=pm, **sample_kwargs)
+    except BedBossException as e:
+        return sample_name, None, f"{e}"
+    except Exception as e:
+        # any failure of one sample is reported, so the other samples are still processed
+        _LOGGER.exception(f"Unexpected error while processing {sample_name}")
+        return sample_name, None, f"{type(e).__name__}: {e}"
+    finally:
+        pm.stop_pipeline()
+    return sample_name, bed_id, None
+
+
 @calculate_time
 def insert_pep(
     bedbase_config: str,
@@ -291,6 +469,10 @@ def insert_pep(
     standardize_pep: bool = False,
     lite: bool = False,
     rerun: bool = False,
+    workers: int = 1,
+    stats_workers: int = 1,
+    sort_memory: int = None,
+    sort_temp_dir: str = None,
     pm: pypiper.PipelineManager = None,
 ) -> None:
     """
@@ -320,12 +502,18 @@ def insert_pep(
     :param bool lite: whether to run lite version of the pipeline
     :param bool standardize_pep: whether to standardize the pep file before processing by using bedms. (default: False)
     :param bool rerun: whether to rerun processed samples
+    :param int workers: number of samples processed in parallel. Each worker process has its own
+        BedBaseAgent and PipelineManager (the provided pm is used only when workers == 1) [Default: 1]
+    :param int stats_workers: number of R workers used to calculate statistics of all bed samples
+        in one R session, before the samples are processed [Default: 1]
+    :param int sort_memory: memory limit (in bytes) for sorting each bed file before bigBed
+        conversion, used by every worker [Default: 512 MB]
+    :param str sort_temp_dir: folder for temporary files created during sorting [Default: output_folder]
     :param pypiper.PipelineManager pm: pypiper object
     :return: None
     """
 
     failed_samples = []
-    processed_ids = []
     if isinstance(pep, peppy.Project):
         pass
     elif isinstance(pep, str):
@@ -349,17 +537,17 @@ def insert_pep(
     if rerun:
         skipper.reinitialize()
 
+    sample_results = [None] * len(pep.samples)
+    tasks = []
     for i, pep_sample in enumerate(pep.samples):
         is_processed = skipper.is_processed(pep_sample.sample_name)
         if is_processed:
             m.print_success(
                 f"Skipping {pep_sample.sample_name} : {is_processed}. Already processed."
             )
-            processed_ids.append(is_processed)
+            sample_results[i] = is_processed
             continue
 
-        m.print_success(f"Processing sample {i + 1}/{len(pep.samples)}")
-        _LOGGER.info(f"Running bedboss pipeline for {pep_sample.sample_name}")
         if pep_sample.get("file_type"):
             if pep_sample.get("file_type").lower() == "narrowpeak":
                 is_narrow_peak = True
@@ -367,42 +555,112 @@ def insert_pep(
                 is_narrow_peak = False
         else:
             is_narrow_peak = False
-        try:
-            bed_id = run_all(
-                input_file=pep_sample.input_file,
-                input_type=pep_sample.input_type,
-                genome=pep_sample.genome,
-                name=pep_sample.sample_name,
-                bedbase_config=bbagent,
-                license_id=pep_sample.get("license_id") or license_id,
-                narrowpeak=is_narrow_peak,
-                chrom_sizes=pep_sample.get("chrom_sizes"),
-                open_signal_matrix=pep_sample.get("open_signal_matrix"),
-                other_metadata=pep_sample.to_dict(),
-                outfolder=output_folder,
-                rfg_config=rfg_config,
-                check_qc=check_qc,
+
+        tasks.append(
+            (
+                i,
+                pep_sample.sample_name,
+                dict(
+                    input_file=pep_sample.input_file,
+                    input_type=pep_sample.input_type,
+                    genome=pep_sample.genome,
+                    name=pep_sample.sample_name,
+                    license_id=pep_sample.get("license_id") or license_id,
+                    narrowpeak=is_narrow_peak,
+                    chrom_sizes=pep_sample.get("chrom_sizes"),
+                    open_signal_matrix=pep_sample.get("open_signal_matrix"),
+                    other_metadata=pep_sample.to_dict(),
+                    outfolder=output_folder,
+                    rfg_config=rfg_config,
+                    check_qc=check_qc,
+                    ensdb=ensdb,
+                    just_db_commit=just_db_commit,
+                    force_overwrite=force_overwrite,
+                    update=update,
+                    upload_qdrant=upload_qdrant,
+                    upload_s3=upload_s3,
+                    upload_pephub=upload_pephub,
+                    universe=pep_sample.get("universe"),
+                    universe_method=pep_sample.get("universe_method"),
+                    universe_bedset=pep_sample.get("universe_bedset"),
+                    lite=lite,
+                    sort_memory=sort_memory,
+                    sort_temp_dir=sort_temp_dir,
+                ),
+            )
+        )
+
+    if not lite:
+        # statistics of bed samples are calculated in one R session; samples of other
+        # input types are converted by bedmaker first, so their digests are not known yet
+        bed_tasks = [
+            sample_kwargs
+            for _, _, sample_kwargs in tasks
+            if sample_kwargs["input_type"] == "bed"
+            and sample_kwargs["input_file"]
+            and os.path.isfile(sample_kwargs["input_file"])
+        ]
+        if len(bed_tasks) > 1:
+            _LOGGER.info(f"Calculating statistics of {len(bed_tasks)} bed files")
+            _precompute_statistics(
+                bedfiles=[sample_kwargs["input_file"] for sample_kwargs in bed_tasks],
+                # the same genome names as run_all uses
+                genomes=[
+                    standardize_genome_name(sample_kwargs["genome"])
+                    for sample_kwargs in bed_tasks
+                ],
+                output_folder=output_folder,
+                stats_workers=stats_workers,
                 ensdb=ensdb,
-                just_db_commit=just_db_commit,
-                force_overwrite=force_overwrite,
-                update=update,
-                upload_qdrant=upload_qdrant,
-                upload_s3=upload_s3,
-                upload_pephub=upload_pephub,
-                universe=pep_sample.get("universe"),
-                universe_method=pep_sample.get("universe_method"),
-                universe_bedset=pep_sample.get("universe_bedset"),
-                lite=lite,
-                pm=pm,
             )
 
-            processed_ids.append(bed_id)
-            skipper.add_processed(pep_sample.sample_name, bed_id, success=True)
+    if workers > 1 and len(tasks) > 1:
+        _LOGGER.info(f"Processing {len(tasks)} samples with {workers} parallel workers")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pep_worker,
+            initargs=(bedbase_config,),
+        ) as executor:
+            futures = {
+                executor.submit(_run_pep_sample, sample_kwargs, output_folder): (
+                    task_index,
+                    sample_name,
+                )
+                for task_index, sample_name, sample_kwargs in tasks
+            }
+            for finished, future in enumerate(as_completed(futures), start=1):
+                task_index, sample_name = futures[future]
+                try:
+                    _, bed_id, error = future.result()
+                except Exception as e:
+                    # worker process died (e.g. BrokenProcessPool)
+                    bed_id, error = None, f"{type(e).__name__}: {e}"
+                m.print_success(f"Finished sample {finished}/{len(tasks)}")
+                if error is None:
+                    sample_results[task_index] = bed_id
+                    skipper.add_processed(sample_name, bed_id, success=True)
+                else:
+                    _LOGGER.error(f"Failed to process {sample_name}. See {error}")
+                    failed_samples.append(sample_name)
+                    skipper.add_failed(sample_name, error)
+    else:
+        for task_index, sample_name, sample_kwargs in tasks:
+            m.print_success(f"Processing sample {task_index + 1}/{len(pep.samples)}")
+            _LOGGER.info(f"Running bedboss pipeline for {sample_name}")
+            try:
+                bed_id = run_all(bedbase_config=bbagent, pm=pm, **sample_kwargs)
 
-        except BedBossException as e:
-            _LOGGER.error(f"Failed to process {pep_sample.sample_name}. See {e}")
-            failed_samples.append(pep_sample.sample_name)
-            skipper.add_failed(pep_sample.sample_name, f"{e}")
+                sample_results[task_index] = bed_id
+                skipper.add_processed(sample_name, bed_id, success=True)
+
+            except BedBossException as e:
+                _LOGGER.error(f"Failed to process {sample_name}. See {e}")
+                failed_samples.append(sample_name)
+                skipper.add_failed(sample_name, f"{e}")
+
+    # keep the order of the samples in the PEP, regardless of completion order
+    processed_ids = [bed_id for bed_id in sample_results if bed_id]
 
     if create_bedset:
         _LOGGER.info(f"Creating bedset from {pep.name}")
@@ -434,20 +692,138 @@ def insert_pep(
     return None
 
 
+def _reprocess_kwargs(
+    bed_annot: BedMetadataBasic, bed_path: str, output_folder: str
+) -> dict:
+    """
+    Arguments of run_all for reprocessing of a bed file that is already in the bedbase
+
+    :param bed_annot: bed metadata
+    :param bed_path: local path to the bed file
+    :param output_folder: output folder of the pipeline
+    :return: run_all keyword arguments (without bedbase_config and pm)
+    """
+    return dict(
+        input_file=bed_path,
+        input_type="bed",
+        outfolder=output_folder,
+        genome=bed_annot.genome_alias,
+        name=bed_annot.name,
+        license_id=bed_annot.license_id,
+        rfg_config=None,
+        check_qc=False,
+        validate_reference=True,
+        chrom_sizes=None,
+        open_signal_matrix=None,
+        ensdb=None,
+        other_metadata=None,
+        just_db_commit=False,
+        update=True,
+        upload_qdrant=True,
+        upload_s3=True,
+        upload_pephub=True,
+        lite=False,
+        universe=False,
+        universe_method=None,
+        universe_bedset=None,
+    )
+
+
+def _precompute_statistics(
+    bedfiles: List[str],
+    genomes: List[str],
+    output_folder: str,
+    stats_workers: int = 1,
+    bed_digests: List[str] = None,
+    ensdb: str = None,
+) -> None:
+    """
+    Calculate statistics of many bed files in one R session (bedstat_batch),
+    run_all then reuses them. Errors are logged, files are then processed one by one.
+
+    :param bedfiles: paths to the bed files
+    :param genomes: genome of each bed file
+    :param output_folder: output folder of the pipeline
+    :param stats_workers: number of R workers
+    :param bed_digests: digests of the bed files. Calculated if not provided
+    :param ensdb: path to the Ensembl annotation gtf file
+    """
+    if not bedfiles:
+        return
+    try:
+        bedstat_batch(
+            bedfiles=bedfiles,
+            genome=genomes,
+            outfolder=output_folder,
+            bed_digests=bed_digests,
+            ensdb=ensdb,
+            workers=stats_workers,
+            collect=False,
+        )
+    except Exception as e:
+        _LOGGER.warning(
+            f"Failed to calculate statistics in batch, files are processed one by one. See {e}"
+        )
+
+
+def _prefetch_statistics(
+    batch: List[Tuple[BedMetadataBasic, Future]],
+    output_folder: str,
+    stats_workers: int,
+) -> None:
+    """
+    Calculate statistics of all downloaded files of the batch in one R session
+
+    :param batch: list of bed metadata and download futures
+    :param output_folder: output folder of the pipeline
+    :param stats_workers: number of R workers
+    """
+    downloaded = []
+    for bed_annot, download in batch:
+        if download.exception() is None:
+            downloaded.append((bed_annot, download.result()))
+    _precompute_statistics(
+        bedfiles=[bed_path for _, bed_path in downloaded],
+        genomes=[bed_annot.genome_alias for bed_annot, _ in downloaded],
+        output_folder=output_folder,
+        stats_workers=stats_workers,
+        bed_digests=[bed_annot.id for bed_annot, _ in downloaded],
+    )
+
+
 @calculate_time
 def reprocess_all(
     bedbase_config: Union[str, BedBaseAgent],
     output_folder: str,
     limit: int = 10,
-    no_fail: bool = False,
+    no_fail: bool = True,
+    stats_workers: int = 1,
+    workers: int = 1,
+    page_size: int = REPROCESS_PAGE_SIZE,
+    checkpoint_file: str = None,
+    retry_failed: bool = False,
 ) -> None:
     """
     Run bedboss pipeline for all unprocessed beds in the bedbase
 
+    Unprocessed beds are requested from the database page by page, while earlier pages
+    are processed. Bed files of the next page are downloaded, and their statistics
+    calculated in small batches, while files of the previous page are processed.
+    Result of every bed is appended to the checkpoint file, and beds that are in the
+    checkpoint are skipped, so an interrupted run continues where it stopped.
+
     :param bedbase_config: bedbase configuration file path
     :param output_folder: output folder of the pipeline
-    :param limit: limit of the number of beds to process
-    :param no_fail: whether to raise an error if bedset was not added to the database
+    :param limit: limit of the number of beds to process (0: all unprocessed beds)
+    :param no_fail: whether to continue if processing of a bed fails (failed beds are
+        saved in the checkpoint). If False, raise an error on the first failed bed
+    :param stats_workers: number of R workers used to calculate statistics of one batch of beds
+    :param workers: number of beds processed at the same time (in separate processes).
+        Requires bedbase_config to be a path to the config file
+    :param page_size: number of unprocessed beds requested from the database at once
+    :param checkpoint_file: path to the checkpoint file
+        [Default: <output_folder>/reprocess_checkpoint.jsonl]
+    :param retry_failed: process beds that failed in the previous runs again
 
     :return: None
     """
@@ -459,68 +835,165 @@ def reprocess_all(
     else:
         raise BedBossException("Incorrect bedbase_config type. Exiting...")
 
-    unprocessed_beds = bbagent.bed.get_unprocessed(limit=limit)
+    if workers > 1 and not isinstance(bedbase_config, str):
+        _LOGGER.warning(
+            "Parallel processing requires path to the bedbase config. Processing beds one by one."
+        )
+        workers = 1
 
+    checkpoint = Checkpoint(
+        checkpoint_file or os.path.join(output_folder, REPROCESS_CHECKPOINT_FILE)
+    )
     bbclient = BBClient()
-    failed_samples = []
-    for bed_annot in unprocessed_beds.results:
-        bed_file = bbclient.load_bed(bed_annot.id)
-
-        try:
-            run_all(
-                input_file=bed_file.path,
-                input_type="bed",
-                outfolder=output_folder,
-                genome=bed_annot.genome_alias,
-                bedbase_config=bbagent,
-                name=bed_annot.name,
-                license_id=bed_annot.license_id,
-                rfg_config=None,
-                check_qc=False,
-                validate_reference=True,
-                chrom_sizes=None,
-                open_signal_matrix=None,
-                ensdb=None,
-                other_metadata=None,
-                just_db_commit=False,
-                update=True,
-                upload_qdrant=True,
-                upload_s3=True,
-                upload_pephub=True,
-                lite=False,
-                universe=False,
-                universe_method=None,
-                universe_bedset=None,
-                pm=None,
+    download_pool = ThreadPoolExecutor(
+        max_workers=REPROCESS_DOWNLOAD_WORKERS, thread_name_prefix="reprocess-download"
+    )
+    # statistics batches are calculated one after another, in the order of beds
+    stats_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reprocess-stats")
+    process_pool = None
+    if workers > 1:
+        process_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pep_worker,
+            initargs=(bedbase_config,),
+        )
+
+    seen = set()
+    # beds that were seen and are still unprocessed in the database (failed or skipped):
+    # unprocessed beds that were not seen yet start at this offset
+    unprocessed_offset = 0
+    # beds that are queued, with futures of downloads and statistics
+    queue: Deque[Tuple[BedMetadataBasic, Future, Future]] = deque()
+    running: Dict[Future, BedMetadataBasic] = {}
+    queued_count = 0
+    success_count = 0
+    failed_count = 0
+    exhausted = False
+
+    def finish(bed_annot: BedMetadataBasic, error: Union[str, None]) -> None:
+        nonlocal unprocessed_offset, success_count, failed_count
+        checkpoint.add(bed_annot.id, success=error is None, error=error)
+        if error is None:
+            success_count += 1
+            _LOGGER.info(f"Successfully processed {bed_annot.id}")
+            return
+        failed_count += 1
+        unprocessed_offset += 1
+        _LOGGER.error(f"Failed to process {bed_annot.name}. See {error}")
+        if not no_fail:
+            raise BedBossException(f"Failed to process {bed_annot.name}. See {error}")
+
+    def fill_queue() -> None:
+        nonlocal unprocessed_offset, queued_count, exhausted
+        while not exhausted and len(queue) < page_size:
+            if limit and queued_count >= limit:
+                exhausted = True
+                return
+            # queued beds are still unprocessed, running beds may be already processed:
+            # beds that were already seen can be returned again, but none is skipped
+            page = bbagent.bed.get_unprocessed(
+                limit=page_size, offset=unprocessed_offset + len(queue)
             )
-        except Exception as e:
-            _LOGGER.error(f"Failed to process {bed_annot.name}. See {e}")
-            if no_fail:
-                raise BedBossException(f"Failed to process {bed_annot.name}. See {e}")
-
-            failed_samples.append(
-                {
-                    "id": bed_annot.id,
-                    "error": e,
-                }
+            if not page.results:
+                exhausted = True
+                return
+            new_beds = [b for b in page.results if b.id not in seen]
+            if not new_beds:
+                if running:
+                    # wait until running beds are processed and leave the unprocessed list
+                    return
+                unprocessed_offset += len(page.results)
+                continue
+
+            page_items = []
+            for bed_annot in new_beds:
+                seen.add(bed_annot.id)
+                if checkpoint.is_done(bed_annot.id, retry_failed=retry_failed):
+                    unprocessed_offset += 1
+                    continue
+                if limit and queued_count >= limit:
+                    break
+                page_items.append(
+                    (
+                        bed_annot,
+                        download_pool.submit(fetch_bed, bbclient, bed_annot.id),
+                    )
+                )
+                queued_count += 1
+            if not page_items:
+                continue
+            # bed waits only for statistics of its batch, not of the whole page
+            batch_size = max(REPROCESS_STATS_BATCH_SIZE, stats_workers)
+            for start in range(0, len(page_items), batch_size):
+                batch = page_items[start : start + batch_size]
+                stats = stats_pool.submit(
+                    _prefetch_statistics, batch, output_folder, stats_workers
+                )
+                queue.extend(
+                    (bed_annot, download, stats) for bed_annot, download in batch
+                )
+            _LOGGER.info(
+                f"Queued {len(page_items)} beds ({page.count} unprocessed in the bedbase)"
             )
 
-    if failed_samples:
-        date_now = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        with open(
-            os.path.join(output_folder, f"failed_samples_{date_now}.yaml"), "w"
-        ) as file:
-            yaml.dump(failed_samples, file)
-
-            m.print_warning(f"Logs with failed samples are saved in {output_folder}")
-
-    m.print_success(f"Processing completed successfully")
+    try:
+        while True:
+            fill_queue()
+            if not queue and not running:
+                break
+
+            while queue and len(running) < workers:
+                bed_annot, download, stats = queue.popleft()
+                try:
+                    bed_path = download.result()
+                except Exception as e:
+                    finish(bed_annot, f"Unable to download bed file: {e}")
+                    continue
+                stats.result()
+                run_kwargs = _reprocess_kwargs(bed_annot, bed_path, output_folder)
+                m.print_success(f"Processing bed {success_count + failed_count + 1}")
+
+                if process_pool:
+                    future = process_pool.submit(
+                        _run_pep_sample, run_kwargs, output_folder
+                    )
+                else:
+                    future = Future()
+                    try:
+                        bed_id = run_all(bedbase_config=bbagent, pm=None, **run_kwargs)
+                        future.set_result((bed_annot.name, bed_id, None))
+                    except Exception as e:
+                        future.set_result((bed_annot.name, None, f"{e}"))
+                running[future] = bed_annot
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    bed_annot = running.pop(future)
+                    try:
+                        _, _, error = future.result()
+                    except Exception as e:
+                        error = f"{e}"
+                    finish(bed_annot, error)
+    finally:
+        download_pool.shutdown(wait=True, cancel_futures=True)
+        stats_pool.shutdown(wait=True, cancel_futures=True)
+        if process_pool:
+            process_pool.shutdown(wait=True, cancel_futures=True)
+
+    if failed_count:
+        m.print_error(f"Processing completed, {failed_count} beds failed")
+        m.print_warning(
+            f"Failed beds are saved in the checkpoint file: {checkpoint.file_path}"
+        )
+    else:
+        m.print_success(f"Processing completed successfully")
 
     print_values = dict(
-        unprocessed_files=unprocessed_beds.count,
-        processing_files=unprocessed_beds.limit,
-        failed_files=len(failed_samples),
-        success_files=unprocessed_beds.limit - len(failed_samples),
+        processing_files=success_count + failed_count,
+        failed_files=failed_count,
+        success_files=success_count,
     )
     print(print_values)
 
@@ -597,7 +1070,8 @@ def reprocess_bedset(
     :param bedbase_config: bedbase configuration file path
     :param output_folder: output folder of the pipeline
     :param identifier: bedset identifier
-    :param no_fail: whether to raise an error if bedset was not added to the database
+    :param no_fail: whether to skip the bedset without an error if it already exists
+        in the database
     :param heavy: whether to use heavy processing. Calculate plots for bedset
 
     :return: None
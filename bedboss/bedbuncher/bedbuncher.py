@@ -1,7 +1,5 @@
-import json
 import logging
 import os
-import subprocess
 from typing import List, Union
 
 import pephubclient
@@ -9,32 +7,18 @@ import peppy
 from bbconf import BedBaseAgent
 from bbconf.models.base_models import FileModel
 from bbconf.models.bedset_models import BedSetPlots
-from geniml.bbclient import BBClient
-from geniml.io import BedSet
 from pephubclient.helpers import is_registry_path
 
+from bedboss.bedbuncher.bedset_loader import load_bedset
+from bedboss.bedbuncher.commonality import calculate_region_commonality
+from bedboss.bedbuncher.plots import plot_region_commonality
+from bedboss.bedstat.plot_renderer import get_plot_renderer
+from bedboss.const import PLOT_RENDER_TIMEOUT
 from bedboss.exceptions import BedBossException
 
 _LOGGER = logging.getLogger("bedboss")
 
 
-def create_bed_list_file(bedset: BedSet, file_path: str) -> None:
-    """
-    Create a file with bed_set_list (Later this file is used in R script)
-
-    :param bedset: bed_set object
-    :param file_path: path to the file
-    :return: None
-    """
-    list_of_samples = [sample.path for sample in bedset]
-
-    with open(file_path, "w") as f:
-        for sample in list_of_samples:
-            f.write(sample + "\n")
-
-    return None
-
-
 def create_plots(
     bedset: List[str],
     output_folder: str,
@@ -46,46 +30,21 @@ def create_plots(
     :param output_folder: path to the output folder
     :return: dict with information about crated plots
     """
-    bbclient_obj = BBClient()
-
-    bed_set_object = BedSet()
-    for bed_id in bedset:
-        bed_set_object.add(bbclient_obj.load_bed(bed_id))
-
-    bedset_md5sum = bed_set_object.identifier
+    bedset_files = load_bedset(bedset)
 
     # if output folder doesn't exist create it
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
-    bedset_list_path = os.path.join(output_folder, f"{bedset_md5sum}_bedset.txt")
-    create_bed_list_file(bed_set_object, bedset_list_path)
-    rscript_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-        "bedbuncher",
-        "tools",
-        "bedsetStat.R",
-    )
-    assert os.path.exists(rscript_path), FileNotFoundError(
-        f"'{rscript_path}' script not found"
-    )
 
-    json_file_path = os.path.join(output_folder, bedset_md5sum + ".json")
-    command = (
-        f"Rscript {rscript_path} --outputfolder={output_folder} "
-        f"--bedfilelist={bedset_list_path} --id={bedset_md5sum} "
-        f"--json={json_file_path}"
+    commonality = calculate_region_commonality(bedset_files.regions)
+    # rendered in the plot rendering process, with non-interactive backend
+    plot_future = get_plot_renderer().submit(
+        plot_region_commonality, commonality, bedset_files.identifier, output_folder
     )
+    plot_value = plot_future.result(timeout=PLOT_RENDER_TIMEOUT)
 
-    subprocess.run(command, shell=True)
-
-    with open(json_file_path, "r", encoding="utf-8") as f:
-        bedset_summary_info = json.loads(f.read())
-
-    os.remove(bedset_list_path)
-    os.remove(json_file_path)
-
-    _LOGGER.info("Plots were created successfully and mediated files were removed")
-    return bedset_summary_info["plots"][0]
+    _LOGGER.info("Plots were created successfully")
+    return plot_value
 
 
 def run_bedbuncher(
@@ -114,7 +73,7 @@ def run_bedbuncher(
     :param description: Bedset description
     :param annotation: Bedset annotation (author, source)
     :param heavy: whether to use heavy processing (add all columns to the database).
-        if False -> R-script won't be executed, only basic statistics will be calculated
+        if False -> plots won't be created, only basic statistics will be calculated
     :param no_fail: whether to raise an error if bedset was not added to the database
     :param upload_pephub: whether to create a view in pephub
     :param upload_s3: whether to upload files to s3
@@ -187,7 +146,7 @@ def run_bedbuncher_form_pep(
     :param bedset_name: name of the bedset
     :param output_folder: path to the output folder
     :param heavy: whether to use heavy processing (add all columns to the database).
-        if False -> R-script won't be executed, only basic statistics will be calculated
+        if False -> plots won't be created, only basic statistics will be calculated
     :param upload_pephub: whether to create a view in pephub
     :param upload_s3: whether to upload files to s3
     :param no_fail: whether to raise an error if bedset was not added to the database
@@ -0,0 +1,188 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import suppress
+from hashlib import md5
+from typing import Dict, List, NamedTuple
+
+from geniml.bbclient import BBClient
+from geniml.bbclient.const import BEDFILE_URL_PATTERN
+from pybiocfilecache.exceptions import RnameExistsError
+from sqlalchemy.exc import SQLAlchemyError
+
+from bedboss.bed_regions import BedRegions
+from bedboss.const import (
+    BEDSET_DOWNLOAD_WORKERS,
+    BEDSET_PARSE_WORKERS,
+    DOWNLOAD_PART_SUFFIX,
+    PKG_NAME,
+)
+from bedboss.downloader import get_downloader
+from bedboss.exceptions import BedBossException
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# BiocFileCache registry of the bbclient cache is not safe to update from many threads
+_CACHE_LOCK = threading.Lock()
+
+
+class LoadedBedSet(NamedTuple):
+    """
+    Members of a bedset, downloaded to the bbclient cache
+    """
+
+    # md5 of the concatenated identifiers of bed files, in order of bed_ids
+    identifier: str
+    bed_ids: List[str]
+    # local paths of bed files, in order of bed_ids
+    paths: List[str]
+    # parsed regions of bed files (without extra columns), in order of bed_ids
+    regions: List[BedRegions]
+
+
+def fetch_bed(bbclient: BBClient, bed_id: str) -> str:
+    """
+    Download bed file to the bbclient cache, if it is not there yet.
+    File is written to a temporary path and renamed, so other processes
+    never see partial files.
+
+    :param bbclient: BBClient object
+    :param bed_id: bed file identifier
+    :return: path to the cached bed file
+    """
+    with suppress(FileNotFoundError):
+        return bbclient.seek(bed_id)
+
+    # BBClient.load_bed writes the cache file in place and parses it,
+    # so only the cache path of the file is taken from the client
+    file_path = bbclient._bedfile_path(bed_id)
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        get_downloader().download(
+            BEDFILE_URL_PATTERN.format(bedbase_api=bbclient.bedbase_api, bed_id=bed_id),
+            temp_path,
+        )
+        os.replace(temp_path, file_path)
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(temp_path + DOWNLOAD_PART_SUFFIX)
+
+    # file is already in the cache folder, the registry is only used for listing
+    with _CACHE_LOCK:
+        try:
+            bbclient._bedfile_cache.add(bed_id, fpath=file_path, action="asis")
+        except RnameExistsError:
+            # registered by another process in the meantime
+            pass
+        except (SQLAlchemyError, OSError) as err:
+            _LOGGER.warning(f"Unable to register {bed_id} in the bbclient cache: {err}")
+    _LOGGER.info(f"BED file {bed_id} was downloaded and cached successfully")
+    return file_path
+
+
+def _parse_bed(file_path: str) -> BedRegions:
+    """
+    Parse bed file and calculate its identifier (the same as geniml RegionSet.identifier).
+    Extra columns are dropped, so the regions are small to keep and to send between processes.
+
+    :param file_path: path to the bed file
+    :return: BedRegions with identifier
+    """
+    regions = BedRegions.from_file(file_path)
+    regions.extra = regions.extra.iloc[:, :0]
+    _ = regions.identifier
+    return regions
+
+
+def load_bedset(
+    bed_ids: List[str],
+    bbclient: BBClient = None,
+    download_workers: int = BEDSET_DOWNLOAD_WORKERS,
+    parse_workers: int = BEDSET_PARSE_WORKERS,
+) -> LoadedBedSet:
+    """
+    Download members of a bedset concurrently, parse them and calculate the bedset identifier.
+    Files are downloaded in threads and parsed in processes as soon as they arrive.
+    Identifier is updated incrementally, as soon as all preceding members are parsed.
+    Parsed regions are returned, so the members are not read again (e.g. by region commonality).
+
+    :param bed_ids: list of bed file identifiers
+    :param bbclient: BBClient object [Default: BBClient with the default cache folder]
+    :param download_workers: maximum number of files downloaded at the same time
+    :param parse_workers: number of processes parsing files (0 or 1: parse in this process)
+    :return: LoadedBedSet
+    :raises BedBossException: if any file can't be downloaded or parsed
+    """
+    bbclient = bbclient or BBClient()
+    paths: List[str] = [None] * len(bed_ids)
+    regions: List[BedRegions] = [None] * len(bed_ids)
+    bedset_md5 = md5()
+    parsed: Dict[int, str] = {}
+    next_index = 0
+
+    download_pool = ThreadPoolExecutor(
+        max_workers=max(download_workers, 1), thread_name_prefix="bedset-download"
+    )
+    parse_pool: Executor = None
+    if parse_workers > 1 and len(bed_ids) > 1:
+        # spawn: download threads are already running
+        parse_pool = ProcessPoolExecutor(
+            max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def add_regions(index: int, bed_regions: BedRegions) -> None:
+        nonlocal next_index
+        regions[index] = bed_regions
+        parsed[index] = bed_regions.identifier
+        while next_index in parsed:
+            bedset_md5.update(parsed.pop(next_index).encode())
+            next_index += 1
+
+    try:
+        downloads: Dict[Future, int] = {
+            download_pool.submit(fetch_bed, bbclient, bed_id): index
+            for index, bed_id in enumerate(bed_ids)
+        }
+        parses: Dict[Future, int] = {}
+        while downloads or parses:
+            done, _ = wait([*downloads, *parses], return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in parses:
+                    add_regions(parses.pop(future), future.result())
+                    continue
+                index = downloads.pop(future)
+                try:
+                    paths[index] = future.result()
+                except Exception as err:
+                    raise BedBossException(
+                        f"Unable to download bed file {bed_ids[index]}: {err}"
+                    )
+                if parse_pool:
+                    parses[parse_pool.submit(_parse_bed, paths[index])] = index
+                else:
+                    add_regions(index, _parse_bed(paths[index]))
+    except BedBossException:
+        raise
+    except Exception as err:
+        raise BedBossException(f"Unable to load bedset: {err}")
+    finally:
+        download_pool.shutdown(wait=True, cancel_futures=True)
+        if parse_pool:
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+
+    _LOGGER.info(f"Loaded {len(bed_ids)} bed files of the bedset")
+    return LoadedBedSet(
+        identifier=bedset_md5.hexdigest(),
+        bed_ids=list(bed_ids),
+        paths=paths,
+        regions=regions,
+    )
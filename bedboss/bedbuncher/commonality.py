@@ -0,0 +1,217 @@
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+
+import numpy as np
+
+from bedboss.bed_regions import BedRegions
+from bedboss.const import PKG_NAME
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# minimum number of intervals of added files merged into the universe at once
+UNIVERSE_BATCH_SIZE = 1_000_000
+
+
+def _merge_intervals(
+    starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge overlapping intervals (sharing at least one base) of one chromosome
+
+    :param starts: start positions
+    :param ends: end positions
+    :return: sorted, disjoint starts and ends
+    """
+    if not len(starts):
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    ends = ends[order]
+    max_ends = np.maximum.accumulate(ends)
+    is_first = np.empty(len(starts), dtype=bool)
+    is_first[0] = True
+    is_first[1:] = starts[1:] >= max_ends[:-1]
+    first = np.flatnonzero(is_first)
+    return starts[first], np.maximum.reduceat(ends, first)
+
+
+def _chrom_intervals(
+    regions: BedRegions,
+) -> Iterable[Tuple[str, np.ndarray, np.ndarray]]:
+    """
+    Intervals of each chromosome. Zero-width regions are widened to one base,
+    so they overlap the base they point to.
+
+    :param regions: BedRegions object
+    :return: iterator of chromosome names, starts and ends
+    """
+    ends = np.maximum(regions.ends, regions.starts + 1)
+    for code, chrom in enumerate(regions.chrom_names.tolist()):
+        indices = np.flatnonzero(regions.chrom_codes == code)
+        yield chrom, regions.starts[indices], ends[indices]
+
+
+class RegionUniverse:
+    """
+    Union of regions of all bed files of a bedset: sorted, disjoint intervals
+    of each chromosome. Files are merged in one at a time, so memory is proportional
+    to the merged universe, not to the number of regions in all files.
+    """
+
+    def __init__(self, batch_size: int = UNIVERSE_BATCH_SIZE):
+        """
+        :param batch_size: minimum number of pending intervals merged into the universe at once
+        """
+        self.batch_size = batch_size
+        self._intervals: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # intervals of added files, not merged into the universe yet
+        self._pending: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._pending_size = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        self._flush()
+        return self._size
+
+    @property
+    def intervals(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Dict of chromosome names and sorted, disjoint (starts, ends) arrays
+        """
+        self._flush()
+        return self._intervals
+
+    @property
+    def chrom_offsets(self) -> Dict[str, int]:
+        """
+        Index of the first interval of each chromosome, in order of chromosomes
+        """
+        offsets = {}
+        offset = 0
+        for chrom, (starts, _) in self.intervals.items():
+            offsets[chrom] = offset
+            offset += len(starts)
+        return offsets
+
+    def add(self, regions: BedRegions) -> None:
+        """
+        Merge regions of a bed file into the universe. Files are merged in batches
+        at least as large as the universe, so every interval is sorted a few times only.
+
+        :param regions: BedRegions object
+        """
+        for chrom, starts, ends in _chrom_intervals(regions):
+            starts, ends = _merge_intervals(starts, ends)
+            self._pending.setdefault(chrom, []).append((starts, ends))
+            self._pending_size += len(starts)
+        if self._pending_size >= max(self._size, self.batch_size):
+            self._flush()
+
+    def _flush(self) -> None:
+        """
+        Merge pending intervals into the universe
+        """
+        for chrom, pending in self._pending.items():
+            if chrom in self._intervals:
+                pending.append(self._intervals[chrom])
+            self._size -= len(self._intervals.get(chrom, ((),))[0])
+            self._intervals[chrom] = _merge_intervals(
+                np.concatenate([starts for starts, _ in pending]),
+                np.concatenate([ends for _, ends in pending]),
+            )
+            self._size += len(self._intervals[chrom][0])
+        self._pending = {}
+        self._pending_size = 0
+
+    def overlapped(self, regions: BedRegions) -> np.ndarray:
+        """
+        Universe intervals overlapped by regions of a bed file. Every region
+        is within exactly one universe interval, if the file was added to the universe.
+
+        :param regions: BedRegions object
+        :return: unique indices of universe intervals
+        """
+        offsets = self.chrom_offsets
+        indices = [np.zeros(0, dtype=np.int64)]
+        for chrom, starts, ends in _chrom_intervals(regions):
+            if chrom not in self.intervals:
+                continue
+            universe_starts, universe_ends = self.intervals[chrom]
+            # merged regions are sorted, which keeps the binary search cache friendly,
+            # and so are the found intervals
+            starts, _ = _merge_intervals(starts, ends)
+            found = np.searchsorted(universe_starts, starts, side="right") - 1
+            found = found[(found >= 0) & (universe_ends[found.clip(min=0)] > starts)]
+            found = found[np.diff(found, prepend=-1) != 0]
+            indices.append(offsets[chrom] + found)
+        return np.concatenate(indices)
+
+
+class RegionCommonality(NamedTuple):
+    """
+    Overlaps of bed files of a bedset with the universe (union of all regions)
+    """
+
+    universe_size: int
+    # number of universe intervals overlapped by each file, in order of files
+    file_overlaps: np.ndarray
+    # number of files overlapping each universe interval
+    coverage: np.ndarray
+
+    @property
+    def percentages(self) -> np.ndarray:
+        """
+        Percentage of universe intervals overlapped by each file
+        """
+        if not self.universe_size:
+            return np.zeros(len(self.file_overlaps))
+        return self.file_overlaps / self.universe_size * 100
+
+    def curve(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Region commonality curve: for each observed percentage (and 0),
+        number of files overlapping at least this percentage of the universe
+
+        :return: sorted percentages and file counts
+        """
+        percentages = np.sort(self.percentages)
+        x = np.unique(np.concatenate([[0.0], percentages]))
+        counts = len(percentages) - np.searchsorted(percentages, x, side="left")
+        return x, counts
+
+
+def calculate_region_commonality(
+    bedfiles: List[Union[str, BedRegions]]
+) -> RegionCommonality:
+    """
+    Calculate region commonality of a bedset in two passes over the files:
+    merge all files into the universe, then count overlaps of each file with it.
+    Paths are read in each pass, so only one file is kept in memory at a time;
+    already parsed BedRegions (e.g. from load_bedset) are used as they are.
+
+    :param bedfiles: paths to bed files or BedRegions objects
+    :return: RegionCommonality
+    """
+
+    def load(bedfile: Union[str, BedRegions]) -> BedRegions:
+        if isinstance(bedfile, BedRegions):
+            return bedfile
+        return BedRegions.from_file(bedfile)
+
+    universe = RegionUniverse()
+    for bedfile in bedfiles:
+        universe.add(load(bedfile))
+    _LOGGER.info(f"Region universe of {len(bedfiles)} files: {len(universe)} intervals")
+
+    file_overlaps = np.zeros(len(bedfiles), dtype=np.int64)
+    coverage = np.zeros(len(universe), dtype=np.int32)
+    for index, bedfile in enumerate(bedfiles):
+        overlapped = universe.overlapped(load(bedfile))
+        file_overlaps[index] = len(overlapped)
+        coverage[overlapped] += 1
+
+    return RegionCommonality(
+        universe_size=len(universe),
+        file_overlaps=file_overlaps,
+        coverage=coverage,
+    )
@@ -0,0 +1,47 @@
+import os
+
+import matplotlib.pyplot as plt
+
+from bedboss.bedbuncher.commonality import RegionCommonality
+from bedboss.bedstat.plots import FIGURE_SIZE
+
+
+def plot_region_commonality(
+    commonality: RegionCommonality, bedset_id: str, outfolder: str
+) -> dict:
+    """
+    Plot region commonality: number of bed files overlapping at least
+    a percentage of the universe.
+    Paths in the returned dict are relative to the output folder.
+
+    :param commonality: RegionCommonality
+    :param bedset_id: bedset ID (digest)
+    :param outfolder: output folder
+    :return: plot dict (name, title, thumbnail_path, path)
+    """
+    percentages, counts = commonality.curve()
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    ax.plot(percentages, counts, "o", color="black", markersize=4)
+    ax.plot(percentages, counts, linestyle="dotted", linewidth=0.5, color="black")
+    ax.set_xlim(0, 100)
+    ax.set_ylim(0, max(100, len(commonality.file_overlaps)))
+    ax.set_box_aspect(1)
+    ax.set_xlabel("Percentage of regions in universe (BED set) covered")
+    ax.set_ylabel("Regionset (BED file) count")
+    ax.set_title("Region commonality")
+    fig.tight_layout()
+
+    plot_id = "region_commonality"
+    path = os.path.join(outfolder, f"{bedset_id}_{plot_id}")
+    try:
+        fig.savefig(f"{path}.png")
+        fig.savefig(f"{path}.pdf")
+    finally:
+        plt.close(fig)
+
+    return {
+        "name": plot_id,
+        "title": "BED region commonality in BED set",
+        "thumbnail_path": f"{bedset_id}_{plot_id}.png",
+        "path": f"{bedset_id}_{plot_id}.pdf",
+    }
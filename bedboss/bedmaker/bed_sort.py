@@ -0,0 +1,191 @@
+import gzip
+import heapq
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from bedboss.bedmaker.const import DEFAULT_SORT_MEMORY
+from bedboss.exceptions import BedBossException
+
+_LOGGER = logging.getLogger("bedboss")
+
+GZIP_MAGIC_NUMBER = b"\x1f\x8b"
+HEADER_PREFIXES = (b"#", b"track", b"browser")
+# python keeps each line as a separate bytes object with its own overhead,
+# so only part of the memory limit is used for the raw lines of a chunk
+MEMORY_OVERHEAD_FACTOR = 4
+
+
+def _open_bed(bed_path: Union[str, Path]) -> BinaryIO:
+    """
+    Open bed file for binary reading, decompressing it on the fly if it is gzipped.
+
+    :param bed_path: path to the bed file
+    :return: file object
+    """
+    with open(bed_path, "rb") as f:
+        magic_number = f.read(2)
+    if magic_number == GZIP_MAGIC_NUMBER:
+        return gzip.open(bed_path, "rb")
+    return open(bed_path, "rb")
+
+
+def _region_lines(bed_file: BinaryIO, columns: int = None) -> Iterator[bytes]:
+    """
+    Iterate over region lines of the bed file, skipping header, comment and empty lines.
+
+    :param bed_file: opened bed file
+    :param columns: keep only first n columns of the line
+    :return: lines ending with a new line character
+    """
+    for line in bed_file:
+        if not line.strip() or line.startswith(HEADER_PREFIXES):
+            continue
+        if columns:
+            line = b"\t".join(line.split(None, columns)[:columns]) + b"\n"
+        elif not line.endswith(b"\n"):
+            line += b"\n"
+        yield line
+
+
+def _sort_key(line: bytes) -> Tuple[bytes, int]:
+    """
+    Sorting key of the bed line: chromosome name (byte order) and start position
+
+    :param line: bed line
+    :return: tuple of chrom and start
+    """
+    fields = line.split(None, 2)
+    try:
+        return fields[0], int(fields[1])
+    except (IndexError, ValueError):
+        raise BedBossException(f"Unable to sort bed file, incorrect line: {line!r}")
+
+
+def is_bed_sorted(bed_path: Union[str, Path]) -> bool:
+    """
+    Check in one streaming pass if the bed file is sorted by chromosome (byte order)
+    and start position, and can be used without any preprocessing.
+    Scanning stops at the first unsorted line.
+
+    :param bed_path: path to the bed file (plain or gzipped)
+    :return: True if the file is sorted and has no header lines
+    """
+    previous_key = None
+    with _open_bed(bed_path) as f:
+        for line in f:
+            if not line.strip() or line.startswith(HEADER_PREFIXES):
+                return False
+            key = _sort_key(line)
+            if previous_key is not None and key < previous_key:
+                return False
+            previous_key = key
+    return True
+
+
+def _sort_chunk(lines: List[bytes]) -> List[bytes]:
+    """
+    Sort lines of one chunk by chromosome (byte order) and start position.
+    Sorting is stable, so regions with the same key keep their order.
+
+    :param lines: bed lines
+    :return: sorted lines
+    """
+    chroms = []
+    starts = np.empty(len(lines), dtype=np.int64)
+    for i, line in enumerate(lines):
+        chrom, starts[i] = _sort_key(line)
+        chroms.append(chrom)
+
+    # np.unique sorts bytes in C (byte) order, codes follow this order
+    _, chrom_codes = np.unique(np.array(chroms, dtype=bytes), return_inverse=True)
+    order = np.lexsort((starts, chrom_codes.ravel()))
+    return [lines[i] for i in order]
+
+
+def _read_run(run_path: str) -> Iterator[bytes]:
+    """
+    Iterate over lines of the sorted temporary file
+
+    :param run_path: path to the temporary file
+    :return: lines
+    """
+    with open(run_path, "rb") as f:
+        yield from f
+
+
+def sort_bed(
+    bed_path: Union[str, Path],
+    output_path: Union[str, Path],
+    columns: int = None,
+    max_memory: int = DEFAULT_SORT_MEMORY,
+    temp_dir: Union[str, Path] = None,
+) -> str:
+    """
+    Sort bed file by chromosome (byte order, as required by bedToBigBed) and start position,
+    using external merge sort with limited memory usage.
+    Header, comment and empty lines are removed.
+
+    If the file is already sorted and no columns have to be removed,
+    sorting is skipped and path of the input file is returned.
+
+    :param bed_path: path to the bed file (plain or gzipped)
+    :param output_path: path to the sorted (plain text) bed file
+    :param columns: keep only first n columns [Default: all columns]
+    :param max_memory: approximate memory limit for sorting in bytes
+    :param temp_dir: folder for temporary sorted chunks [Default: folder of the output file]
+    :return: path to the sorted bed file
+    """
+    if not columns and is_bed_sorted(bed_path):
+        _LOGGER.info(f"Bed file is already sorted, skipping sorting: {bed_path}")
+        return str(bed_path)
+
+    temp_dir = temp_dir or os.path.dirname(os.path.abspath(output_path))
+    chunk_size = max(max_memory // MEMORY_OVERHEAD_FACTOR, 1)
+
+    runs = []
+    chunk = []
+    chunk_bytes = 0
+    try:
+        with _open_bed(bed_path) as f:
+            for line in _region_lines(f, columns=columns):
+                chunk.append(line)
+                chunk_bytes += len(line)
+                if chunk_bytes >= chunk_size:
+                    runs.append(_write_run(_sort_chunk(chunk), temp_dir))
+                    chunk = []
+                    chunk_bytes = 0
+
+        with open(output_path, "wb") as output:
+            if not runs:
+                output.writelines(_sort_chunk(chunk))
+            else:
+                if chunk:
+                    runs.append(_write_run(_sort_chunk(chunk), temp_dir))
+                _LOGGER.info(f"Merging {len(runs)} sorted chunks of {bed_path}")
+                output.writelines(
+                    heapq.merge(*[_read_run(run) for run in runs], key=_sort_key)
+                )
+    finally:
+        for run in runs:
+            os.remove(run)
+
+    return str(output_path)
+
+
+def _write_run(lines: List[bytes], temp_dir: Union[str, Path]) -> str:
+    """
+    Write sorted chunk to the temporary file
+
+    :param lines: sorted lines
+    :param temp_dir: folder for the temporary file
+    :return: path to the temporary file
+    """
+    fd, run_path = tempfile.mkstemp(suffix=".bed", prefix="sort_chunk_", dir=temp_dir)
+    with os.fdopen(fd, "wb") as f:
+        f.writelines(lines)
+    return run_path
@@ -8,11 +8,12 @@ from typing import Union
 
 import pypiper
 from geniml.bbclient import BBClient
-from geniml.io import RegionSet
 from refgenconf.exceptions import MissingGenomeError
 from ubiquerg import is_command_callable
 
+from bedboss.bed_regions import BedRegions
 from bedboss.bedclassifier.bedclassifier import get_bed_type
+from bedboss.bedmaker.bed_sort import sort_bed
 from bedboss.bedmaker.const import (
     BED_TO_BIGBED_PROGRAM,
     BEDGRAPH_TEMPLATE,
@@ -20,13 +21,15 @@ from bedboss.bedmaker.const import (
     BIGBED_TEMPLATE,
     BIGBED_TO_BED_PROGRAM,
     BIGWIG_TEMPLATE,
+    DEFAULT_SORT_MEMORY,
     QC_FOLDER_NAME,
     WIG_TEMPLATE,
 )
 from bedboss.bedmaker.models import BedMakerOutput, InputTypes
-from bedboss.bedmaker.utils import get_chrom_sizes
+from bedboss.bedmaker.utils import get_chrom_sizes, get_genome_asset_digest
 from bedboss.bedqc.bedqc import bedqc
 from bedboss.exceptions import BedBossException, RequirementsException
+from bedboss.stage_cache import StageCache, file_digest, stage_cache_key
 from bedboss.utils import cleanup_pm_temp
 
 _LOGGER = logging.getLogger("bedboss")
@@ -40,6 +43,8 @@ def make_bigbed(
     rfg_config: Union[str, Path] = None,
     chrom_sizes: Union[str, Path] = None,
     pm: pypiper.PipelineManager = None,
+    sort_memory: int = DEFAULT_SORT_MEMORY,
+    temp_dir: Union[str, Path] = None,
 ) -> str:
     """
     Generate bigBed file for the BED file.
@@ -52,6 +57,9 @@ def make_bigbed(
     :param rfg_config: file path to the genome config file. [Default: None]
     :param bed_type: bed type to be used for bigBed file generation "bed{bedtype}+{n}" [Default: None] (e.g bed3+1)
     :param pm: pypiper object
+    :param sort_memory: memory limit (in bytes) for sorting the bed file before conversion
+        [Default: 512 MB]
+    :param temp_dir: folder for temporary files created during sorting [Default: output_path]
 
     :return: path to the bigBed file
     """
@@ -95,10 +103,14 @@ def make_bigbed(
                 "https://genome.ucsc.edu/goldenpath/help/bigBed.html"
             )
         if bed_type is not None:
-            cmd = f"zcat {bed_path} | sort -k1,1 -k2,2n > {temp}"
-            pm.run(cmd, temp, nofail=False)
+            sorted_bed = sort_bed(
+                bed_path,
+                temp,
+                max_memory=sort_memory or DEFAULT_SORT_MEMORY,
+                temp_dir=temp_dir or output_path,
+            )
 
-            cmd = f"{BED_TO_BIGBED_PROGRAM} -type={bed_type} {temp} {chrom_sizes} {big_bed_path}"
+            cmd = f"{BED_TO_BIGBED_PROGRAM} -type={bed_type} {sorted_bed} {chrom_sizes} {big_bed_path}"
             try:
                 _LOGGER.info(f"Running: {cmd}")
                 pm.run(cmd, big_bed_path, nofail=False)
@@ -108,14 +120,14 @@ def make_bigbed(
                     f"Fail to generating bigBed files for {bed_path}: " f"Error: {err}"
                 )
         else:
-            cmd = (
-                "zcat "
-                + bed_path
-                + " | awk '{ print $1, $2, $3 }'| sort -k1,1 -k2,2n > "
-                + temp
+            sorted_bed = sort_bed(
+                bed_path,
+                temp,
+                columns=3,
+                max_memory=sort_memory or DEFAULT_SORT_MEMORY,
+                temp_dir=temp_dir or output_path,
             )
-            pm.run(cmd, temp)
-            cmd = f"{BED_TO_BIGBED_PROGRAM} -type=bed3 {temp} {chrom_sizes} {big_bed_path}"
+            cmd = f"{BED_TO_BIGBED_PROGRAM} -type=bed3 {sorted_bed} {chrom_sizes} {big_bed_path}"
 
             try:
                 pm.run(cmd, big_bed_path, nofail=True)
@@ -321,6 +333,9 @@ def make_all(
     check_qc: bool = True,
     lite: bool = False,
     pm: pypiper.PipelineManager = None,
+    stage_cache: StageCache = None,
+    sort_memory: int = None,
+    sort_temp_dir: str = None,
 ) -> BedMakerOutput:
     """
     Maker of bed and bigbed files.
@@ -345,6 +360,10 @@ def make_all(
     :param check_qc: run quality control during bedmaking
     :param lite: run the pipeline in lite mode (without producing bigBed files)
     :param pm: pypiper object
+    :param stage_cache: cache of stage results, bigBed file is restored from it if it was created before
+    :param sort_memory: memory limit (in bytes) for sorting the bed file before bigBed conversion
+        [Default: 512 MB]
+    :param sort_temp_dir: folder for temporary files created during sorting [Default: output_path]
 
     :return: dict with generated bed metadata - BedMakerOutput object:
         {
@@ -353,6 +372,7 @@ def make_all(
             "bed_file": path to the bed file
             "bigbed_file": path to the bigbed file
             "bed_digest": bed_digest
+            "bed_regions": parsed regions of the bed file (BedRegions object)
         }
     """
     if not pm:
@@ -387,10 +407,31 @@ def make_all(
             raise BedBossException(
                 f"Quality control failed for {output_path}. Error: {e}"
             )
+    bed_regions = BedRegions.from_file(output_bed)
+    bigbed_key = None
+    if stage_cache and not lite:
+        # chrom sizes are identified by content: the provided file, or the refgenie asset
+        if chrom_sizes:
+            chrom_sizes_digest = file_digest(chrom_sizes)
+        else:
+            chrom_sizes_digest = get_genome_asset_digest(genome, rfg_config=rfg_config)
+        if chrom_sizes_digest:
+            bigbed_key = stage_cache_key(
+                bed_regions.identifier,
+                "bigbed",
+                params=dict(
+                    genome=genome,
+                    bed_type=bed_type,
+                    chrom_sizes=chrom_sizes_digest,
+                ),
+            )
+    cached_bigbed = stage_cache.get(bigbed_key, output_path) if bigbed_key else None
     try:
         if lite:
             _LOGGER.info("Skipping bigBed generation due to lite mode.")
             output_bigbed = None
+        elif cached_bigbed:
+            output_bigbed = os.path.join(output_path, cached_bigbed)
         else:
             output_bigbed = make_bigbed(
                 bed_path=output_bed,
@@ -400,7 +441,16 @@ def make_all(
                 rfg_config=rfg_config,
                 chrom_sizes=chrom_sizes,
                 pm=pm,
+                sort_memory=sort_memory,
+                temp_dir=sort_temp_dir,
             )
+            if bigbed_key and output_bigbed:
+                stage_cache.put(
+                    bigbed_key,
+                    os.path.relpath(output_bigbed, output_path),
+                    output_path,
+                    files=[output_bigbed],
+                )
     except BedBossException:
         output_bigbed = None
     if pm_clean:
@@ -412,7 +462,8 @@ def make_all(
     return BedMakerOutput(
         bed_file=output_bed,
         bigbed_file=os.path.abspath(output_bigbed) if output_bigbed else None,
-        bed_digest=RegionSet(output_bed).identifier,
+        bed_digest=bed_regions.identifier,
         bed_type=bed_type,
         bed_format=bed_format,
+        bed_regions=bed_regions,
     )
@@ -28,3 +28,6 @@ STANDARD_CHROM_LIST[len(STANDARD_CHROM_LIST) :] = ["chrX", "chrY", "chrM"]
 QC_FOLDER_NAME = "bed_qc"
 
 BIGBED_FILE_NAME = "bigbed_files"
+
+# memory limit for sorting bed files before bigBed conversion (bytes)
+DEFAULT_SORT_MEMORY = 512 * 1024 * 1024
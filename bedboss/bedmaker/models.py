@@ -2,7 +2,9 @@ from enum import Enum
 from pathlib import Path
 from typing import Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+from bedboss.bed_regions import BedRegions
 
 
 class InputTypes(Enum):
@@ -27,3 +29,7 @@ class BedMakerOutput(BaseModel):
         default="bed3", pattern="^bed(?:[3-9]|1[0-5])(?:\+|$)[0-9]?+$"
     )
     bed_format: BedType = BedType.BED
+    # parsed regions of the bed file, shared by the downstream stages
+    bed_regions: Union[BedRegions, None] = Field(default=None, exclude=True)
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
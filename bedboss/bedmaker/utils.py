@@ -50,6 +50,25 @@ def get_chrom_sizes(genome: str, rfg_config: Union[str, Path]) -> str:
     return chrom_sizes
 
 
+def get_genome_asset_digest(
+    genome: str, asset: str = "fasta", rfg_config: Union[str, Path] = None
+) -> Union[str, None]:
+    """
+    Get digest of the local refgenie asset (it identifies content of the asset).
+    Asset is not pulled, if it is not available locally.
+
+    :param genome: genome name
+    :param asset: asset name
+    :param rfg_config: path to the refgenie config file
+    :return: asset digest, or None if the asset is not available
+    """
+    try:
+        return get_rgc(rfg_config=rfg_config).id(genome, asset, "default")
+    except (UndefinedAliasError, RefgenconfError, OSError, KeyError) as err:
+        _LOGGER.info(f"Digest of {genome}/{asset} asset is not available: {err}")
+        return None
+
+
 def get_rgc(rfg_config: Union[str, Path] = None) -> RGC:
     """
     Get refgenie config file.
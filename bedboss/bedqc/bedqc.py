@@ -1,15 +1,83 @@
+import gzip
 import logging
 import os
-import subprocess
-import tempfile
 
 import pypiper
 
+from bedboss.bedqc.models import BedScanResult
 from bedboss.const import MAX_FILE_SIZE, MAX_REGION_NUMBER, MIN_REGION_WIDTH
 from bedboss.exceptions import QualityException
 
 _LOGGER = logging.getLogger("bedboss")
 
+GZIP_MAGIC_NUMBER = b"\x1f\x8b"
+HEADER_PREFIXES = (b"#", b"track", b"browser")
+
+
+def _open_bed(bedfile: str):
+    """
+    Open bed file for binary reading, decompressing it on the fly if it is gzipped.
+
+    :param bedfile: path to the bed file (plain or gzipped)
+    :return: file object
+    """
+    with open(bedfile, "rb") as f:
+        magic_number = f.read(2)
+    if magic_number == GZIP_MAGIC_NUMBER:
+        return gzip.open(bedfile, "rb")
+    return open(bedfile, "rb")
+
+
+def scan_bed(bedfile: str, max_region_number: int = None) -> BedScanResult:
+    """
+    Collect region statistics of a bed file in a single streaming pass,
+    without decompressing it to disk. Header, comment and empty lines are skipped.
+
+    :param bedfile: path to the bed file (plain or gzipped)
+    :param max_region_number: stop scanning when number of regions exceeds this value
+    :return: BedScanResult with number of regions, region width statistics and file size
+    :raises QualityException: if a region can't be parsed
+    """
+    number_of_regions = 0
+    total_width = 0
+    min_width = None
+    max_width = None
+    truncated = False
+
+    with _open_bed(bedfile) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip() or line.startswith(HEADER_PREFIXES):
+                continue
+            fields = line.split(None, 3)
+            try:
+                width = int(fields[2]) - int(fields[1])
+            except (IndexError, ValueError):
+                raise QualityException(
+                    f"Unable to parse region in line {line_number}: {line[:100]!r}"
+                )
+
+            number_of_regions += 1
+            total_width += width
+            if min_width is None or width < min_width:
+                min_width = width
+            if max_width is None or width > max_width:
+                max_width = width
+
+            if max_region_number is not None and number_of_regions > max_region_number:
+                truncated = True
+                break
+
+    return BedScanResult(
+        number_of_regions=number_of_regions,
+        mean_region_width=(
+            total_width / number_of_regions if number_of_regions else 0.0
+        ),
+        min_region_width=min_width or 0,
+        max_region_width=max_width or 0,
+        file_size=os.path.getsize(bedfile),
+        truncated=truncated,
+    )
+
 
 def bedqc(
     bedfile: str,
@@ -27,7 +95,7 @@ def bedqc(
     :param max_file_size: Maximum file size threshold to pass the quality check.
     :param max_region_number: Maximum number of regions threshold to pass the quality check.
     :param min_region_width: Minimum region width threshold to pass the quality check.
-    :param pm: Pypiper object for managing pipeline operations.
+    :param pm: Pypiper object for managing pipeline operations. [Not used, kept for compatibility]
     :return: True if the file passes the quality check.
     :raises QualityException: if the file does not pass the quality
     """
@@ -35,61 +103,27 @@ def bedqc(
 
     output_file = os.path.join(outfolder, "failed_qc.csv")
     bedfile_name = os.path.basename(bedfile)
-    input_extension = os.path.splitext(bedfile_name)[1]
 
     # file_exists = os.path.isfile(bedfile)
     if not os.path.exists(outfolder):
         os.makedirs(outfolder)
 
-    # to execute bedqc from inside Python (without using cli) Pypiper is set to default:
-    if not pm:
-        pm = pypiper.PipelineManager(
-            name="bedQC-pipeline", outfolder=outfolder, recover=True, multi=True
-        )
-
     detail = []
 
-    # check number of regions
-    script_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-        "bedqc",
-        "est_line.sh",
-    )
-    assert os.path.exists(script_path), FileNotFoundError(
-        f"'{script_path}' script not found"
-    )
+    scan_result = scan_bed(bedfile, max_region_number=max_region_number)
 
-    if input_extension == ".gz":
-        file = os.path.join(outfolder, next(tempfile._get_candidate_names()))
-        pm.clean_add(file)
-        cmd = "zcat " + bedfile + " > " + file
-        pm.run(cmd, file)
-    else:
-        file = bedfile
-
-    cmd = f"bash {script_path} {file} "
-
-    if int(pm.checkprint(cmd)) > max_region_number:
+    # check number of regions
+    if scan_result.number_of_regions > max_region_number:
         detail.append("File contains more than 5 million regions.")
 
     # check file size
-    if os.path.getsize(bedfile) >= max_file_size:
+    if scan_result.file_size >= max_file_size:
         detail.append("File size is larger than 2G.")
 
     # check mean region width
-    awk_command = r"""
-    {
-    diff += $3 - $2
-    }
-    END {
-    print diff/NR
-    }
-    """
-
-    if (
-        float(subprocess.check_output(["awk", awk_command, file], text=True).split()[0])
-        < min_region_width
-    ):
+    if scan_result.number_of_regions == 0:
+        detail.append("File does not contain any regions.")
+    elif scan_result.mean_region_width < min_region_width:
         detail.append(f"Mean region width is less than {min_region_width} bp.")
 
     if len(detail) > 0:
@@ -106,5 +140,5 @@ def bedqc(
 
         raise QualityException(f"{str(detail)}")
 
-    _LOGGER.info(f"File ({file}) has passed Quality Control!")
+    _LOGGER.info(f"File ({bedfile}) has passed Quality Control!")
     return True
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class BedScanResult(BaseModel):
+    number_of_regions: int = 0
+    mean_region_width: float = 0.0
+    min_region_width: int = 0
+    max_region_width: int = 0
+    file_size: int = 0
+    # True if scanning was stopped before the end of the file,
+    # in this case number of regions is only a lower bound
+    truncated: bool = False
@@ -1,3 +1,3 @@
-from .bedstat import bedstat
+from .bedstat import bedstat, bedstat_batch
 
-__all__ = ["bedstat"]
+__all__ = ["bedstat", "bedstat_batch"]
@@ -0,0 +1,265 @@
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bedboss.bed_regions import BedRegions
+from bedboss.const import PKG_NAME
+from bedboss.exceptions import BedBossException
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+GTF_COLUMNS = ["chrom", "source", "feature", "start", "end", "score", "strand"]
+# the same features as getGeneModelsFromGTF in regionstat.R
+GENE_MODEL_FEATURES = ("gene", "exon", "three_prime_utr", "five_prime_utr")
+# TSS of all chromosomes are searched at once, with keys: chrom index << CHROM_SHIFT | position
+CHROM_SHIFT = 32
+# range of distances in the TSS distance histogram (GenomicDistributions::plotFeatureDist)
+TSS_DISTANCE_LIMIT = 100_000
+TSS_DISTANCE_BINS = 50
+
+
+def ensembl_to_ucsc(chrom: str) -> str:
+    """
+    Convert Ensembl chromosome name to UCSC (1 -> chr1, MT -> chrM)
+
+    :param chrom: chromosome name
+    :return: UCSC chromosome name
+    """
+    if chrom.startswith("chr"):
+        return chrom
+    if chrom == "MT":
+        return "chrM"
+    return f"chr{chrom}"
+
+
+def read_gtf(
+    gtf_file: str,
+    features: Iterable[str] = GENE_MODEL_FEATURES,
+    protein_coding: bool = True,
+    convert_ensembl_ucsc: bool = True,
+) -> pd.DataFrame:
+    """
+    Read features of a GTF file (plain or gzipped), like GenomicDistributions::getGeneModelsFromGTF.
+    Coordinates are converted to 0-based, half-open (as in BED).
+
+    :param gtf_file: path to the GTF file
+    :param features: feature types to keep
+    :param protein_coding: keep only protein coding genes (if gene biotype is in the file)
+    :param convert_ensembl_ucsc: convert chromosome names to UCSC style
+    :return: data frame with chrom, feature, start, end and strand columns
+    """
+    try:
+        df = pd.read_csv(
+            gtf_file,
+            sep="\t",
+            comment="#",
+            header=None,
+            names=GTF_COLUMNS + ["frame", "attributes"],
+            usecols=[0, 2, 3, 4, 6, 8],
+            dtype={"chrom": str, "feature": str, "strand": str, "attributes": str},
+        )
+    except (OSError, pd.errors.ParserError) as err:
+        raise BedBossException(f"Unable to read GTF file {gtf_file}: {err}")
+
+    df = df[df["feature"].isin(list(features))]
+    if protein_coding:
+        biotype = df["attributes"].str.extract(
+            r'(?:gene_biotype|gene_type) "([^"]+)"', expand=False
+        )
+        df = df[biotype.isna() | (biotype == "protein_coding")]
+
+    df = df.drop(columns="attributes").reset_index(drop=True)
+    df["start"] = df["start"].astype(np.int64) - 1
+    df["end"] = df["end"].astype(np.int64)
+    if convert_ensembl_ucsc:
+        df["chrom"] = df["chrom"].map(ensembl_to_ucsc)
+    return df
+
+
+class TSSIndex:
+    """
+    Transcription start sites of a genome: sorted TSS positions of each chromosome.
+    Nearest TSS of all regions is found with one binary search over region midpoints.
+    """
+
+    def __init__(self, tss: Dict[str, np.ndarray]):
+        """
+        :param tss: dict of chromosome names and TSS positions (0-based)
+        """
+        tss = {
+            chrom: np.unique(np.asarray(positions, dtype=np.int64))
+            for chrom, positions in tss.items()
+            if len(positions)
+        }
+        self._chrom_index = {chrom: index for index, chrom in enumerate(tss)}
+        self._keys = np.concatenate(
+            [np.zeros(0, dtype=np.int64)]
+            + [
+                (np.int64(index) << CHROM_SHIFT) | positions
+                for index, positions in enumerate(tss.values())
+            ]
+        )
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def chrom_names(self) -> List[str]:
+        """
+        Chromosomes with TSS, in order of keys
+        """
+        return list(self._chrom_index)
+
+    @property
+    def keys(self) -> np.ndarray:
+        """
+        Sorted search keys: chrom index << CHROM_SHIFT | TSS position
+        """
+        return self._keys
+
+    @property
+    def tss(self) -> Dict[str, np.ndarray]:
+        """
+        Dict of chromosome names and sorted TSS positions
+        """
+        bounds = np.searchsorted(
+            self._keys >> CHROM_SHIFT, np.arange(len(self._chrom_index) + 1)
+        )
+        mask = (np.int64(1) << CHROM_SHIFT) - 1
+        return {
+            chrom: self._keys[bounds[index] : bounds[index + 1]] & mask
+            for chrom, index in self._chrom_index.items()
+        }
+
+    @classmethod
+    def from_keys(cls, chrom_names: List[str], keys: np.ndarray) -> "TSSIndex":
+        """
+        Create index from precomputed keys (e.g. memory-mapped from the annotation cache),
+        keys are used without copying
+
+        :param chrom_names: chromosomes with TSS, in order of keys
+        :param keys: sorted keys: chrom index << CHROM_SHIFT | TSS position
+        :return: TSSIndex
+        """
+        index = cls.__new__(cls)
+        index._chrom_index = {chrom: i for i, chrom in enumerate(chrom_names)}
+        index._keys = keys
+        return index
+
+    @classmethod
+    def from_gene_models(cls, genes: pd.DataFrame) -> "TSSIndex":
+        """
+        Create index from genes (e.g. read with read_gtf). TSS is the gene start
+        on the + strand and the gene end on the - strand.
+
+        :param genes: data frame with chrom, start, end and strand columns
+        :return: TSSIndex
+        """
+        tss = np.where(genes["strand"] == "-", genes["end"] - 1, genes["start"])
+        return cls(
+            {
+                chrom: tss[indices]
+                for chrom, indices in genes.groupby("chrom").indices.items()
+            }
+        )
+
+    @classmethod
+    def from_gtf(cls, gtf_file: str) -> "TSSIndex":
+        """
+        Create index from protein coding genes of the GTF file
+        (GenomicDistributions::getTssFromGTF)
+
+        :param gtf_file: path to the GTF file
+        :return: TSSIndex
+        """
+        return cls.from_gene_models(read_gtf(gtf_file, features=["gene"]))
+
+    def distances(self, regions: BedRegions) -> np.ndarray:
+        """
+        Signed distance from the region midpoint to the nearest TSS
+        (GenomicDistributions::calcFeatureDist). Positive values: region is downstream
+        of the TSS in genome coordinates. Regions on chromosomes without TSS have NaN.
+
+        :param regions: BedRegions object
+        :return: array of distances, in order of regions
+        """
+        distances = np.full(len(regions), np.nan)
+        chrom_lookup = np.array(
+            [self._chrom_index.get(chrom, -1) for chrom in regions.chrom_names],
+            dtype=np.int64,
+        )
+        chrom_indices = chrom_lookup[regions.chrom_codes]
+        found = chrom_indices >= 0
+        all_found = found.all()
+        if not all_found:
+            if not found.any():
+                return distances
+            chrom_indices = chrom_indices[found]
+        starts = regions.starts if all_found else regions.starts[found]
+        widths = regions.widths if all_found else regions.widths[found]
+
+        # midpoint: start + round(width / 2), rounding half to even as in R
+        half = widths >> 1
+        keys = (chrom_indices << CHROM_SHIFT) | (starts + half + (widths & half & 1))
+
+        # nearest TSS is the previous or the next key. Keys of other chromosomes
+        # are at least 2^CHROM_SHIFT - chrom length away, so they are never the nearest
+        right = np.searchsorted(self._keys, keys)
+        left = (right - 1).clip(min=0)
+        right = right.clip(max=len(self._keys) - 1)
+        left_distances = keys - self._keys[left]
+        right_distances = keys - self._keys[right]
+        nearest = np.where(
+            np.abs(left_distances) <= np.abs(right_distances),
+            left_distances,
+            right_distances,
+        )
+        if all_found:
+            return nearest.astype(float)
+        distances[found] = nearest
+        return distances
+
+
+def get_tss_index(gtf_file: str) -> TSSIndex:
+    """
+    Get TSS index of the GTF file from the compiled annotation cache.
+    The cache is built on the first use of the file.
+
+    :param gtf_file: path to the GTF file
+    :return: TSSIndex
+    """
+    from bedboss.bedstat.annotation_cache import get_annotation_cache
+
+    return get_annotation_cache(gtf_file).tss_index
+
+
+def median_tss_distance(distances: np.ndarray) -> float:
+    """
+    Median of absolute TSS distances, NaN values are ignored
+
+    :param distances: array of distances
+    :return: median distance, or None if there are no distances
+    """
+    distances = distances[~np.isnan(distances)]
+    if len(distances) == 0:
+        return None
+    return float(np.median(np.abs(distances)))
+
+
+def tss_distance_histogram(
+    distances: np.ndarray,
+    limit: int = TSS_DISTANCE_LIMIT,
+    bins: int = TSS_DISTANCE_BINS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Histogram of TSS distances within [-limit, limit]
+
+    :param distances: array of distances
+    :param limit: maximum absolute distance
+    :param bins: number of bins
+    :return: counts and bin edges
+    """
+    distances = distances[~np.isnan(distances)]
+    return np.histogram(distances, bins=bins, range=(-limit, limit))
@@ -0,0 +1,382 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bedboss.bedstat.annotation import TSSIndex, read_gtf
+from bedboss.bedstat.partitions import PartitionMap
+from bedboss.const import PKG_NAME
+from bedboss.refgenome_validator.genome_registry import get_cache_folder
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# cache is rebuilt if the format changes
+ANNOTATION_CACHE_VERSION = 1
+ANNOTATION_CACHE_FOLDER = "annotations"
+# GTF features stored in the cache, and names of their arrays
+ANNOTATION_FEATURES = {
+    "gene": "genes",
+    "exon": "exons",
+    "three_prime_utr": "three_utrs",
+    "five_prime_utr": "five_utrs",
+}
+STRAND_CODES = {"+": 1, "-": -1}
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_LOCK = threading.Lock()
+_ANNOTATION_CACHES: Dict[Tuple[str, int, int], "AnnotationCache"] = {}
+
+
+class FeatureArrays(NamedTuple):
+    """
+    Intervals of one feature type, sorted by chromosome and start (0-based, half-open).
+    Chromosomes are indexes in AnnotationCache.chrom_names, strands are 1, -1 or 0 (unknown)
+    """
+
+    chrom_codes: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+    strands: np.ndarray
+
+    def to_dataframe(self, chrom_names: List[str]) -> pd.DataFrame:
+        """
+        Convert to data frame with chrom, start, end and strand columns
+
+        :param chrom_names: chromosome names of the annotation
+        :return: data frame
+        """
+        return pd.DataFrame(
+            {
+                "chrom": np.asarray(chrom_names, dtype=object)[self.chrom_codes],
+                "start": np.asarray(self.starts),
+                "end": np.asarray(self.ends),
+                "strand": np.select(
+                    [self.strands == 1, self.strands == -1], ["+", "-"], "*"
+                ),
+            }
+        )
+
+
+def _feature_arrays(df: pd.DataFrame, chrom_names: List[str]) -> FeatureArrays:
+    codes = pd.Categorical(df["chrom"], categories=chrom_names).codes.astype(np.int32)
+    order = np.lexsort((df["start"].to_numpy(), codes))
+    return FeatureArrays(
+        chrom_codes=codes[order],
+        starts=df["start"].to_numpy(dtype=np.int64)[order],
+        ends=df["end"].to_numpy(dtype=np.int64)[order],
+        strands=df["strand"].map(STRAND_CODES).fillna(0).to_numpy(np.int8)[order],
+    )
+
+
+def calculate_introns(genes: FeatureArrays, exons: FeatureArrays) -> FeatureArrays:
+    """
+    Introns: parts of genes not covered by any exon (strand is not kept)
+
+    :param genes: gene intervals
+    :param exons: exon intervals
+    :return: intron intervals
+    """
+    chrom_codes, starts, ends = [], [], []
+    for code in np.unique(genes.chrom_codes).tolist():
+        gene_mask = genes.chrom_codes == code
+        exon_mask = exons.chrom_codes == code
+        boundaries = np.unique(
+            np.concatenate(
+                [
+                    genes.starts[gene_mask],
+                    genes.ends[gene_mask],
+                    exons.starts[exon_mask],
+                    exons.ends[exon_mask],
+                ]
+            )
+        )
+
+        def coverage(mask: np.ndarray, features: FeatureArrays) -> np.ndarray:
+            return np.cumsum(
+                np.bincount(
+                    np.searchsorted(boundaries, features.starts[mask]),
+                    minlength=len(boundaries),
+                )
+                - np.bincount(
+                    np.searchsorted(boundaries, features.ends[mask]),
+                    minlength=len(boundaries),
+                )
+            )[:-1]
+
+        intronic = (coverage(gene_mask, genes) > 0) & (coverage(exon_mask, exons) == 0)
+        # merge neighboring intronic segments
+        edges = np.diff(np.concatenate([[0], intronic.astype(np.int8), [0]]))
+        chrom_starts = boundaries[np.flatnonzero(edges == 1)]
+        chrom_ends = boundaries[np.flatnonzero(edges == -1)]
+        chrom_codes.append(np.full(len(chrom_starts), code, dtype=np.int32))
+        starts.append(chrom_starts)
+        ends.append(chrom_ends)
+
+    chrom_codes = np.concatenate([np.zeros(0, dtype=np.int32)] + chrom_codes)
+    return FeatureArrays(
+        chrom_codes=chrom_codes,
+        starts=np.concatenate([np.zeros(0, dtype=np.int64)] + starts),
+        ends=np.concatenate([np.zeros(0, dtype=np.int64)] + ends),
+        strands=np.zeros(len(chrom_codes), dtype=np.int8),
+    )
+
+
+class AnnotationCache:
+    """
+    Compiled gene models of a GTF file: genes, exons, introns, UTRs, TSS index and
+    genome partitions. Saved as a folder of .npy arrays, that are memory-mapped when loaded,
+    so the annotation is parsed only once and shared by all processes using it.
+    """
+
+    def __init__(
+        self,
+        chrom_names: List[str],
+        features: Dict[str, FeatureArrays],
+        tss_index: TSSIndex,
+        partition_map: PartitionMap,
+        gtf_digest: str = None,
+    ):
+        """
+        :param chrom_names: chromosome names of the annotation
+        :param features: dict of feature names (genes, exons, introns, three_utrs, five_utrs)
+            and their intervals
+        :param tss_index: TSSIndex of genes
+        :param partition_map: PartitionMap of gene models
+        :param gtf_digest: sha256 digest of the GTF file
+        """
+        self.chrom_names = chrom_names
+        self.features = features
+        self.tss_index = tss_index
+        self.partition_map = partition_map
+        self.gtf_digest = gtf_digest
+
+    @classmethod
+    def from_gtf(cls, gtf_file: str, gtf_digest: str = None) -> "AnnotationCache":
+        """
+        Parse protein coding gene models of the GTF file
+
+        :param gtf_file: path to the GTF file
+        :param gtf_digest: sha256 digest of the GTF file
+        :return: AnnotationCache
+        """
+        gene_models = read_gtf(gtf_file, features=list(ANNOTATION_FEATURES))
+        chrom_names = sorted(gene_models["chrom"].unique().tolist())
+        by_feature = dict(list(gene_models.groupby("feature", sort=False)))
+        empty = gene_models.iloc[:0]
+
+        features = {
+            name: _feature_arrays(by_feature.get(feature, empty), chrom_names)
+            for feature, name in ANNOTATION_FEATURES.items()
+        }
+        features["introns"] = calculate_introns(features["genes"], features["exons"])
+        return cls(
+            chrom_names=chrom_names,
+            features=features,
+            tss_index=TSSIndex.from_gene_models(by_feature.get("gene", empty)),
+            partition_map=PartitionMap.from_gene_models(gene_models),
+            gtf_digest=gtf_digest,
+        )
+
+    def save(self, folder: str) -> None:
+        """
+        Save the cache to the folder. Folder is written atomically: it is created
+        in a temporary location and renamed when complete.
+
+        :param folder: path to the cache folder
+        """
+        parent = os.path.dirname(os.path.abspath(folder))
+        os.makedirs(parent, exist_ok=True)
+        temp_folder = tempfile.mkdtemp(suffix=".tmp", dir=parent)
+        try:
+            partition_chroms = list(self.partition_map.segments)
+            segments = [
+                self.partition_map.segments[chrom] for chrom in partition_chroms
+            ]
+            arrays = {
+                "tss_keys": self.tss_index.keys,
+                "partition_boundaries": np.concatenate(
+                    [np.zeros(0, dtype=np.int64)] + [b for b, _ in segments]
+                ),
+                "partition_labels": np.concatenate(
+                    [np.zeros(0, dtype=np.int8)] + [l for _, l in segments]
+                ),
+                "partition_offsets": np.cumsum([0] + [len(b) for b, _ in segments]),
+            }
+            for name, feature in self.features.items():
+                for field, values in feature._asdict().items():
+                    arrays[f"{name}_{field}"] = values
+            for name, values in arrays.items():
+                np.save(os.path.join(temp_folder, f"{name}.npy"), values)
+
+            with open(os.path.join(temp_folder, "metadata.json"), "w") as f:
+                json.dump(
+                    {
+                        "version": ANNOTATION_CACHE_VERSION,
+                        "gtf_digest": self.gtf_digest,
+                        "chrom_names": self.chrom_names,
+                        "tss_chrom_names": self.tss_index.chrom_names,
+                        "partition_chrom_names": partition_chroms,
+                        "features": list(self.features),
+                    },
+                    f,
+                )
+            try:
+                os.rename(temp_folder, folder)
+            except OSError:
+                # cache was saved by another process in the meantime
+                if not os.path.exists(os.path.join(folder, "metadata.json")):
+                    raise
+        finally:
+            shutil.rmtree(temp_folder, ignore_errors=True)
+
+    @classmethod
+    def load(cls, folder: str) -> "AnnotationCache":
+        """
+        Open the cache saved in the folder. Arrays are memory-mapped (read only),
+        not copied to memory.
+
+        :param folder: path to the cache folder
+        :return: AnnotationCache
+        """
+        with open(os.path.join(folder, "metadata.json")) as f:
+            metadata = json.load(f)
+        if metadata.get("version") != ANNOTATION_CACHE_VERSION:
+            raise ValueError(
+                f"Unsupported annotation cache version: {metadata.get('version')}"
+            )
+
+        def load_array(name: str) -> np.ndarray:
+            path = os.path.join(folder, f"{name}.npy")
+            try:
+                return np.load(path, mmap_mode="r", allow_pickle=False)
+            except ValueError:
+                # empty arrays can't be memory-mapped
+                return np.load(path, allow_pickle=False)
+
+        features = {
+            name: FeatureArrays(
+                **{
+                    field: load_array(f"{name}_{field}")
+                    for field in FeatureArrays._fields
+                }
+            )
+            for name in metadata["features"]
+        }
+
+        boundaries = load_array("partition_boundaries")
+        labels = load_array("partition_labels")
+        offsets = load_array("partition_offsets")
+        segments = {}
+        for index, chrom in enumerate(metadata["partition_chrom_names"]):
+            start, end = int(offsets[index]), int(offsets[index + 1])
+            # each chromosome has one boundary more than labels
+            segments[chrom] = (
+                boundaries[start:end],
+                labels[start - index : end - index - 1],
+            )
+
+        return cls(
+            chrom_names=metadata["chrom_names"],
+            features=features,
+            tss_index=TSSIndex.from_keys(
+                metadata["tss_chrom_names"], load_array("tss_keys")
+            ),
+            partition_map=PartitionMap(segments),
+            gtf_digest=metadata.get("gtf_digest"),
+        )
+
+
+def get_file_digest(file_path: str) -> str:
+    """
+    Get sha256 digest of the file content
+
+    :param file_path: path to the file
+    :return: hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_annotation_cache_folder(gtf_digest: str, cache_folder: str = None) -> str:
+    """
+    Get folder of the compiled annotation, addressed by content of the GTF file
+
+    :param gtf_digest: sha256 digest of the GTF file
+    :param cache_folder: bedboss cache folder [Default: BEDBOSS_CACHE or ~/.cache/bedboss]
+    :return: path to the annotation cache folder
+    """
+    return os.path.join(
+        cache_folder or get_cache_folder(),
+        ANNOTATION_CACHE_FOLDER,
+        f"{gtf_digest[:32]}_v{ANNOTATION_CACHE_VERSION}",
+    )
+
+
+def build_annotation_cache(
+    gtf_file: str, cache_folder: str = None, force: bool = False
+) -> str:
+    """
+    Compile the GTF file and save it to the annotation cache, if it isn't there yet
+
+    :param gtf_file: path to the GTF file
+    :param cache_folder: bedboss cache folder [Default: BEDBOSS_CACHE or ~/.cache/bedboss]
+    :param force: rebuild the cache even if it exists
+    :return: path to the annotation cache folder
+    """
+    gtf_digest = get_file_digest(gtf_file)
+    folder = get_annotation_cache_folder(gtf_digest, cache_folder)
+    if os.path.exists(os.path.join(folder, "metadata.json")):
+        if not force:
+            return folder
+        shutil.rmtree(folder)
+    _LOGGER.info(f"Compiling annotation cache of: {gtf_file}")
+    AnnotationCache.from_gtf(gtf_file, gtf_digest=gtf_digest).save(folder)
+    return folder
+
+
+def get_annotation_cache(gtf_file: str, cache_folder: str = None) -> AnnotationCache:
+    """
+    Get compiled annotation of the GTF file. It is opened from the cache (or compiled
+    and saved, if not cached yet) once per process for each file, and reopened if the file changes.
+
+    :param gtf_file: path to the GTF file
+    :param cache_folder: bedboss cache folder [Default: BEDBOSS_CACHE or ~/.cache/bedboss]
+    :return: AnnotationCache
+    """
+    stat = os.stat(gtf_file)
+    key = (os.path.abspath(gtf_file), stat.st_size, stat.st_mtime_ns)
+    with _LOCK:
+        if key in _ANNOTATION_CACHES:
+            return _ANNOTATION_CACHES[key]
+
+        gtf_digest = get_file_digest(gtf_file)
+        folder = get_annotation_cache_folder(gtf_digest, cache_folder)
+        annotation = None
+        if os.path.exists(os.path.join(folder, "metadata.json")):
+            try:
+                annotation = AnnotationCache.load(folder)
+            except (OSError, ValueError, KeyError) as err:
+                _LOGGER.warning(f"Unable to read annotation cache {folder}: {err}")
+                shutil.rmtree(folder, ignore_errors=True)
+
+        if annotation is None:
+            _LOGGER.info(f"Compiling annotation cache of: {gtf_file}")
+            annotation = AnnotationCache.from_gtf(gtf_file, gtf_digest=gtf_digest)
+            try:
+                annotation.save(folder)
+                annotation = AnnotationCache.load(folder)
+            except OSError as err:
+                _LOGGER.warning(f"Unable to write annotation cache {folder}: {err}")
+
+        _ANNOTATION_CACHES[key] = annotation
+        return annotation
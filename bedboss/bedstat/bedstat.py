@@ -1,14 +1,47 @@
+import hashlib
 import json
 import logging
 import os
-import statistics
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Union
+from typing import Dict, List, Tuple, Union
 
+import numpy as np
 import pypiper
-from geniml.io import RegionSet
 
-from bedboss.bedstat.gc_content import calculate_gc_content, create_gc_plot
+from bedboss.bed_regions import BedRegions
+from bedboss.bedstat.annotation import (
+    get_tss_index,
+    median_tss_distance,
+    tss_distance_histogram,
+)
+from bedboss.bedstat.gc_content import (
+    GC_APPROX_TOLERANCE,
+    GCContentEstimate,
+    calculate_gc_content,
+    calculate_gc_density,
+)
+from bedboss.bedstat.partitions import get_partition_map
+from bedboss.bedstat.plot_renderer import (
+    PlotRenderer,
+    get_plot_renderer,
+    resolve_plots,
+)
+from bedboss.bedstat.plots import (
+    plot_cumulative_partitions,
+    plot_expected_partitions,
+    plot_gc_content,
+    plot_partitions,
+    plot_tss_distance,
+)
+from bedboss.bedstat.r_worker import get_regionstat_worker
+from bedboss.bedstat.region_stats import (
+    REGION_PLOT_IDS,
+    calculate_region_stats,
+    create_region_plots,
+    get_genome_chrom_sizes,
+    signif,
+)
 from bedboss.const import (
     BEDSTAT_OUTPUT,
     HOME_PATH,
@@ -19,7 +52,11 @@ from bedboss.const import (
     OS_MM10,
     OUTPUT_FOLDER_NAME,
 )
-from bedboss.exceptions import BedBossException, OpenSignalMatrixException
+from bedboss.exceptions import (
+    BedBossException,
+    OpenSignalMatrixException,
+    RWorkerException,
+)
 from bedboss.utils import download_file
 
 _LOGGER = logging.getLogger("bedboss")
@@ -27,6 +64,104 @@ _LOGGER = logging.getLogger("bedboss")
 SCHEMA_PATH_BEDSTAT = os.path.join(
     os.path.dirname(os.path.realpath(__file__)), "pep_schema.yaml"
 )
+REGIONSTAT_SCRIPT_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "tools", "regionstat.R"
+)
+
+# genomes with reference TSS annotation (GenomicDistributionsData), regionstat.R
+# uses it even if ensdb is provided
+TSS_REFERENCE_GENOMES = ("hg19", "hg38", "mm10", "mm9")
+# genomes with reference genomic partitions, also used by regionstat.R with ensdb
+PARTITIONS_REFERENCE_GENOMES = ("hg19", "hg38", "mm10")
+
+
+def get_python_plot_ids(genome: str, ensdb: str = None) -> List[str]:
+    """
+    Ids of plots (and their statistics) calculated in python, that regionstat.R can skip
+
+    :param genome: genome assembly
+    :param ensdb: path to the Ensembl annotation gtf file
+    :return: list of plot ids
+    """
+    # chromosome bins are calculated in python only for genomes with bundled chrom sizes,
+    # regionstat.R creates them for other genomes
+    plot_ids = [plot_id for plot_id in REGION_PLOT_IDS if plot_id != "chrombins"]
+    chrom_sizes_found = get_genome_chrom_sizes(genome) is not None
+    if chrom_sizes_found:
+        plot_ids.append("chrombins")
+    if ensdb and ensdb != "None" and os.path.exists(ensdb):
+        if genome not in TSS_REFERENCE_GENOMES:
+            plot_ids.append("tss_distance")
+        if genome not in PARTITIONS_REFERENCE_GENOMES:
+            plot_ids += ["partitions", "cumulative_partitions"]
+            # genome size is required for expected partitions
+            if chrom_sizes_found:
+                plot_ids.append("expected_partitions")
+    return plot_ids
+
+
+def calculate_annotation_stats(
+    bed_regions: BedRegions,
+    genome: str,
+    ensdb: str,
+    bed_digest: str,
+    outfolder: str,
+    plot_ids: List[str],
+    renderer: PlotRenderer = None,
+) -> Tuple[dict, Dict[str, Future]]:
+    """
+    Calculate TSS distances and distribution over genomic partitions of the
+    annotation (ensdb gtf file), and submit their plots to the plot renderer
+
+    :param bed_regions: BedRegions object
+    :param genome: genome assembly
+    :param ensdb: path to the Ensembl annotation gtf file
+    :param bed_digest: digest of the bed file
+    :param outfolder: folder for plots
+    :param plot_ids: ids of plots to create
+    :param renderer: PlotRenderer [Default: renderer shared by the process]
+    :return: statistics, and dict of plot ids and futures of plot dicts
+    """
+    renderer = renderer or get_plot_renderer()
+    data = {}
+    plots = {}
+    if "tss_distance" in plot_ids:
+        try:
+            tss_distances = get_tss_index(ensdb).distances(bed_regions)
+            median_distance = median_tss_distance(tss_distances)
+            if median_distance is not None:
+                data["median_tss_dist"] = signif(median_distance)
+            plots["tss_distance"] = renderer.submit(
+                plot_tss_distance,
+                *tss_distance_histogram(tss_distances),
+                bed_id=bed_digest,
+                outfolder=outfolder,
+            )
+        except Exception as e:
+            _LOGGER.warning(f"Unable to calculate TSS distances: {e}")
+
+    partition_plots = {
+        "partitions": plot_partitions,
+        "expected_partitions": plot_expected_partitions,
+        "cumulative_partitions": plot_cumulative_partitions,
+    }
+    if any(plot_id in plot_ids for plot_id in partition_plots):
+        try:
+            chrom_sizes = get_genome_chrom_sizes(genome)
+            result = get_partition_map(ensdb).calculate(
+                bed_regions,
+                genome_size=sum(chrom_sizes.values()) if chrom_sizes else None,
+            )
+            if "partitions" in plot_ids:
+                data.update(result.to_stats())
+            for plot_id, plot_function in partition_plots.items():
+                if plot_id in plot_ids:
+                    plots[plot_id] = renderer.submit(
+                        plot_function, result, bed_digest, outfolder
+                    )
+        except Exception as e:
+            _LOGGER.warning(f"Unable to calculate genomic partitions: {e}")
+    return data, plots
 
 
 def get_osm_path(genome: str, out_path: str = None) -> Union[str, None]:
@@ -66,7 +201,7 @@ def get_osm_path(genome: str, out_path: str = None) -> Union[str, None]:
 
 
 def bedstat(
-    bedfile: str,
+    bedfile: Union[str, BedRegions],
     genome: str,
     outfolder: str,
     bed_digest: str = None,
@@ -75,12 +210,17 @@ def bedstat(
     just_db_commit: bool = False,
     rfg_config: Union[str, Path] = None,
     pm: pypiper.PipelineManager = None,
+    r_worker: bool = True,
+    gc_workers: int = 1,
+    gc_approximate: bool = False,
+    gc_tolerance: float = GC_APPROX_TOLERANCE,
+    defer_plots: bool = False,
 ) -> dict:
     """
     Run bedstat pipeline - pipeline for obtaining statistics about bed files
         and inserting them into the database
 
-    :param str bedfile: the full path to the bed file to process
+    :param bedfile: the full path to the bed file to process, or BedRegions object of this file
     :param str bed_digest: the digest of the bed file. Defaults to None.
     :param str open_signal_matrix: a full path to the openSignalMatrix
         required for the tissue specificity plots
@@ -91,6 +231,16 @@ def bedstat(
     :param str ensdb: a full path to the ensdb gtf file required for genomes
         not in GDdata
     :param pm: pypiper object
+    :param r_worker: run regionstat.R in the persistent R worker, so R libraries
+        are loaded once per process. If worker is not available, Rscript is used.
+    :param gc_workers: number of processes used to calculate GC content
+        (the genome is memory-mapped and shared by all processes)
+    :param gc_approximate: estimate mean GC content from a stratified sample of regions
+        (large files only), sample size and error are reported in the statistics
+    :param gc_tolerance: maximum half-width of the 95% confidence interval
+        of the approximate mean GC content
+    :param defer_plots: don't wait for plots rendered in the background. Plots in the
+        returned dict are futures, that have to be resolved with resolve_plots
 
     :return: dict with statistics and plots metadata
     """
@@ -117,8 +267,15 @@ def bedstat(
     else:
         stop_pipeline = False
 
+    bed_regions = None
+    if isinstance(bedfile, BedRegions):
+        bed_regions = bedfile
+        bed_digest = bed_digest or bedfile.identifier
+        bedfile = bedfile.path
+
     if not bed_digest:
-        bed_digest = RegionSet(bedfile).identifier
+        bed_regions = BedRegions.from_file(bedfile)
+        bed_digest = bed_regions.identifier
 
     outfolder_stats_results = os.path.abspath(os.path.join(outfolder_stats, bed_digest))
     try:
@@ -146,12 +303,7 @@ def bedstat(
                 pipestat_sample_name=bed_digest,
             )
 
-        rscript_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-            "bedstat",
-            "tools",
-            "regionstat.R",
-        )
+        rscript_path = REGIONSTAT_SCRIPT_PATH
         assert os.path.exists(rscript_path), FileNotFoundError(
             f"'{rscript_path}' script not found"
         )
@@ -159,10 +311,24 @@ def bedstat(
             f"Rscript {rscript_path} --bedfilePath={bedfile} "
             f"--fileId={bed_digest} --openSignalMatrix={open_signal_matrix} "
             f"--outputFolder={outfolder_stats_results} --genome={genome} "
-            f"--ensdb={ensdb} --digest={bed_digest}"
+            f"--ensdb={ensdb} --digest={bed_digest} "
+            f"--skipPlots={','.join(get_python_plot_ids(genome, ensdb))}"
         )
 
         try:
+            if r_worker and not os.path.exists(json_file_path):
+                try:
+                    get_regionstat_worker().run(
+                        bedfile=bedfile,
+                        digest=bed_digest,
+                        outfolder=outfolder_stats_results,
+                        genome=genome,
+                        ensdb=ensdb,
+                        open_signal_matrix=open_signal_matrix,
+                        skip_plots=get_python_plot_ids(genome, ensdb),
+                    )
+                except RWorkerException as e:
+                    _LOGGER.warning(f"R worker failed: {e}. Running Rscript.")
             pm.run(cmd=command, target=json_file_path)
         except Exception as e:
             _LOGGER.error(f"Pipeline failed: {e}")
@@ -172,39 +338,90 @@ def bedstat(
     if os.path.exists(json_file_path):
         with open(json_file_path, "r", encoding="utf-8") as f:
             data = json.loads(f.read())
+    # plots created by regionstat.R, and futures of plots rendered in python
+    plots = {}
     if os.path.exists(json_plots_file_path):
         with open(json_plots_file_path, "r", encoding="utf-8") as f_plots:
-            plots = json.loads(f_plots.read())
-    else:
-        plots = []
+            plots = {plot["name"]: plot for plot in json.loads(f_plots.read())}
 
     # unlist the data, since the output of regionstat.R is a dict of lists of
     # length 1 and force keys to lower to correspond with the
     # postgres column identifiers
     data = {k.lower(): v[0] if isinstance(v, list) else v for k, v in data.items()}
+
+    # widths, neighbor distances and chromosome bins are calculated in python
+    if bed_regions is None:
+        bed_regions = BedRegions.from_file(bedfile)
+    data.update(calculate_region_stats(bed_regions))
+    try:
+        plots.update(
+            create_region_plots(
+                regions=bed_regions,
+                genome=genome,
+                bed_id=bed_digest,
+                outfolder=outfolder_stats_results,
+                skip_plots=list(plots),
+            )
+        )
+    except Exception as e:
+        _LOGGER.warning(f"Unable to create region plots: {e}")
+
+    # TSS distances and partitions are calculated in python for user provided annotation
+    annotation_data, annotation_plots = calculate_annotation_stats(
+        bed_regions=bed_regions,
+        genome=genome,
+        ensdb=ensdb,
+        bed_digest=bed_digest,
+        outfolder=outfolder_stats_results,
+        plot_ids=[
+            plot_id
+            for plot_id in get_python_plot_ids(genome, ensdb)
+            if plot_id not in REGION_PLOT_IDS and plot_id not in plots
+        ],
+    )
+    data.update(annotation_data)
+    plots.update(annotation_plots)
+
     try:
         gc_contents = calculate_gc_content(
-            bedfile=bedfile, genome=genome, rfg_config=rfg_config
+            bedfile=bed_regions or bedfile,
+            genome=genome,
+            rfg_config=rfg_config,
+            workers=gc_workers,
+            approximate=gc_approximate,
+            tolerance=gc_tolerance,
         )
     except BaseException as e:
+        _LOGGER.warning(f"Unable to calculate GC content: {e}")
         gc_contents = None
 
-    if gc_contents:
-        gc_mean = statistics.mean(gc_contents)
+    gc_mean = None
+    if isinstance(gc_contents, GCContentEstimate):
+        if gc_contents.sample_size:
+            gc_mean = gc_contents.mean
+            data["gc_content_sample_size"] = gc_contents.sample_size
+            data["gc_content_error"] = signif(gc_contents.error)
+        gc_contents = gc_contents.gc_contents
+    elif gc_contents is not None:
+        # regions on chromosomes not in the genome assembly have no GC content
+        gc_contents = gc_contents[~np.isnan(gc_contents)]
+        if len(gc_contents):
+            gc_mean = float(gc_contents.mean())
 
+    if gc_mean is not None:
         data["gc_content"] = round(gc_mean, 2)
 
-        gc_plot = create_gc_plot(
-            bed_id=bed_digest,
-            gc_contents=gc_contents,
-            outfolder=os.path.join(outfolder_stats_results),
+        plots["gccontent"] = get_plot_renderer().submit(
+            plot_gc_content,
+            *calculate_gc_density(gc_contents),
             gc_mean=gc_mean,
+            bed_id=bed_digest,
+            outfolder=outfolder_stats_results,
         )
-        plots.append(gc_plot)
 
-    for plot in plots:
-        plot_id = plot["name"]
-        data.update({plot_id: plot})
+    data.update(plots)
+    if not defer_plots:
+        resolve_plots(data)
 
     if "md5sum" in data:
         del data["md5sum"]
@@ -212,7 +429,121 @@ def bedstat(
     if "name" in data:
         del data["name"]
 
-    if stop_pipeline:
+    if stop_pipeline and pm:
         pm.stop_pipeline()
 
     return data
+
+
+def bedstat_batch(
+    bedfiles: List[Union[str, BedRegions]],
+    genome: Union[str, List[str]],
+    outfolder: str,
+    bed_digests: List[str] = None,
+    ensdb: str = None,
+    rfg_config: Union[str, Path] = None,
+    workers: int = 1,
+    collect: bool = True,
+    pm: pypiper.PipelineManager = None,
+) -> Dict[str, dict]:
+    """
+    Run bedstat for many bed files at once. regionstat.R is started only once for all
+    files without statistics (R libraries and annotations are loaded once), and then
+    results are collected for each file the same way as in bedstat.
+
+    :param bedfiles: list of paths to the bed files, or BedRegions objects
+    :param genome: genome assembly of all files, or list of genomes of each file
+    :param outfolder: the folder for storing the pipeline results (the same as in bedstat)
+    :param bed_digests: list of digests of the bed files. Calculated if not provided
+    :param ensdb: a full path to the ensdb gtf file required for genomes not in GDdata
+    :param rfg_config: path to the refgenie config file
+    :param workers: number of BiocParallel workers used by regionstat.R
+    :param collect: collect results of each file (incl. GC content). If False,
+        only regionstat.R outputs are created, and values of the returned dict are None
+    :param pm: pypiper object
+
+    :return: dict of bed digests and bedstat results. Files that failed are not included
+    """
+    if isinstance(genome, str):
+        genome = [genome] * len(bedfiles)
+    if not bed_digests:
+        bed_digests = [None] * len(bedfiles)
+    if not len(bedfiles) == len(genome) == len(bed_digests):
+        raise BedBossException(
+            "Number of bed files, genomes and digests in bedstat batch is different."
+        )
+
+    jobs = []
+    for bedfile, bed_genome, bed_digest in zip(bedfiles, genome, bed_digests):
+        if isinstance(bedfile, BedRegions):
+            bed_digest = bed_digest or bedfile.identifier
+            bedfile = bedfile.path
+        if not bed_digest:
+            bed_digest = BedRegions.from_file(bedfile).identifier
+        jobs.append((bedfile, bed_genome, bed_digest))
+
+    outfolder_stats = os.path.join(outfolder, OUTPUT_FOLDER_NAME, BEDSTAT_OUTPUT)
+    manifest_rows = []
+    for bedfile, bed_genome, bed_digest in jobs:
+        results_folder = os.path.abspath(os.path.join(outfolder_stats, bed_digest))
+        if not os.path.exists(os.path.join(results_folder, bed_digest + ".json")):
+            os.makedirs(results_folder, exist_ok=True)
+            manifest_rows.append(
+                [os.path.abspath(bedfile), bed_digest, bed_genome, results_folder]
+            )
+
+    if manifest_rows:
+        manifest_id = hashlib.md5(
+            "".join(row[1] for row in manifest_rows).encode()
+        ).hexdigest()
+        manifest_path = os.path.abspath(
+            os.path.join(outfolder_stats, f"regionstat_manifest_{manifest_id}.tsv")
+        )
+        with open(manifest_path, "w") as f:
+            f.write("bedfilePath\tdigest\tgenome\toutputFolder\tensdb\tskipPlots\n")
+            for row in manifest_rows:
+                f.write(
+                    "\t".join(
+                        row + [str(ensdb), ",".join(get_python_plot_ids(row[2], ensdb))]
+                    )
+                    + "\n"
+                )
+
+        stop_pipeline = not pm
+        if not pm:
+            pm = pypiper.PipelineManager(
+                name="bedstat-batch-pipeline",
+                outfolder=os.path.abspath(os.path.join(outfolder_stats, "pypiper")),
+            )
+        _LOGGER.info(f"Running regionstat.R for {len(manifest_rows)} bed files")
+        try:
+            pm.run(
+                cmd=f"Rscript {REGIONSTAT_SCRIPT_PATH} --manifest={manifest_path} --cores={workers}",
+                lock_name=f"regionstat_manifest_{manifest_id}",
+            )
+        except Exception as e:
+            _LOGGER.error(f"Pipeline failed: {e}")
+            raise BedBossException(f"Pipeline failed: {e}")
+        finally:
+            if stop_pipeline:
+                pm.stop_pipeline()
+
+    results = {}
+    for bedfile, bed_genome, bed_digest in jobs:
+        json_file_path = os.path.join(outfolder_stats, bed_digest, bed_digest + ".json")
+        if not os.path.exists(json_file_path):
+            _LOGGER.warning(f"bedstat failed for {bedfile}: no statistics found.")
+            continue
+        if not collect:
+            results[bed_digest] = None
+            continue
+        results[bed_digest] = bedstat(
+            bedfile=bedfile,
+            genome=bed_genome,
+            outfolder=outfolder,
+            bed_digest=bed_digest,
+            ensdb=ensdb,
+            just_db_commit=True,
+            rfg_config=rfg_config,
+        )
+    return results
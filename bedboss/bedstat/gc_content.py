@@ -1,19 +1,45 @@
 import logging
+import multiprocessing
 import os
-from typing import List, Union
+import statistics
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Tuple, Union
 
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
+import pandas as pd
 from gdrs import GenomeAssembly, calc_gc_content
-from matplotlib.ticker import MaxNLocator
 from refgenconf import RefgenconfError
 from yacman.exceptions import UndefinedAliasError
 
+from bedboss.bed_regions import BedRegions
 from bedboss.bedmaker.utils import get_rgc
+from bedboss.bedstat.genome_store import GenomeStore, get_genome_store
+from bedboss.exceptions import BedBossException
 
 _LOGGER = logging.getLogger("bedboss")
 
+# maximum number of regions in one chunk of GC content calculation,
+# chromosomes with more regions are split to several chunks
+GC_CHUNK_SIZE = 500_000
+# approximate GC content: files with fewer regions are always calculated exactly
+GC_APPROX_MIN_REGIONS = 100_000
+GC_APPROX_INITIAL_SAMPLE = 10_000
+# maximum half-width of the confidence interval of the mean GC content
+GC_APPROX_TOLERANCE = 0.001
+GC_APPROX_CONFIDENCE = 0.95
+# regions of each chromosome are stratified by width quantiles
+GC_APPROX_WIDTH_STRATA = 4
+# density of GC content: number of histogram bins, and the kernel range (in bandwidths)
+# beyond the data (the same as seaborn.kdeplot cut)
+GC_DENSITY_BINS = 512
+GC_DENSITY_CUT = 3
+
 assembly_objects = {}
+_assembly_lock = threading.Lock()
+# genome store of the GC worker process
+_worker_store = None
 
 
 def get_genome_fasta_file(genome: str, rfg_config: str = None) -> str:
@@ -58,84 +84,346 @@ def get_genome_assembly_obj(
 
     :return: assembly object
     """
-    if genome in assembly_objects:
+    with _assembly_lock:
+        if genome not in assembly_objects:
+            try:
+                assembly_objects[genome] = GenomeAssembly(
+                    get_genome_fasta_file(genome, rfg_config=rfg_config)
+                )
+            except Exception as e:
+                _LOGGER.error(f"Could not get assembly object for {genome}: {e}")
+                return None
         return assembly_objects[genome]
-    else:
-        try:
-            assembly_objects[genome] = GenomeAssembly(
-                get_genome_fasta_file(genome, rfg_config=rfg_config)
-            )
-            return assembly_objects[genome]
-        except Exception as e:
-            _LOGGER.error(f"Could not get assembly object for {genome}: {e}")
-            return None
 
 
-def calculate_gc_content(
-    bedfile: str, genome: str, rfg_config: str = None
-) -> Union[List[float], None]:
+def _init_gc_worker(store_folder: str) -> None:
     """
-    Calculate GC content for a bed file.
+    Open (memory-map) the genome store once in each worker process
 
-    :param bedfile: path to bed file
-    :param genome: genome name
-    :param rfg_config: path to refgenie config file
+    :param store_folder: path to the genome store folder
+    """
+    global _worker_store
+    _worker_store = GenomeStore(store_folder)
 
-    :return: list of GC contents
+
+def _calc_chunk_gc_content(
+    chrom: str, starts: np.ndarray, ends: np.ndarray
+) -> np.ndarray:
     """
+    Calculate GC content of one chunk in the worker process
 
-    assembly_obj = get_genome_assembly_obj(genome, rfg_config=rfg_config)
-    if assembly_obj is None:
-        return None
+    :param chrom: chromosome of the chunk
+    :param starts: start positions of regions
+    :param ends: end positions of regions
+    :return: array of GC contents
+    """
+    return _worker_store.chrom_gc_content(chrom, starts, ends)
+
+
+def _split_chunks(
+    regions: BedRegions, chunk_size: int = GC_CHUNK_SIZE
+) -> List[np.ndarray]:
+    """
+    Split regions to chunks of one chromosome
 
-    gc_contents = calc_gc_content(
-        bedfile,
-        assembly_obj,
-        ignore_unk_chroms=True,
+    :param regions: BedRegions object
+    :param chunk_size: maximum number of regions in a chunk
+    :return: list of arrays with indices of regions in each chunk, in original order
+    """
+    order = np.argsort(regions.chrom_codes, kind="stable")
+    bounds = np.searchsorted(
+        regions.chrom_codes[order], np.arange(len(regions.chrom_names) + 1)
     )
+    chunks = []
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        for chunk_start in range(start, end, chunk_size):
+            chunks.append(order[chunk_start : min(chunk_start + chunk_size, end)])
+    return chunks
+
+
+def _calc_gdrs_gc_content(
+    regions: BedRegions, assembly_obj: GenomeAssembly
+) -> np.ndarray:
+    """
+    Calculate GC content with gdrs, one chromosome at a time. gdrs returns results
+    grouped by chromosome, so they are assigned back to regions for each chunk.
+
+    :param regions: BedRegions object
+    :param assembly_obj: assembly object
+    :return: array of GC contents, in order of regions
+    """
+    gc_contents = np.full(len(regions), np.nan)
+    with tempfile.TemporaryDirectory(prefix="bedboss_gc_") as temp_dir:
+        for index, chunk in enumerate(_split_chunks(regions)):
+            chunk_file = os.path.join(temp_dir, f"chunk_{index}.bed")
+            pd.DataFrame(
+                {
+                    "chrom": regions.chrom_names[regions.chrom_codes[chunk]],
+                    "start": regions.starts[chunk],
+                    "end": regions.ends[chunk],
+                }
+            ).to_csv(chunk_file, sep="\t", header=False, index=False)
+            result = calc_gc_content(chunk_file, assembly_obj, ignore_unk_chroms=True)
+            if not result:
+                continue
+            if len(result) != len(chunk):
+                raise BedBossException(
+                    f"GC content of {len(result)} regions returned for {len(chunk)} regions"
+                )
+            gc_contents[chunk] = result
     return gc_contents
 
 
-def create_gc_plot(
-    bed_id: str, gc_contents: List[float], outfolder: str, gc_mean: float
-) -> dict:
+class GCContentEstimate(NamedTuple):
+    """
+    Mean GC content estimated from a stratified sample of regions
+    """
+
+    mean: float
+    # half-width of the confidence interval of the mean
+    error: float
+    sample_size: int
+    # GC contents of the sampled regions
+    gc_contents: np.ndarray
+
+
+def _regions_gc_content(
+    store: GenomeStore, regions: BedRegions, indices: np.ndarray
+) -> np.ndarray:
+    """
+    GC content of the selected regions
+
+    :param store: GenomeStore
+    :param regions: BedRegions object
+    :param indices: indices of regions
+    :return: array of GC contents, in order of indices
+    """
+    gc_contents = np.empty(len(indices))
+    codes = regions.chrom_codes[indices]
+    for code in np.unique(codes).tolist():
+        mask = codes == code
+        gc_contents[mask] = store.chrom_gc_content(
+            regions.chrom_names[code],
+            regions.starts[indices[mask]],
+            regions.ends[indices[mask]],
+        )
+    return gc_contents
+
+
+def estimate_gc_content(
+    regions: BedRegions,
+    store: GenomeStore,
+    tolerance: float = GC_APPROX_TOLERANCE,
+    confidence: float = GC_APPROX_CONFIDENCE,
+    initial_sample_size: int = GC_APPROX_INITIAL_SAMPLE,
+    seed: int = 0,
+) -> GCContentEstimate:
+    """
+    Estimate mean GC content from a sample of regions, stratified by chromosome and
+    width quantile (proportional allocation). Sample is doubled until the confidence
+    interval of the mean is narrower than the tolerance, or all regions are sampled.
+
+    :param regions: BedRegions object
+    :param store: GenomeStore of the genome
+    :param tolerance: maximum half-width of the confidence interval
+    :param confidence: confidence level of the interval
+    :param initial_sample_size: size of the first sample
+    :param seed: seed of the random generator
+    :return: GCContentEstimate
+    """
+    chrom_sizes = store.chrom_sizes
+    chrom_lengths = np.array(
+        [chrom_sizes.get(chrom, -1) for chrom in regions.chrom_names], dtype=np.int64
+    )
+    # regions without GC content (unknown chromosome, outside of chromosome) are not sampled
+    indices = np.flatnonzero(
+        (regions.starts >= 0)
+        & (regions.ends > regions.starts)
+        & (regions.ends <= chrom_lengths[regions.chrom_codes])
+    )
+    if not len(indices):
+        return GCContentEstimate(
+            mean=float("nan"),
+            error=float("nan"),
+            sample_size=0,
+            gc_contents=np.zeros(0),
+        )
+
+    widths = regions.widths[indices]
+    width_edges = np.unique(
+        np.quantile(widths, np.linspace(0, 1, GC_APPROX_WIDTH_STRATA + 1)[1:-1])
+    )
+    n_width_strata = len(width_edges) + 1
+    strata = regions.chrom_codes[indices].astype(np.int64) * n_width_strata + (
+        np.searchsorted(width_edges, widths, side="right")
+    )
+    stratum_sizes = np.bincount(
+        strata, minlength=len(regions.chrom_names) * n_width_strata
+    )
+    # regions of each stratum in random order (stable sort of randomly permuted regions),
+    # sample is a prefix of each stratum. Small integers are sorted with radix sort.
+    strata = strata.astype(np.int16 if len(stratum_sizes) < 2**15 else np.int32)
+    permutation = np.random.default_rng(seed).permutation(len(indices))
+    order = permutation[np.argsort(strata[permutation], kind="stable")]
+    stratum_starts = np.cumsum(stratum_sizes) - stratum_sizes
+    weights = stratum_sizes / len(indices)
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+
+    taken = np.zeros(len(stratum_sizes), dtype=np.int64)
+    sums = np.zeros(len(stratum_sizes))
+    squares = np.zeros(len(stratum_sizes))
+    samples = []
+    sample_size = initial_sample_size
+    while True:
+        # at least 2 regions of each stratum, to estimate its variance
+        target = np.minimum(
+            np.maximum(np.ceil(weights * sample_size).astype(np.int64), 2),
+            stratum_sizes,
+        )
+        counts = target - taken
+        offsets = np.cumsum(counts) - counts
+        positions = np.repeat(stratum_starts + taken - offsets, counts) + np.arange(
+            counts.sum()
+        )
+        gc_contents = _regions_gc_content(store, regions, indices[order[positions]])
+        sample_strata = strata[order[positions]]
+        sums += np.bincount(
+            sample_strata, weights=gc_contents, minlength=len(stratum_sizes)
+        )
+        squares += np.bincount(
+            sample_strata, weights=gc_contents**2, minlength=len(stratum_sizes)
+        )
+        samples.append(gc_contents)
+        taken = target
+
+        # empty strata have zero weight
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.where(taken > 0, sums / taken, 0)
+            variances = np.where(
+                taken > 1, (squares - taken * means**2) / (taken - 1), 0
+            ).clip(min=0)
+            # variance of the stratified mean, with finite population correction
+            variance = np.sum(
+                np.where(
+                    taken > 0,
+                    weights**2 * variances / taken * (1 - taken / stratum_sizes),
+                    0,
+                )
+            )
+        error = z * float(np.sqrt(variance))
+        if error <= tolerance or (taken == stratum_sizes).all():
+            break
+        sample_size *= 2
+
+    return GCContentEstimate(
+        mean=float(np.sum(weights * means)),
+        error=error,
+        sample_size=int(taken.sum()),
+        gc_contents=np.concatenate(samples),
+    )
+
+
+def calculate_gc_content(
+    bedfile: Union[str, BedRegions],
+    genome: str,
+    rfg_config: str = None,
+    workers: int = 1,
+    approximate: bool = False,
+    tolerance: float = GC_APPROX_TOLERANCE,
+) -> Union[np.ndarray, GCContentEstimate, None]:
     """
-    Create a GC content plot.
+    Calculate GC content for a bed file. GC content is calculated from the memory-mapped
+    genome store (fasta file is converted on the first use). With more than one worker,
+    regions are split to chunks of one chromosome, that are processed in parallel
+    and share the memory-mapped genome.
 
-    :param bed_id: bed ID
-    :param gc_contents: list of GC contents
-    :param outfolder: path to output file
-    :param gc_mean: mean GC content
+    :param bedfile: path to bed file, or BedRegions object of this file
+    :param genome: genome name
+    :param rfg_config: path to refgenie config file
+    :param workers: number of worker processes
+    :param approximate: estimate mean GC content from a sample of regions,
+        files with less than GC_APPROX_MIN_REGIONS regions are calculated exactly
+    :param tolerance: maximum half-width of the confidence interval of the approximate mean
 
-    :return str: path to output file
+    :return: array of GC contents, in order of regions in the file
+        (regions on chromosomes not in the assembly have NaN),
+        or GCContentEstimate in approximate mode
     """
-    plt.rcParams["font.size"] = 10
-    plt.figure(figsize=(8, 8))
-    sns.kdeplot(gc_contents, linewidth=0.8, color="black")
-    plt.gca().xaxis.set_major_locator(MaxNLocator(nbins=5))
+    try:
+        fasta_file = get_genome_fasta_file(genome, rfg_config=rfg_config)
+    except Exception as e:
+        _LOGGER.error(f"Could not get fasta file for {genome}: {e}")
+        return None
 
-    plt.axvline(
-        gc_mean,
-        color="r",
-        linestyle="--",
-        linewidth=0.8,
-        label=f"Mean: {gc_mean:.2f}",
+    regions = (
+        bedfile if isinstance(bedfile, BedRegions) else BedRegions.from_file(bedfile)
     )
-    sns.despine()
-    plt.xlabel("GC Content")
-    plt.legend()
+    try:
+        store = get_genome_store(fasta_file)
+    except OSError as e:
+        _LOGGER.warning(
+            f"Unable to create genome store of {genome}, calculating GC content with gdrs: {e}"
+        )
+        assembly_obj = get_genome_assembly_obj(genome, rfg_config=rfg_config)
+        if assembly_obj is None:
+            return None
+        return _calc_gdrs_gc_content(regions, assembly_obj)
 
-    plt.title("GC Content Distribution")
+    if approximate and len(regions) >= GC_APPROX_MIN_REGIONS:
+        return estimate_gc_content(regions, store, tolerance=tolerance)
 
-    pdf_path = os.path.join(outfolder, f"{bed_id}_gccontent.pdf")
-    png_path = os.path.join(outfolder, f"{bed_id}_gccontent.png")
+    chunks = _split_chunks(regions)
+    if workers <= 1 or len(chunks) <= 1:
+        return store.gc_content(regions)
 
-    plt.savefig(pdf_path)
-    plt.savefig(png_path)
+    gc_contents = np.full(len(regions), np.nan)
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_gc_worker,
+        initargs=(store.folder,),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _calc_chunk_gc_content,
+                regions.chrom_names[regions.chrom_codes[chunk[0]]],
+                regions.starts[chunk],
+                regions.ends[chunk],
+            )
+            for chunk in chunks
+        ]
+        for chunk, future in zip(chunks, futures):
+            gc_contents[chunk] = future.result()
+    return gc_contents
+
+
+def calculate_gc_density(
+    gc_contents: np.ndarray, bins: int = GC_DENSITY_BINS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gaussian kernel density of GC contents, with Scott's rule bandwidth
+    (as seaborn.kdeplot). Values are binned to a histogram, that is convolved
+    with the kernel, so the cost doesn't depend on the number of regions.
+
+    :param gc_contents: array of GC contents
+    :param bins: number of histogram bins
+    :return: grid (bin centers) and density at the grid points
+    """
+    gc_contents = gc_contents[np.isfinite(gc_contents)]
+    bandwidth = float(np.std(gc_contents, ddof=1)) if len(gc_contents) > 1 else 0.0
+    bandwidth = max(bandwidth * len(gc_contents) ** (-1 / 5), 1e-3)
+    low = gc_contents.min() - GC_DENSITY_CUT * bandwidth
+    high = gc_contents.max() + GC_DENSITY_CUT * bandwidth
+    counts, edges = np.histogram(gc_contents, bins=bins, range=(low, high))
+    bin_width = edges[1] - edges[0]
+    grid = (edges[:-1] + edges[1:]) / 2
 
-    return {
-        "name": "gccontent",
-        "title": "GC Content Distribution",
-        "thumbnail_path": png_path,
-        "path": pdf_path,
-    }
+    half_width = int(np.ceil(GC_DENSITY_CUT * bandwidth / bin_width))
+    offsets = np.arange(-half_width, half_width + 1) * bin_width
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (
+        bandwidth * np.sqrt(2 * np.pi)
+    )
+    density = np.convolve(counts, kernel, mode="full")[
+        half_width : half_width + bins
+    ] / len(gc_contents)
+    return grid, density
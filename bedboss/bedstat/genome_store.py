@@ -0,0 +1,281 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+from bedboss.bed_regions import GZIP_MAGIC_NUMBER, BedRegions
+from bedboss.const import PKG_NAME
+from bedboss.exceptions import BedBossException
+from bedboss.refgenome_validator.genome_registry import get_cache_folder
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# store is rebuilt if the format changes
+GENOME_STORE_VERSION = 1
+GENOME_STORE_FOLDER = "genomes"
+# number of bases in a block: every base stores the GC count from the start of its block
+# (fits uint8), and every block stores the GC count from the start of the chromosome
+GC_BLOCK_SIZE = 256
+# number of bases converted at once
+CONVERT_SLICE_SIZE = 64 * GC_BLOCK_SIZE * 1024
+
+# G and C (any case) are counted, the same as gdrs.calc_gc_content
+_GC_LOOKUP = np.zeros(256, dtype=np.uint8)
+_GC_LOOKUP[list(b"GCgc")] = 1
+
+_LOCK = threading.Lock()
+_GENOME_STORES: Dict[Tuple[str, int, int], "GenomeStore"] = {}
+
+
+def _read_fasta(fasta_file: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    Read sequences of the fasta file (plain or gzipped)
+
+    :param fasta_file: path to the fasta file
+    :return: iterator of chromosome names and sequences
+    """
+    with open(fasta_file, "rb") as f:
+        is_gzipped = f.read(2) == GZIP_MAGIC_NUMBER
+    opener = gzip.open if is_gzipped else open
+
+    with opener(fasta_file, "rb") as f:
+        name = None
+        lines = []
+        for line in f:
+            if line.startswith(b">"):
+                if name is not None:
+                    yield name, b"".join(lines)
+                name = line[1:].split()[0].decode()
+                lines = []
+            else:
+                lines.append(line.strip())
+        if name is not None:
+            yield name, b"".join(lines)
+
+
+def _encode_chromosome(sequence: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode chromosome sequence: for each position p (and the position after the last base),
+    GC count in [block start, p), and for each block, GC count in [chromosome start, block start)
+
+    :param sequence: chromosome sequence
+    :return: arrays of base and block GC counts
+    """
+    length = len(sequence) + 1
+    n_blocks = -(-length // GC_BLOCK_SIZE)
+    is_gc = np.zeros(n_blocks * GC_BLOCK_SIZE, dtype=np.uint8)
+    is_gc[: len(sequence)] = _GC_LOOKUP[np.frombuffer(sequence, dtype=np.uint8)]
+
+    bases = np.empty(length, dtype=np.uint8)
+    block_totals = np.empty(n_blocks, dtype=np.int64)
+    for start in range(0, len(is_gc), CONVERT_SLICE_SIZE):
+        blocks = is_gc[start : start + CONVERT_SLICE_SIZE].reshape(-1, GC_BLOCK_SIZE)
+        inclusive = np.cumsum(blocks, axis=1, dtype=np.uint16)
+        exclusive = (inclusive - blocks).astype(np.uint8).ravel()
+        end = min(start + len(exclusive), length)
+        bases[start:end] = exclusive[: end - start]
+        block_start = start // GC_BLOCK_SIZE
+        block_totals[block_start : block_start + len(blocks)] = inclusive[:, -1]
+
+    block_counts = np.concatenate([[0], np.cumsum(block_totals)[:-1]])
+    return bases, block_counts.astype(np.uint32)
+
+
+class GenomeStore:
+    """
+    Genome sequence packed for GC content calculation: one byte per base, memory-mapped
+    read only, so all processes and threads using the genome share one copy in the page cache.
+    GC count of any range is calculated from two bytes and two block counts.
+    """
+
+    def __init__(self, folder: str):
+        """
+        :param folder: path to the store folder, created with GenomeStore.build
+        """
+        with open(os.path.join(folder, "index.json")) as f:
+            index = json.load(f)
+        if index.get("version") != GENOME_STORE_VERSION:
+            raise ValueError(
+                f"Unsupported genome store version: {index.get('version')}"
+            )
+        self.folder = folder
+        self.block_size = index["block_size"]
+        self.chroms = {chrom["name"]: chrom for chrom in index["chroms"]}
+
+        self._bases = np.memmap(
+            os.path.join(folder, "bases.u8"), dtype=np.uint8, mode="r"
+        )
+        self._blocks = np.load(
+            os.path.join(folder, "blocks.npy"), mmap_mode="r", allow_pickle=False
+        )
+
+    @property
+    def chrom_sizes(self) -> Dict[str, int]:
+        """
+        Dict of chromosome names and lengths
+        """
+        return {name: chrom["length"] for name, chrom in self.chroms.items()}
+
+    @classmethod
+    def build(cls, fasta_file: str, folder: str) -> "GenomeStore":
+        """
+        Convert the fasta file to the store. Folder is written atomically: it is created
+        in a temporary location and renamed when complete.
+
+        :param fasta_file: path to the fasta file (plain or gzipped)
+        :param folder: path to the store folder
+        :return: GenomeStore
+        """
+        parent = os.path.dirname(os.path.abspath(folder))
+        os.makedirs(parent, exist_ok=True)
+        temp_folder = tempfile.mkdtemp(suffix=".tmp", dir=parent)
+        try:
+            chroms = []
+            blocks = []
+            offset = 0
+            block_offset = 0
+            with open(os.path.join(temp_folder, "bases.u8"), "wb") as f:
+                for name, sequence in _read_fasta(fasta_file):
+                    bases, block_counts = _encode_chromosome(sequence)
+                    f.write(bases.tobytes())
+                    blocks.append(block_counts)
+                    chroms.append(
+                        {
+                            "name": name,
+                            "length": len(sequence),
+                            "offset": offset,
+                            "block_offset": block_offset,
+                        }
+                    )
+                    offset += len(bases)
+                    block_offset += len(block_counts)
+            if not chroms:
+                raise BedBossException(f"No sequences found in: {fasta_file}")
+
+            np.save(os.path.join(temp_folder, "blocks.npy"), np.concatenate(blocks))
+            with open(os.path.join(temp_folder, "index.json"), "w") as f:
+                json.dump(
+                    {
+                        "version": GENOME_STORE_VERSION,
+                        "fasta_file": os.path.abspath(fasta_file),
+                        "block_size": GC_BLOCK_SIZE,
+                        "chroms": chroms,
+                    },
+                    f,
+                )
+            try:
+                os.rename(temp_folder, folder)
+            except OSError:
+                # store was built by another process in the meantime
+                if not os.path.exists(os.path.join(folder, "index.json")):
+                    raise
+        finally:
+            shutil.rmtree(temp_folder, ignore_errors=True)
+        return cls(folder)
+
+    def _gc_counts(self, chrom: dict, positions: np.ndarray) -> np.ndarray:
+        """
+        GC count in [chromosome start, position)
+        """
+        return (
+            self._blocks[chrom["block_offset"] + positions // self.block_size].astype(
+                np.int64
+            )
+            + self._bases[chrom["offset"] + positions]
+        )
+
+    def chrom_gc_content(
+        self, chrom: str, starts: np.ndarray, ends: np.ndarray
+    ) -> np.ndarray:
+        """
+        GC content of regions of one chromosome: number of G and C bases / region width
+
+        :param chrom: chromosome name
+        :param starts: start positions of regions (0-based)
+        :param ends: end positions of regions
+        :return: array of GC contents. Regions on chromosomes not in the genome,
+            outside of the chromosome, or with zero width have NaN.
+        """
+        gc_contents = np.full(len(starts), np.nan)
+        if chrom not in self.chroms:
+            return gc_contents
+        chrom = self.chroms[chrom]
+        valid = (starts >= 0) & (ends > starts) & (ends <= chrom["length"])
+        starts = starts[valid]
+        ends = ends[valid]
+        gc_contents[valid] = (
+            self._gc_counts(chrom, ends) - self._gc_counts(chrom, starts)
+        ) / (ends - starts)
+        return gc_contents
+
+    def gc_content(self, regions: BedRegions) -> np.ndarray:
+        """
+        GC content of regions
+
+        :param regions: BedRegions object
+        :return: array of GC contents, in order of regions
+        """
+        gc_contents = np.full(len(regions), np.nan)
+        for code, chrom in enumerate(regions.chrom_names.tolist()):
+            indices = np.flatnonzero(regions.chrom_codes == code)
+            gc_contents[indices] = self.chrom_gc_content(
+                chrom, regions.starts[indices], regions.ends[indices]
+            )
+        return gc_contents
+
+
+def get_genome_store_folder(fasta_file: str, cache_folder: str = None) -> str:
+    """
+    Get folder of the genome store of the fasta file. Folder changes if the file changes.
+
+    :param fasta_file: path to the fasta file
+    :param cache_folder: bedboss cache folder [Default: BEDBOSS_CACHE or ~/.cache/bedboss]
+    :return: path to the store folder
+    """
+    stat = os.stat(fasta_file)
+    key = hashlib.sha256(
+        f"{os.path.abspath(fasta_file)}\t{stat.st_size}\t{stat.st_mtime_ns}".encode()
+    ).hexdigest()[:32]
+    return os.path.join(
+        cache_folder or get_cache_folder(),
+        GENOME_STORE_FOLDER,
+        f"{key}_v{GENOME_STORE_VERSION}",
+    )
+
+
+def get_genome_store(fasta_file: str, cache_folder: str = None) -> GenomeStore:
+    """
+    Get genome store of the fasta file. Fasta file is converted on the first use,
+    and the store is opened once per process (thread-safe).
+
+    :param fasta_file: path to the fasta file
+    :param cache_folder: bedboss cache folder [Default: BEDBOSS_CACHE or ~/.cache/bedboss]
+    :return: GenomeStore
+    """
+    stat = os.stat(fasta_file)
+    key = (os.path.abspath(fasta_file), stat.st_size, stat.st_mtime_ns)
+    with _LOCK:
+        if key in _GENOME_STORES:
+            return _GENOME_STORES[key]
+
+        folder = get_genome_store_folder(fasta_file, cache_folder)
+        store = None
+        if os.path.exists(os.path.join(folder, "index.json")):
+            try:
+                store = GenomeStore(folder)
+            except (OSError, ValueError, KeyError) as err:
+                _LOGGER.warning(f"Unable to read genome store {folder}: {err}")
+                shutil.rmtree(folder, ignore_errors=True)
+        if store is None:
+            _LOGGER.info(f"Converting {fasta_file} to genome store: {folder}")
+            store = GenomeStore.build(fasta_file, folder)
+
+        _GENOME_STORES[key] = store
+        return store
@@ -0,0 +1,290 @@
+import logging
+import math
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bedboss.bed_regions import BedRegions
+from bedboss.bedstat.annotation import read_gtf
+from bedboss.const import PKG_NAME
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# partitions in order of priority, the same as GenomicDistributions::genomePartitionList.
+# Region is assigned to the first partition it overlaps, or to intergenic
+PARTITION_NAMES = [
+    "promoterCore",
+    "promoterProx",
+    "threeUTR",
+    "fiveUTR",
+    "exon",
+    "intron",
+    "intergenic",
+]
+INTERGENIC = len(PARTITION_NAMES) - 1
+CORE_PROMOTER_SIZE = 100
+PROXIMAL_PROMOTER_SIZE = 2000
+
+
+class PartitionsResult(NamedTuple):
+    """
+    Observed, expected and cumulative distribution of regions over partitions.
+    All arrays are in order of PARTITION_NAMES
+    """
+
+    observed: np.ndarray
+    expected: np.ndarray
+    # cumulative distributions: sorted sizes of region pieces overlapping the partition,
+    # and the cumulative fraction of the partition they cover
+    cumulative: Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+    @property
+    def log10_oe(self) -> np.ndarray:
+        """
+        log10 of observed / expected ratio
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.log10(self.observed / self.expected)
+
+    @property
+    def pvalues(self) -> List[float]:
+        """
+        Chi-square (1 degree of freedom) p-values of observed vs expected counts
+        """
+        total = self.observed.sum()
+        pvalues = []
+        for observed, expected in zip(self.observed.tolist(), self.expected.tolist()):
+            if not expected or expected >= total:
+                pvalues.append(float("nan"))
+                continue
+            chi2 = (observed - expected) ** 2 / expected + (
+                observed - expected
+            ) ** 2 / (total - expected)
+            pvalues.append(math.erfc(math.sqrt(chi2 / 2)))
+        return pvalues
+
+    def to_stats(self) -> dict:
+        """
+        Statistics with the same keys as regionstat.R: <partition>_frequency
+        and <partition>_percentage (keys are lower case, as in the database)
+        """
+        total = self.observed.sum()
+        stats = {}
+        for name, count in zip(PARTITION_NAMES, self.observed.tolist()):
+            stats[f"{name.lower()}_frequency"] = count
+            stats[f"{name.lower()}_percentage"] = count / total if total else 0.0
+        return stats
+
+
+class PartitionMap:
+    """
+    Priority-flattened, non-overlapping genome partitions.
+    Each chromosome is covered by consecutive segments: segment i starts at
+    boundaries[i], ends at boundaries[i + 1], and has label labels[i] (index in PARTITION_NAMES).
+    Positions outside of annotated segments are intergenic.
+    """
+
+    def __init__(self, segments: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        """
+        :param segments: dict of chromosome names and (boundaries, labels) arrays,
+            boundaries has one element more than labels
+        """
+        self.segments = segments
+
+    @classmethod
+    def from_partition_list(cls, partitions: Dict[str, pd.DataFrame]) -> "PartitionMap":
+        """
+        Flatten (possibly overlapping) partitions: every base gets the label
+        of the partition with the highest priority that covers it.
+
+        :param partitions: dict of partition names and data frames with chrom, start and end columns
+        :return: PartitionMap
+        """
+        intervals = pd.concat(
+            [
+                df[["chrom", "start", "end"]].assign(label=PARTITION_NAMES.index(name))
+                for name, df in partitions.items()
+            ],
+            ignore_index=True,
+        )
+        intervals = intervals[intervals["end"] > intervals["start"]]
+
+        segments = {}
+        for chrom, indices in intervals.groupby("chrom").indices.items():
+            starts = intervals["start"].to_numpy()[indices]
+            ends = intervals["end"].to_numpy()[indices]
+            labels = intervals["label"].to_numpy()[indices]
+
+            boundaries = np.unique(np.concatenate([[0], starts, ends]))
+            segment_labels = np.full(len(boundaries), INTERGENIC, dtype=np.int8)
+            start_indices = np.searchsorted(boundaries, starts)
+            end_indices = np.searchsorted(boundaries, ends)
+            # highest priority (lowest label) is written last
+            for label in sorted(set(labels.tolist()), reverse=True):
+                mask = labels == label
+                coverage = np.bincount(
+                    start_indices[mask], minlength=len(boundaries)
+                ) - np.bincount(end_indices[mask], minlength=len(boundaries))
+                segment_labels[np.cumsum(coverage) > 0] = label
+
+            # merge neighboring segments with the same label
+            keep = np.concatenate([[True], segment_labels[1:] != segment_labels[:-1]])
+            boundaries = np.append(boundaries[keep], np.iinfo(np.int64).max)
+            segments[chrom] = (boundaries, segment_labels[keep])
+        return cls(segments)
+
+    @classmethod
+    def from_gene_models(
+        cls,
+        gene_models: pd.DataFrame,
+        core_promoter_size: int = CORE_PROMOTER_SIZE,
+        proximal_promoter_size: int = PROXIMAL_PROMOTER_SIZE,
+    ) -> "PartitionMap":
+        """
+        Create partitions from gene models (GenomicDistributions::genomePartitionList):
+        promoters upstream of genes, UTRs, exons, and introns (rest of the genes)
+
+        :param gene_models: data frame from read_gtf with gene, exon and UTR features
+        :param core_promoter_size: size of the core promoter (bp)
+        :param proximal_promoter_size: size of the proximal promoter (bp)
+        :return: PartitionMap
+        """
+        features = {
+            feature: df for feature, df in gene_models.groupby("feature", sort=False)
+        }
+        empty = gene_models.iloc[:0]
+        genes = features.get("gene", empty)
+
+        def promoters(size: int) -> pd.DataFrame:
+            minus = genes["strand"] == "-"
+            return pd.DataFrame(
+                {
+                    "chrom": genes["chrom"],
+                    "start": np.where(minus, genes["end"], genes["start"] - size).clip(
+                        min=0
+                    ),
+                    "end": np.where(minus, genes["end"] + size, genes["start"]),
+                }
+            )
+
+        return cls.from_partition_list(
+            {
+                "promoterCore": promoters(core_promoter_size),
+                "promoterProx": promoters(proximal_promoter_size),
+                "threeUTR": features.get("three_prime_utr", empty),
+                "fiveUTR": features.get("five_prime_utr", empty),
+                "exon": features.get("exon", empty),
+                "intron": genes,
+            }
+        )
+
+    @classmethod
+    def from_gtf(cls, gtf_file: str) -> "PartitionMap":
+        """
+        Create partitions from protein coding genes of the GTF file
+
+        :param gtf_file: path to the GTF file
+        :return: PartitionMap
+        """
+        return cls.from_gene_models(read_gtf(gtf_file))
+
+    def partition_sizes(self, genome_size: int) -> np.ndarray:
+        """
+        Number of bases in each partition
+
+        :param genome_size: size of the genome, used for the intergenic partition
+        :return: array of sizes, in order of PARTITION_NAMES
+        """
+        sizes = np.zeros(len(PARTITION_NAMES), dtype=np.int64)
+        for boundaries, labels in self.segments.values():
+            lengths = np.diff(boundaries[:-1])
+            np.add.at(sizes, labels[:-1], lengths)
+        sizes[INTERGENIC] = max(genome_size - sizes[:INTERGENIC].sum(), 0)
+        return sizes
+
+    def calculate(
+        self, regions: BedRegions, genome_size: int = None
+    ) -> PartitionsResult:
+        """
+        Assign regions to partitions and calculate the observed, expected and cumulative
+        distributions in one pass over the regions
+        (GenomicDistributions::calcPartitions, calcExpectedPartitions, calcCumulativePartitions)
+
+        :param regions: BedRegions object
+        :param genome_size: size of the genome, required for expected distribution
+            and the cumulative distribution of intergenic partition
+        :return: PartitionsResult
+        """
+        n_partitions = len(PARTITION_NAMES)
+        assigned = np.full(len(regions), INTERGENIC, dtype=np.int8)
+        # overlaps of regions with segments (bp) and their labels, pieces of the
+        # regions on not annotated chromosomes are intergenic
+        piece_sizes = []
+        piece_labels = []
+        not_annotated = np.ones(len(regions), dtype=bool)
+
+        for code, chrom in enumerate(regions.chrom_names.tolist()):
+            if chrom not in self.segments:
+                continue
+            boundaries, labels = self.segments[chrom]
+            region_indices = np.flatnonzero(regions.chrom_codes == code)
+            not_annotated[region_indices] = False
+            starts = regions.starts[region_indices]
+            ends = np.maximum(regions.ends[region_indices], starts + 1)
+
+            # segments overlapping each region: first..last (inclusive)
+            first = np.searchsorted(boundaries, starts, side="right") - 1
+            last = np.searchsorted(boundaries, ends - 1, side="right") - 1
+            counts = last - first + 1
+            offsets = np.cumsum(counts) - counts
+            pair_regions = np.repeat(np.arange(len(region_indices)), counts)
+            pair_segments = np.arange(counts.sum()) - np.repeat(offsets - first, counts)
+            pair_labels = labels[pair_segments]
+
+            piece_labels.append(pair_labels)
+            piece_sizes.append(
+                np.minimum(ends[pair_regions], boundaries[pair_segments + 1])
+                - np.maximum(starts[pair_regions], boundaries[pair_segments])
+            )
+            # region is assigned to the overlapping partition with the highest priority
+            assigned[region_indices] = np.minimum.reduceat(pair_labels, offsets)
+
+        piece_labels.append(np.full(not_annotated.sum(), INTERGENIC, dtype=np.int8))
+        piece_sizes.append(regions.widths[not_annotated])
+        piece_labels = np.concatenate(piece_labels)
+        piece_sizes = np.concatenate(piece_sizes)
+
+        observed = np.bincount(assigned, minlength=n_partitions)
+        sizes = self.partition_sizes(genome_size or 0)
+        if genome_size:
+            expected = sizes / genome_size * len(regions)
+        else:
+            expected = np.full(n_partitions, np.nan)
+
+        cumulative = {}
+        for label, name in enumerate(PARTITION_NAMES):
+            partition_pieces = np.sort(piece_sizes[piece_labels == label])
+            partition_pieces = partition_pieces[partition_pieces > 0]
+            if not len(partition_pieces) or not sizes[label]:
+                continue
+            cumulative[name] = (
+                partition_pieces,
+                np.cumsum(partition_pieces) / sizes[label],
+            )
+        return PartitionsResult(
+            observed=observed, expected=expected, cumulative=cumulative
+        )
+
+
+def get_partition_map(gtf_file: str) -> PartitionMap:
+    """
+    Get partitions of the GTF file from the compiled annotation cache.
+    The cache is built on the first use of the file.
+
+    :param gtf_file: path to the GTF file
+    :return: PartitionMap
+    """
+    from bedboss.bedstat.annotation_cache import get_annotation_cache
+
+    return get_annotation_cache(gtf_file).partition_map
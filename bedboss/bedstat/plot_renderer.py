@@ -0,0 +1,140 @@
+import atexit
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from bedboss.const import PKG_NAME, PLOT_RENDER_TIMEOUT, PLOT_RENDER_WORKERS
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+_LOCK = threading.Lock()
+_DEFAULT_RENDERER: "PlotRenderer" = None
+
+
+def _init_render_worker() -> None:
+    """
+    Use non-interactive backend in the rendering processes
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _render(plot_function: Callable, args: tuple, kwargs: dict) -> dict:
+    """
+    Run the plot function. Figures opened by the function are closed,
+    even if it fails.
+
+    :param plot_function: function creating and saving the plot
+    :param args: positional arguments of the function
+    :param kwargs: keyword arguments of the function
+    :return: plot dict
+    """
+    import matplotlib.pyplot as plt
+
+    figures = set(plt.get_fignums())
+    try:
+        return plot_function(*args, **kwargs)
+    finally:
+        for figure in set(plt.get_fignums()) - figures:
+            plt.close(figure)
+
+
+class PlotRenderer:
+    """
+    Renders plots in background processes, so plotting doesn't block calculation
+    of statistics. Plots are submitted as functions (from bedboss.bedstat.plots)
+    with their data, and returned as futures of plot dicts.
+    """
+
+    def __init__(self, workers: int = PLOT_RENDER_WORKERS):
+        """
+        :param workers: number of rendering processes. If 0, plots are rendered
+            in the calling process
+        """
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, plot_function: Callable, *args, **kwargs) -> Future:
+        """
+        Submit plot for rendering. If the rendering processes are not available,
+        plot is rendered in the calling process.
+
+        :param plot_function: function creating and saving the plot, returning the plot dict
+        :param args: positional arguments of the function
+        :param kwargs: keyword arguments of the function
+        :return: future of the plot dict
+        """
+        if self.workers > 0:
+            try:
+                with self._lock:
+                    if self._executor is None:
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=_init_render_worker,
+                        )
+                    return self._executor.submit(_render, plot_function, args, kwargs)
+            except (BrokenProcessPool, OSError, RuntimeError) as e:
+                _LOGGER.warning(
+                    f"Plot rendering processes are not available, rendering in process: {e}"
+                )
+                self.shutdown(wait=False)
+
+        future = Future()
+        try:
+            future.set_result(_render(plot_function, args, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the rendering processes. They are started again on the next submit.
+
+        :param wait: wait for the submitted plots
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def get_plot_renderer() -> PlotRenderer:
+    """
+    Get plot renderer shared by all bedstat calls in the process.
+    Rendering processes are stopped at exit.
+
+    :return: PlotRenderer
+    """
+    global _DEFAULT_RENDERER
+
+    with _LOCK:
+        if _DEFAULT_RENDERER is None:
+            _DEFAULT_RENDERER = PlotRenderer()
+            atexit.register(_DEFAULT_RENDERER.shutdown)
+        return _DEFAULT_RENDERER
+
+
+def resolve_plots(data: dict, timeout: float = PLOT_RENDER_TIMEOUT) -> dict:
+    """
+    Wait for plots submitted to the renderer, and replace their futures in the
+    statistics dict with plot dicts. Plots that failed are removed.
+
+    :param data: statistics dict (e.g. returned by bedstat), with plot dicts or futures
+    :param timeout: maximum time to wait for one plot (seconds)
+    :return: the same dict, with resolved plots
+    """
+    for key, value in list(data.items()):
+        if not isinstance(value, Future):
+            continue
+        try:
+            data[key] = value.result(timeout=timeout)
+        except Exception as e:
+            _LOGGER.warning(f"Unable to create plot {key}: {e}")
+            del data[key]
+    return data
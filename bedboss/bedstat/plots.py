@@ -0,0 +1,312 @@
+import os
+import re
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.ticker import MaxNLocator
+
+from bedboss.bedstat.partitions import PARTITION_NAMES, PartitionsResult
+from bedboss.bedstat.region_stats import ChromBins, WidthsHistogram
+
+# the same size as plots created by regionstat.R
+FIGURE_SIZE = (8, 8)
+
+
+def save_plot(
+    fig: plt.Figure, plot_id: str, title: str, bed_id: str, outfolder: str
+) -> dict:
+    """
+    Save figure as png and pdf, and close it. Paths in the returned dict are
+    relative to the pipeline output folder, the same as in regionstat.R
+
+    :param fig: matplotlib figure
+    :param plot_id: id of the plot, used in file names
+    :param title: title of the plot
+    :param bed_id: bed ID (digest)
+    :param outfolder: folder for plots (<output folder>/output/bedstat_output/<digest>)
+    :return: plot dict (name, title, thumbnail_path, path)
+    """
+    path = os.path.join(outfolder, f"{bed_id}_{plot_id}")
+    try:
+        fig.savefig(f"{path}.png")
+        fig.savefig(f"{path}.pdf")
+    finally:
+        plt.close(fig)
+
+    rel_path = os.path.relpath(
+        path, os.path.abspath(os.path.join(outfolder, "..", "..", ".."))
+    )
+    return {
+        "name": plot_id,
+        "title": title,
+        "thumbnail_path": f"{rel_path}.png",
+        "path": f"{rel_path}.pdf",
+    }
+
+
+def plot_widths_histogram(
+    histogram: WidthsHistogram, bed_id: str, outfolder: str
+) -> dict:
+    """
+    Plot quantile-trimmed histogram of widths
+
+    :param histogram: WidthsHistogram
+    :param bed_id: bed ID (digest)
+    :param outfolder: folder for plots
+    :return: plot dict
+    """
+    edges = histogram.edges
+    labels = [f"<{edges[0]:.0f}"]
+    labels += [f"{low:.0f}-{high:.0f}" for low, high in zip(edges[:-1], edges[1:])]
+    labels.append(f">{edges[-1]:.0f}")
+    counts = [histogram.lower_count, *histogram.counts.tolist(), histogram.upper_count]
+    colors = ["gray"] + ["dimgray"] * len(histogram.counts) + ["gray"]
+
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    ax.bar(range(len(counts)), counts, color=colors, width=1, edgecolor="white")
+    ax.set_xticks(range(len(counts)), labels, rotation=45, ha="right")
+    ax.set_xlabel("Size of regions (bp)")
+    ax.set_ylabel("Frequency")
+    ax.set_title("Quantile-trimmed histogram of widths")
+    ax.spines[["top", "right"]].set_visible(False)
+    fig.tight_layout()
+    return save_plot(
+        fig,
+        "widths_histogram",
+        "Quantile-trimmed histogram of widths",
+        bed_id,
+        outfolder,
+    )
+
+
+def plot_neighbor_distances(distances: np.ndarray, bed_id: str, outfolder: str) -> dict:
+    """
+    Plot distribution of distances between neighbor regions (log10 scale)
+
+    :param distances: array of distances
+    :param bed_id: bed ID (digest)
+    :param outfolder: folder for plots
+    :return: plot dict
+    """
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    positive = distances[distances > 0]
+    if len(positive):
+        ax.hist(np.log10(positive), bins=50, color="dimgray")
+    ax.set_xlabel("log10(bp distance)")
+    ax.set_ylabel("Frequency")
+    ax.set_title("Distribution of distances between neighbor regions")
+    ax.spines[["top", "right"]].set_visible(False)
+    fig.tight_layout()
+    return save_plot(
+        fig,
+        "neighbor_distances",
+        "Distance between neighbor regions",
+        bed_id,
+        outfolder,
+    )
+
+
+def _chrom_sort_key(chrom: str):
+    name = re.sub(r"^chr", "", chrom)
+    return (0, int(name), "") if name.isdigit() else (1, 0, name)
+
+
+def plot_chrom_bins(chrom_bins: ChromBins, bed_id: str, outfolder: str) -> dict:
+    """
+    Plot distribution of regions over chromosomes, one row per chromosome
+
+    :param chrom_bins: ChromBins
+    :param bed_id: bed ID (digest)
+    :param outfolder: folder for plots
+    :return: plot dict
+    """
+    chroms = sorted(chrom_bins.counts, key=_chrom_sort_key)
+    fig, axes = plt.subplots(
+        len(chroms), 1, figsize=FIGURE_SIZE, sharex=True, squeeze=False
+    )
+    for ax, chrom in zip(axes[:, 0], chroms):
+        counts = chrom_bins.counts[chrom]
+        positions = np.arange(len(counts)) * chrom_bins.bin_size / 1e6
+        ax.fill_between(positions, counts, step="post", color="dimgray")
+        ax.set_ylabel(chrom, rotation=0, ha="right", va="center", fontsize=7)
+        ax.set_yticks([])
+        ax.spines[["top", "right", "left"]].set_visible(False)
+    axes[-1, 0].set_xlabel("Genomic position (Mb)")
+    axes[0, 0].set_title("Distribution over chromosomes")
+    fig.tight_layout(h_pad=0)
+    return save_plot(
+        fig,
+        "chrombins",
+        "Regions distribution over chromosomes",
+        bed_id,
+        outfolder,
+    )
+
+
+def plot_tss_distance(
+    counts: np.ndarray, edges: np.ndarray, bed_id: str, outfolder: str
+) -> dict:
+    """
+    Plot distribution of distances between regions and the nearest TSS
+
+    :param counts: histogram counts
+    :param edges: histogram bin edges (bp)
+    :param bed_id: bed ID (digest)
+    :param outfolder: folder for plots
+    :return: plot dict
+    """
+    total = counts.sum()
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    ax.bar(
+        edges[:-1] / 1000,
+        100 * counts / total if total else counts,
+        width=np.diff(edges) / 1000,
+        align="edge",
+        color="dimgray",
+        edgecolor="white",
+    )
+    ax.axvline(0, color="black", linewidth=0.8, linestyle="--")
+    ax.set_xlabel("Distance to TSS (kb)")
+    ax.set_ylabel("Frequency (%)")
+    ax.set_title("Distribution of region distance to TSS")
+    ax.spines[["top", "right"]].set_visible(False)
+    fig.tight_layout()
+    return save_plot(
+        fig,
+        "tss_distance",
+        "Region-TSS distance distribution",
+        bed_id,
+        outfolder,
+    )
+
+
+def plot_partitions(result: PartitionsResult, bed_id: str, outfolder: str) -> dict:
+    """
+    Plot distribution of regions over genomic partitions (percentages)
+
+    :param result: PartitionsResult
+    :param bed_id: bed ID (digest)
+    :param outfolder: folder for plots
+    :return: plot dict
+    """
+    total = result.observed.sum()
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    ax.bar(
+        PARTITION_NAMES,
+        100 * result.observed / total if total else result.observed,
+        color="dimgray",
+    )
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_xlabel("Genomic partition")
+    ax.set_ylabel("Frequency (%)")
+    ax.set_title("Distribution across genomic partitions")
+    ax.spines[["top", "right"]].set_visible(False)
+    fig.tight_layout()
+    return save_plot(
+        fig,
+        "partitions",
+        "Regions distribution over genomic partitions",
+        bed_id,
+        outfolder,
+    )
+
+
+def plot_expected_partitions(
+    result: PartitionsResult, bed_id: str, outfolder: str
+) -> dict:
+    """
+    Plot log10 of observed / expected number of regions in genomic partitions
+
+    :param result: PartitionsResult
+    :param bed_id: bed ID (digest)
+    :param outfolder: folder for plots
+    :return: plot dict
+    """
+    log10_oe = np.nan_to_num(result.log10_oe, nan=0, posinf=0, neginf=0)
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    ax.bar(
+        PARTITION_NAMES,
+        log10_oe,
+        color=np.where(log10_oe >= 0, "dimgray", "darkgray").tolist(),
+    )
+    ax.axhline(0, color="black", linewidth=0.8)
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_xlabel("Genomic partition")
+    ax.set_ylabel("log10(Observed / Expected)")
+    ax.set_title("Expected distribution across genomic partitions")
+    ax.spines[["top", "right"]].set_visible(False)
+    fig.tight_layout()
+    return save_plot(
+        fig,
+        "expected_partitions",
+        "Expected distribution over genomic partitions",
+        bed_id,
+        outfolder,
+    )
+
+
+def plot_cumulative_partitions(
+    result: PartitionsResult, bed_id: str, outfolder: str
+) -> dict:
+    """
+    Plot cumulative distribution of regions over genomic partitions
+
+    :param result: PartitionsResult
+    :param bed_id: bed ID (digest)
+    :param outfolder: folder for plots
+    :return: plot dict
+    """
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    for name, (sizes, fractions) in result.cumulative.items():
+        ax.step(np.log10(sizes), fractions, where="post", label=name, linewidth=1)
+    ax.set_xlabel("log10(Size of region pieces (bp))")
+    ax.set_ylabel("Cumulative fraction of partition")
+    ax.set_title("Cumulative distribution across genomic partitions")
+    ax.legend(frameon=False)
+    ax.spines[["top", "right"]].set_visible(False)
+    fig.tight_layout()
+    return save_plot(
+        fig,
+        "cumulative_partitions",
+        "Cumulative distribution over genomic partitions",
+        bed_id,
+        outfolder,
+    )
+
+
+def plot_gc_content(
+    grid: np.ndarray, density: np.ndarray, gc_mean: float, bed_id: str, outfolder: str
+) -> dict:
+    """
+    Plot density of GC content of regions
+
+    :param grid: GC content values of the density curve
+    :param density: density at the grid values
+    :param gc_mean: mean GC content
+    :param bed_id: bed ID (digest)
+    :param outfolder: folder for plots
+    :return: plot dict
+    """
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    ax.plot(grid, density, linewidth=0.8, color="black")
+    ax.xaxis.set_major_locator(MaxNLocator(nbins=5))
+    ax.axvline(
+        gc_mean,
+        color="r",
+        linestyle="--",
+        linewidth=0.8,
+        label=f"Mean: {gc_mean:.2f}",
+    )
+    ax.set_xlabel("GC Content")
+    ax.set_ylabel("Density")
+    ax.set_title("GC Content Distribution")
+    ax.legend()
+    ax.spines[["top", "right"]].set_visible(False)
+    fig.tight_layout()
+    return save_plot(
+        fig,
+        "gccontent",
+        "GC Content Distribution",
+        bed_id,
+        outfolder,
+    )
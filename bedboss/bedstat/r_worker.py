@@ -0,0 +1,222 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from typing import List
+
+from bedboss.const import PKG_NAME, R_WORKER_JOB_TIMEOUT, R_WORKER_STARTUP_TIMEOUT
+from bedboss.exceptions import BedBossException, RWorkerException
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+WORKER_SCRIPT_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "tools", "regionstat_worker.R"
+)
+# prefix of the worker response lines, other lines are R output
+RESPONSE_PREFIX = "@@REGIONSTAT@@"
+
+_LOCK = threading.Lock()
+_DEFAULT_WORKER: "RegionStatWorker" = None
+
+
+class RegionStatWorker:
+    """
+    Long-lived R process running regionstat.R jobs.
+
+    R libraries are loaded once, when the worker starts, and bed files are sent
+    to the worker one by one over stdin. Worker is (re)started lazily: if it crashes
+    or a job times out, the process is killed and a new one is started for the next job.
+    Jobs are run one at a time, concurrent callers wait for their turn.
+    """
+
+    def __init__(
+        self,
+        job_timeout: float = R_WORKER_JOB_TIMEOUT,
+        startup_timeout: float = R_WORKER_STARTUP_TIMEOUT,
+        rscript: str = "Rscript",
+        script_path: str = WORKER_SCRIPT_PATH,
+    ):
+        """
+        :param job_timeout: maximum time (in seconds) of one job
+        :param startup_timeout: maximum time (in seconds) of worker start (loading R libraries)
+        :param rscript: Rscript executable
+        :param script_path: path to the worker R script
+        """
+        self.job_timeout = job_timeout
+        self.startup_timeout = startup_timeout
+        self.rscript = rscript
+        self.script_path = script_path
+
+        self._process: subprocess.Popen = None
+        self._responses: queue.Queue = None
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def command(self) -> List[str]:
+        return [self.rscript, self.script_path]
+
+    @property
+    def alive(self) -> bool:
+        """
+        Whether the worker process is running
+        """
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """
+        Start worker process and wait until it is ready to accept jobs
+        """
+        if self.alive:
+            return
+        if not shutil.which(self.rscript):
+            raise RWorkerException(f"'{self.rscript}' executable not found")
+
+        _LOGGER.info(f"Starting R worker: {' '.join(self.command)}")
+        try:
+            self._process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+            )
+        except OSError as err:
+            raise RWorkerException(f"Unable to start R worker: {err}")
+
+        self._responses = queue.Queue()
+        threading.Thread(
+            target=self._read_output,
+            args=(self._process.stdout, self._responses),
+            daemon=True,
+        ).start()
+
+        response = self._wait_response(self.startup_timeout)
+        if response.get("status") != "ready":
+            self.stop()
+            raise RWorkerException(f"Unexpected R worker response: {response}")
+
+    def stop(self) -> None:
+        """
+        Stop worker process
+        """
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        try:
+            process.stdin.close()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+    def run(
+        self,
+        bedfile: str,
+        digest: str,
+        outfolder: str,
+        genome: str,
+        ensdb: str = None,
+        open_signal_matrix: str = None,
+        skip_plots: List[str] = None,
+    ) -> None:
+        """
+        Run regionstat for one bed file. Results are saved to the same files
+        as regionstat.R saves: <outfolder>/<digest>.json and <outfolder>/<digest>_plots.json
+
+        :param bedfile: path to the bed file
+        :param digest: digest of the bed file
+        :param outfolder: folder for results
+        :param genome: genome assembly
+        :param ensdb: path to the Ensembl annotation gtf file
+        :param open_signal_matrix: path to the open signal matrix
+        :param skip_plots: ids of plots, that regionstat.R shouldn't create
+        :raises RWorkerException: if worker can't be started, crashed or timed out
+        :raises BedBossException: if job failed
+        """
+        with self._lock:
+            self.start()
+            job_id = next(self._job_ids)
+            job = {
+                "id": job_id,
+                "bedfilePath": bedfile,
+                "fileId": digest,
+                "digest": digest,
+                "outputFolder": outfolder,
+                "genome": genome,
+                "ensdb": str(ensdb),
+                "openSignalMatrix": str(open_signal_matrix),
+                "skipPlots": ",".join(skip_plots or []),
+            }
+            try:
+                self._process.stdin.write(json.dumps(job) + "\n")
+                self._process.stdin.flush()
+            except OSError as err:
+                self.stop()
+                raise RWorkerException(f"Unable to send job to R worker: {err}")
+
+            while True:
+                response = self._wait_response(self.job_timeout)
+                if response.get("id") == job_id:
+                    break
+
+        if response.get("status") != "ok":
+            raise BedBossException(
+                f"regionstat failed for '{bedfile}': {response.get('message')}"
+            )
+
+    def _wait_response(self, timeout: float) -> dict:
+        """
+        Wait for the next worker response. Worker is stopped on timeout or if it crashed.
+
+        :param timeout: maximum waiting time in seconds
+        :return: response dict
+        :raises RWorkerException: on timeout or if worker crashed
+        """
+        try:
+            response = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            self.stop()
+            raise RWorkerException(f"R worker didn't respond in {timeout} seconds")
+        if response is None:
+            returncode = self._process.wait() if self._process else None
+            self._process = None
+            raise RWorkerException(f"R worker exited with code: {returncode}")
+        return response
+
+    @staticmethod
+    def _read_output(stdout, responses: queue.Queue) -> None:
+        """
+        Read worker output: responses are put to the queue, other lines are logged.
+        None is put to the queue when worker output is closed.
+        """
+        for line in stdout:
+            if line.startswith(RESPONSE_PREFIX):
+                try:
+                    responses.put(json.loads(line[len(RESPONSE_PREFIX) :]))
+                except json.JSONDecodeError:
+                    _LOGGER.warning(f"Invalid R worker response: {line.rstrip()}")
+            else:
+                _LOGGER.debug(line.rstrip())
+        responses.put(None)
+
+
+def get_regionstat_worker() -> RegionStatWorker:
+    """
+    Get R worker shared by all bedstat calls in the process. Worker is stopped at exit.
+
+    :return: RegionStatWorker
+    """
+    global _DEFAULT_WORKER
+
+    with _LOCK:
+        if _DEFAULT_WORKER is None:
+            _DEFAULT_WORKER = RegionStatWorker()
+            atexit.register(_DEFAULT_WORKER.stop)
+        return _DEFAULT_WORKER
@@ -0,0 +1,238 @@
+import logging
+import math
+import os
+import re
+from concurrent.futures import Future
+from typing import Dict, List, NamedTuple, Union
+
+import numpy as np
+
+from bedboss.bed_regions import BedRegions
+from bedboss.bedstat.plot_renderer import PlotRenderer, get_plot_renderer
+from bedboss.const import PKG_NAME
+from bedboss.refgenome_validator.genome_registry import (
+    CHROM_SIZES_FOLDER,
+    get_chrom_sizes_files,
+)
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+# the same as GenomeInfoDb::keepStandardChromosomes for the supported genomes
+STANDARD_CHROM_PATTERN = re.compile(r"^(chr)?([0-9]+|[XYWZM]|MT)$")
+# quantile of widths in each end bar of the quantile-trimmed histogram
+WIDTHS_QUANT_THRESHOLD = 0.01
+WIDTHS_BINS = 10
+# number of bins over the whole genome (GenomicDistributions::getGenomeBins)
+CHROM_BIN_COUNT = 10000
+# plots created by create_region_plots, regionstat.R doesn't need to create them
+# (chrombins only for genomes with bundled chrom sizes)
+REGION_PLOT_IDS = ["widths_histogram", "neighbor_distances", "chrombins"]
+
+
+class WidthsHistogram(NamedTuple):
+    """
+    Quantile-trimmed histogram: counts of the middle bins and of the two end bars
+    (regions below the lower and above the upper quantile)
+    """
+
+    counts: np.ndarray
+    edges: np.ndarray
+    lower_count: int
+    upper_count: int
+
+
+class ChromBins(NamedTuple):
+    """
+    Number of regions in genome bins of each chromosome
+    """
+
+    bin_size: int
+    counts: Dict[str, np.ndarray]
+
+
+def signif(value: float, digits: int = 4) -> float:
+    """
+    Round to significant digits, as R signif()
+
+    :param value: number to round
+    :param digits: number of significant digits
+    :return: rounded number
+    """
+    if not value or not math.isfinite(value):
+        return value
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def calculate_region_stats(regions: Union[str, BedRegions]) -> dict:
+    """
+    Basic statistics of the bed file, with the same keys and rounding as regionstat.R
+
+    :param regions: path to the bed file or BedRegions object
+    :return: dict with number_of_regions and mean_region_width
+    """
+    if not isinstance(regions, BedRegions):
+        regions = BedRegions.from_file(regions)
+    widths = regions.widths
+    return {
+        "number_of_regions": len(regions),
+        "mean_region_width": signif(float(widths.mean())) if len(widths) else None,
+    }
+
+
+def calculate_widths_histogram(
+    widths: np.ndarray,
+    quant_threshold: float = WIDTHS_QUANT_THRESHOLD,
+    bins: int = WIDTHS_BINS,
+) -> WidthsHistogram:
+    """
+    Quantile-trimmed histogram of region widths (GenomicDistributions::plotQTHist)
+
+    :param widths: widths of regions
+    :param quant_threshold: quantile of data in each end bar
+    :param bins: number of bins between the quantiles
+    :return: WidthsHistogram
+    """
+    lower, upper = np.quantile(widths, [quant_threshold, 1 - quant_threshold])
+    edges = np.linspace(lower, upper, bins + 1)
+    middle = widths[(widths >= lower) & (widths <= upper)]
+    counts, _ = np.histogram(middle, bins=edges)
+    return WidthsHistogram(
+        counts=counts,
+        edges=edges,
+        lower_count=int((widths < lower).sum()),
+        upper_count=int((widths > upper).sum()),
+    )
+
+
+def calculate_neighbor_distances(regions: BedRegions) -> np.ndarray:
+    """
+    Distances between neighboring regions on the same chromosome
+    (GenomicDistributions::calcNeighborDist). Overlapping neighbors have distance 0.
+
+    :param regions: BedRegions object
+    :return: array of distances
+    """
+    order = np.lexsort((regions.starts, regions.chrom_codes))
+    codes = regions.chrom_codes[order]
+    starts = regions.starts[order]
+    ends = regions.ends[order]
+
+    same_chrom = codes[1:] == codes[:-1]
+    distances = starts[1:] - ends[:-1]
+    return np.maximum(distances[same_chrom], 0)
+
+
+def calculate_chrom_bins(
+    regions: BedRegions,
+    chrom_sizes: Dict[str, int],
+    bin_count: int = CHROM_BIN_COUNT,
+) -> ChromBins:
+    """
+    Number of regions in genome bins of standard chromosomes
+    (GenomicDistributions::calcChromBins). Bins have the same size on all chromosomes,
+    regions are assigned to bins by their midpoint.
+
+    :param regions: BedRegions object
+    :param chrom_sizes: dict of chrom names and lengths
+    :param bin_count: number of bins over the whole genome
+    :return: ChromBins
+    """
+    chrom_sizes = {
+        chrom: size
+        for chrom, size in chrom_sizes.items()
+        if STANDARD_CHROM_PATTERN.match(chrom)
+    }
+    bin_size = max(math.ceil(sum(chrom_sizes.values()) / bin_count), 1)
+    midpoints = (regions.starts + regions.ends) // 2
+
+    counts = {}
+    for code, chrom in enumerate(regions.chrom_names.tolist()):
+        if chrom not in chrom_sizes:
+            continue
+        n_bins = math.ceil(chrom_sizes[chrom] / bin_size)
+        bins = midpoints[regions.chrom_codes == code] // bin_size
+        counts[chrom] = np.bincount(np.clip(bins, 0, n_bins - 1), minlength=n_bins)
+    return ChromBins(bin_size=bin_size, counts=counts)
+
+
+def get_genome_chrom_sizes(genome: str) -> Union[Dict[str, int], None]:
+    """
+    Chrom sizes of the genome from the bundled chrom sizes files (UCSC naming)
+
+    :param genome: genome assembly, e.g. hg38
+    :return: dict of chrom names and lengths, or None if genome is not bundled
+    """
+    file_name = f"ucsc_{genome}.chrom.sizes"
+    for path in get_chrom_sizes_files(CHROM_SIZES_FOLDER):
+        if os.path.basename(path) == file_name:
+            chrom_sizes = {}
+            with open(path) as f:
+                for line in f:
+                    chrom, size = line.split()[:2]
+                    chrom_sizes[chrom] = int(size)
+            return chrom_sizes
+    return None
+
+
+def create_region_plots(
+    regions: BedRegions,
+    genome: str,
+    bed_id: str,
+    outfolder: str,
+    skip_plots: List[str] = None,
+    renderer: PlotRenderer = None,
+) -> Dict[str, Future]:
+    """
+    Create plots of region widths, neighbor distances and distribution over chromosomes,
+    the same plots that regionstat.R creates. Data of the plots is calculated here,
+    and plots are rendered in the background by the plot renderer.
+
+    :param regions: BedRegions object
+    :param genome: genome assembly, used for chromosome bins
+    :param bed_id: bed ID (digest), used in file names
+    :param outfolder: folder for plots
+    :param skip_plots: ids of plots, that shouldn't be created
+    :param renderer: PlotRenderer [Default: renderer shared by the process]
+    :return: dict of plot ids and futures of plot dicts (name, title, thumbnail_path, path)
+    """
+    # matplotlib is imported only when plots are needed (not in lite mode)
+    from bedboss.bedstat.plots import (
+        plot_chrom_bins,
+        plot_neighbor_distances,
+        plot_widths_histogram,
+    )
+
+    renderer = renderer or get_plot_renderer()
+    skip_plots = skip_plots or []
+    plots = {}
+    if len(regions) == 0:
+        return plots
+
+    if "widths_histogram" not in skip_plots:
+        plots["widths_histogram"] = renderer.submit(
+            plot_widths_histogram,
+            calculate_widths_histogram(regions.widths),
+            bed_id,
+            outfolder,
+        )
+
+    if "neighbor_distances" not in skip_plots:
+        distances = calculate_neighbor_distances(regions)
+        if len(distances):
+            plots["neighbor_distances"] = renderer.submit(
+                plot_neighbor_distances, distances, bed_id, outfolder
+            )
+
+    if "chrombins" not in skip_plots:
+        chrom_sizes = get_genome_chrom_sizes(genome)
+        if chrom_sizes:
+            chrom_bins = calculate_chrom_bins(regions, chrom_sizes)
+            if chrom_bins.counts:
+                plots["chrombins"] = renderer.submit(
+                    plot_chrom_bins, chrom_bins, bed_id, outfolder
+                )
+        else:
+            _LOGGER.info(
+                f"Chrom sizes of {genome} not found. Skipping chromosome bins plot."
+            )
+    return plots
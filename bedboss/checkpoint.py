@@ -0,0 +1,106 @@
+# Progress of long running jobs, so they can be resumed after a crash.
+import datetime
+import json
+import logging
+import os
+import threading
+from typing import Dict, List
+
+from bedboss.const import PKG_NAME
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+
+
+class Checkpoint:
+    """
+    Append-only progress file: one JSON line per finished item
+    ({"id": ..., "status": "success" | "failed", "error": ..., "time": ...}).
+    The latest line of an item wins. Every line is flushed when it is written,
+    so at most the line that was being written during a crash is lost.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        :param file_path: path to the checkpoint file, created when the first item is added
+        """
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self.records = self._read(file_path)
+        # a partially written line is terminated, so it doesn't break the next one
+        self._terminate_line = False
+        if os.path.exists(file_path) and os.path.getsize(file_path):
+            with open(file_path, "rb") as file:
+                file.seek(-1, os.SEEK_END)
+                self._terminate_line = file.read(1) != b"\n"
+
+    @staticmethod
+    def _read(file_path: str) -> Dict[str, dict]:
+        """
+        Read the checkpoint file. Broken lines (e.g. partially written) are skipped.
+
+        :param file_path: path to the checkpoint file
+        :return: dict of item ids and their latest records
+        """
+        records = {}
+        if not os.path.exists(file_path):
+            return records
+        with open(file_path, "r") as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    records[record["id"]] = record
+                except (ValueError, KeyError, TypeError):
+                    _LOGGER.warning(
+                        f"Skipping broken line {line_number} of checkpoint {file_path}"
+                    )
+        return records
+
+    def is_done(self, identifier: str, retry_failed: bool = False) -> bool:
+        """
+        Check if the item was already finished
+
+        :param identifier: item id
+        :param retry_failed: if True, failed items are not considered finished
+        :return: True if the item is in the checkpoint
+        """
+        record = self.records.get(identifier)
+        if record is None:
+            return False
+        return not (retry_failed and record["status"] == STATUS_FAILED)
+
+    def add(self, identifier: str, success: bool, error: str = None) -> None:
+        """
+        Append the result of the item to the checkpoint file (thread-safe)
+
+        :param identifier: item id
+        :param success: whether the item was processed successfully
+        :param error: error message of the failed item
+        """
+        record = {
+            "id": identifier,
+            "status": STATUS_SUCCESS if success else STATUS_FAILED,
+            "error": error,
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            folder = os.path.dirname(os.path.abspath(self.file_path))
+            os.makedirs(folder, exist_ok=True)
+            with open(self.file_path, "a") as file:
+                if self._terminate_line:
+                    file.write("\n")
+                    self._terminate_line = False
+                file.write(json.dumps(record) + "\n")
+                file.flush()
+            self.records[identifier] = record
+
+    @property
+    def failed(self) -> List[dict]:
+        """
+        Records of failed items
+        """
+        return [r for r in self.records.values() if r["status"] == STATUS_FAILED]
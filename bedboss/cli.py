@@ -1,5 +1,5 @@
 import os
-from typing import Union
+from typing import List, Union
 
 import typer
 
@@ -40,6 +40,13 @@ def create_pm(
 options_list = ["bigwig", "bedgraph", "bed", "bigbed", "wig"]
 
 
+def _megabytes(size: Union[int, None]) -> Union[int, None]:
+    """
+    Convert size in MB (CLI option) to bytes
+    """
+    return size * 1024 * 1024 if size else None
+
+
 def validate_input_options(option: str):
     if option not in options_list:
         raise typer.BadParameter(
@@ -96,6 +103,25 @@ def run_all(
     lite: bool = typer.Option(
         False, help="Run the pipeline in lite mode. [Default: False]"
     ),
+    gc_workers: int = typer.Option(
+        1, help="Number of processes used to calculate GC content"
+    ),
+    gc_approximate: bool = typer.Option(
+        False,
+        help="Estimate mean GC content from a sample of regions (large files only)",
+    ),
+    stage_cache: bool = typer.Option(
+        True,
+        help="Reuse results of stages calculated before for the same file (in BEDBOSS_CACHE)",
+    ),
+    sort_memory: int = typer.Option(
+        None,
+        help="Memory limit for sorting the bed file before bigBed conversion, in MB [Default: 512]",
+    ),
+    sort_temp_dir: str = typer.Option(
+        None,
+        help="Folder for temporary files created during sorting [Default: output folder]",
+    ),
     upload_qdrant: bool = typer.Option(False, help="Upload to Qdrant"),
     upload_s3: bool = typer.Option(False, help="Upload to S3"),
     upload_pephub: bool = typer.Option(False, help="Upload to PEPHub"),
@@ -137,6 +163,11 @@ def run_all(
         ensdb=ensdb,
         other_metadata=None,
         lite=lite,
+        gc_workers=gc_workers,
+        gc_approximate=gc_approximate,
+        stage_cache=stage_cache,
+        sort_memory=_megabytes(sort_memory),
+        sort_temp_dir=sort_temp_dir,
         just_db_commit=just_db_commit,
         force_overwrite=force_overwrite,
         update=update,
@@ -187,6 +218,20 @@ def run_pep(
         False, help="Run the pipeline in lite mode. [Default: False]"
     ),
     rerun: bool = typer.Option(False, help="Rerun already processed samples"),
+    workers: int = typer.Option(
+        1, help="Number of samples processed in parallel. [Default: 1]"
+    ),
+    stats_workers: int = typer.Option(
+        1, help="Number of R workers used to calculate statistics of bed samples"
+    ),
+    sort_memory: int = typer.Option(
+        None,
+        help="Memory limit for sorting the bed file before bigBed conversion, in MB [Default: 512]",
+    ),
+    sort_temp_dir: str = typer.Option(
+        None,
+        help="Folder for temporary files created during sorting [Default: output folder]",
+    ),
     # PipelineManager
     multi: bool = typer.Option(False, help="Run multiple samples"),
     recover: bool = typer.Option(True, help="Recover from previous run"),
@@ -218,6 +263,10 @@ def run_pep(
         standardize_pep=standardize_pep,
         lite=lite,
         rerun=rerun,
+        workers=workers,
+        stats_workers=stats_workers,
+        sort_memory=_megabytes(sort_memory),
+        sort_temp_dir=sort_temp_dir,
         pm=create_pm(
             outfolder=outfolder,
             multi=multi,
@@ -238,8 +287,27 @@ def reprocess_all(
         readable=True,
     ),
     outfolder: str = typer.Option(..., help="Path to the output folder"),
-    limit: int = typer.Option(100, help="Limit the number of files to reprocess"),
+    limit: int = typer.Option(
+        100, help="Limit the number of files to reprocess (0: all unprocessed files)"
+    ),
     no_fail: bool = typer.Option(True, help="Do not fail on error"),
+    stats_workers: int = typer.Option(
+        1, help="Number of R workers used to calculate statistics"
+    ),
+    workers: int = typer.Option(
+        1, help="Number of files processed at the same time (in separate processes)"
+    ),
+    page_size: int = typer.Option(
+        100, help="Number of unprocessed files requested from the database at once"
+    ),
+    checkpoint_file: str = typer.Option(
+        None,
+        help="Path to the checkpoint file with processed files. "
+        "[Default: <outfolder>/reprocess_checkpoint.jsonl]",
+    ),
+    retry_failed: bool = typer.Option(
+        False, help="Reprocess files that failed in the previous runs"
+    ),
 ):
     from bedboss.bedboss import reprocess_all as reprocess_all_function
 
@@ -248,6 +316,11 @@ def reprocess_all(
         output_folder=outfolder,
         limit=limit,
         no_fail=no_fail,
+        stats_workers=stats_workers,
+        workers=workers,
+        page_size=page_size,
+        checkpoint_file=checkpoint_file,
+        retry_failed=retry_failed,
     )
 
 
@@ -357,6 +430,14 @@ def make_bigbed(
     genome: str = typer.Option(..., help="Genome name. Example: 'hg38'"),
     rfg_config: str = typer.Option(None, help="Path to the rfg config file"),
     chrom_sizes: str = typer.Option(None, help="Path to the chrom sizes file"),
+    sort_memory: int = typer.Option(
+        None,
+        help="Memory limit for sorting the bed file before bigBed conversion, in MB [Default: 512]",
+    ),
+    sort_temp_dir: str = typer.Option(
+        None,
+        help="Folder for temporary files created during sorting [Default: output folder]",
+    ),
     # PipelineManager
     multi: bool = typer.Option(False, help="Run multiple samples"),
     recover: bool = typer.Option(True, help="Recover from previous run"),
@@ -375,6 +456,8 @@ def make_bigbed(
         bed_type=bed_type,
         rfg_config=rfg_config,
         chrom_sizes=chrom_sizes,
+        sort_memory=_megabytes(sort_memory),
+        temp_dir=sort_temp_dir,
         pm=create_pm(outfolder=outfolder, multi=multi, recover=recover, dirty=dirty),
     )
 
@@ -432,6 +515,13 @@ def run_stats(
         None, help="Path to the open signal matrix file"
     ),
     just_db_commit: bool = typer.Option(False, help="Just commit to the database?"),
+    gc_workers: int = typer.Option(
+        1, help="Number of processes used to calculate GC content"
+    ),
+    gc_approximate: bool = typer.Option(
+        False,
+        help="Estimate mean GC content from a sample of regions (large files only)",
+    ),
     # PipelineManager
     multi: bool = typer.Option(False, help="Run multiple samples"),
     recover: bool = typer.Option(True, help="Recover from previous run"),
@@ -446,10 +536,36 @@ def run_stats(
         ensdb=ensdb,
         open_signal_matrix=open_signal_matrix,
         just_db_commit=just_db_commit,
+        gc_workers=gc_workers,
+        gc_approximate=gc_approximate,
         pm=create_pm(outfolder=outfolder, multi=multi, recover=recover, dirty=dirty),
     )
 
 
+@app.command(help="Compile annotation caches of Ensembl gtf files, used by bedstat")
+def build_annotation_cache(
+    ensdb: List[str] = typer.Option(
+        ...,
+        help="Path to the Ensembl annotation gtf file. Can be provided multiple times",
+        exists=True,
+        file_okay=True,
+        readable=True,
+    ),
+    cache_folder: str = typer.Option(
+        None,
+        help="Path to the cache folder [Default: BEDBOSS_CACHE or ~/.cache/bedboss]",
+    ),
+    force: bool = typer.Option(False, help="Rebuild existing caches"),
+):
+    from bedboss.bedstat.annotation_cache import build_annotation_cache
+
+    for gtf_file in ensdb:
+        folder = build_annotation_cache(
+            gtf_file, cache_folder=cache_folder, force=force
+        )
+        print(f"{gtf_file}: {folder}")
+
+
 @app.command(
     help="Reindex the bedbase database and insert all files to the qdrant database."
 )
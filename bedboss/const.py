@@ -15,6 +15,17 @@ OS_HG38 = "openSignalMatrix_hg38_percentile99_01_quantNormalized_round4d.txt.gz"
 OS_HG19 = "openSignalMatrix_hg19_percentile99_01_quantNormalized_round4d.txt.gz"
 OS_MM10 = "openSignalMatrix_mm10_percentile99_01_quantNormalized_round4d.txt.gz"
 
+# downloads: timeout of connection and of every read (seconds), attempts after
+# a failed transfer (each attempt resumes the partial file), size of the written chunks,
+# connections kept open per host, and files downloaded at the same time
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_RETRY_DELAY = 2
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_POOL_SIZE = 8
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_PART_SUFFIX = ".part"
+
 BED_FOLDER_NAME = "bed_files"
 BIGBED_FOLDER_NAME = "bigbed_files"
 OUTPUT_FOLDER_NAME = "output"
@@ -27,13 +38,46 @@ MAX_REGION_NUMBER = 5000000
 MIN_REGION_WIDTH = 10
 
 # bedstat
+# persistent regionstat.R worker: maximum time for one bed file and for loading R libraries (seconds)
+R_WORKER_JOB_TIMEOUT = 60 * 60
+R_WORKER_STARTUP_TIMEOUT = 10 * 60
+# background processes rendering plots, and maximum time to wait for one plot (seconds)
+PLOT_RENDER_WORKERS = 2
+PLOT_RENDER_TIMEOUT = 10 * 60
+
+# cache of stage results (in the bedboss cache folder), its size limit (bytes), and the minimum
+# time between evictions of least recently used entries (seconds). Version of a stage is
+# increased when its result changes, so results of older versions are not used
+STAGE_CACHE_FOLDER = "stages"
+STAGE_CACHE_MAX_SIZE = 20 * 1024**3
+STAGE_CACHE_EVICT_INTERVAL = 10 * 60
+STAGE_VERSIONS = {
+    "bigbed": 1,
+    "bedstat": 1,
+    "reference_validation": 1,
+}
 
 # bedbuncher
 DEFAULT_BEDBASE_CACHE_PATH = "./bedabse_cache"
+# bedset members downloaded (threads) and parsed (processes) at the same time
+BEDSET_DOWNLOAD_WORKERS = 8
+BEDSET_PARSE_WORKERS = 4
+
+# reprocess_all: unprocessed beds requested from the database at once, bed files downloaded
+# at the same time, beds in one statistics batch (one R session), and the progress file
+# (one JSON line per finished bed) in the output folder
+REPROCESS_PAGE_SIZE = 100
+REPROCESS_DOWNLOAD_WORKERS = 4
+REPROCESS_STATS_BATCH_SIZE = 10
+REPROCESS_CHECKPOINT_FILE = "reprocess_checkpoint.jsonl"
 
 BEDBOSS_PEP_SCHEMA_PATH = "https://schema.databio.org/pipelines/bedboss.yaml"
 REFGENIE_ENV_VAR = "REFGENIE"
 
 DEFAULT_REFGENIE_PATH = os.path.join(HOME_PATH, ".refgenie")
 
+# folder for compiled caches (e.g. genome models)
+BEDBOSS_CACHE_ENV_VAR = "BEDBOSS_CACHE"
+DEFAULT_BEDBOSS_CACHE_PATH = os.path.join(HOME_PATH, ".cache", "bedboss")
+
 BED_PEP_REGISTRY = "databio/allbeds:bedbase"
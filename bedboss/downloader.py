@@ -0,0 +1,372 @@
+# Download of remote files (HTTP(S) and FTP) with connection reuse, resume and verification.
+import ftplib
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Tuple, Union
+from urllib.parse import unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from bedboss.const import (
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_PART_SUFFIX,
+    DOWNLOAD_POOL_SIZE,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_RETRY_DELAY,
+    DOWNLOAD_TIMEOUT,
+    DOWNLOAD_WORKERS,
+    PKG_NAME,
+)
+from bedboss.exceptions import DownloadException
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+_LOCK = threading.Lock()
+_DOWNLOADER: Union["Downloader", None] = None
+
+# HTTP errors that can be fixed by retrying the request
+RETRY_STATUS_CODES = {408, 429}
+
+
+class DownloadItem(NamedTuple):
+    url: str
+    path: str
+    size: int = None
+    md5: str = None
+
+
+class _PermanentError(Exception):
+    """Download error that won't be fixed by retrying (e.g. file doesn't exist)"""
+
+
+def _part_path(path: str) -> str:
+    return path + DOWNLOAD_PART_SUFFIX
+
+
+def _file_md5(path: str) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class Downloader:
+    """
+    Downloader of remote files. Connections are pooled per host and reused
+    by all downloads (and threads). File is written to `<path>.part` and renamed
+    to `path` only when it is complete and verified, so `path` is never partially written.
+    Interrupted transfer is resumed from the end of the part file
+    (HTTP Range request or FTP REST command), in the same or in the next run.
+    """
+
+    def __init__(
+        self,
+        timeout: int = DOWNLOAD_TIMEOUT,
+        retries: int = DOWNLOAD_RETRIES,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+        pool_size: int = DOWNLOAD_POOL_SIZE,
+    ):
+        """
+        :param timeout: timeout of connection and of every read (seconds)
+        :param retries: number of attempts after a failed transfer
+        :param chunk_size: size of the chunks written to the file (bytes)
+        :param pool_size: maximum number of open connections per host
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.chunk_size = chunk_size
+        self.pool_size = pool_size
+
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._ftp_connections: Dict[Tuple[str, int, str], List[ftplib.FTP]] = {}
+
+    def download(self, url: str, path: str, size: int = None, md5: str = None) -> str:
+        """
+        Download file. Failed transfers are retried and resumed.
+
+        :param url: URL of the file (http, https or ftp)
+        :param path: local path of the file
+        :param size: expected size of the file (bytes). Checked, if provided
+        :param md5: expected md5 checksum of the file. Checked, if provided
+        :return: path of the downloaded file
+        :raises DownloadException: if the file can't be downloaded or verified
+            (any error of the download is raised as DownloadException)
+        """
+        _LOGGER.info(f"Downloading remote file: {url}")
+        _LOGGER.info(f"Local path: {os.path.abspath(path)}")
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        except OSError as err:
+            raise DownloadException(f"Unable to download {url}: {err}")
+        part_path = _part_path(path)
+
+        for attempt in range(self.retries + 1):
+            try:
+                remote_size = self._fetch(url, part_path)
+                self._verify(part_path, size or remote_size, md5)
+                os.replace(part_path, path)
+                _LOGGER.info("File downloaded successfully!")
+                return path
+            except _PermanentError as err:
+                raise DownloadException(f"Unable to download {url}: {err}")
+            except (
+                DownloadException,
+                OSError,
+                EOFError,
+                ftplib.Error,
+                requests.RequestException,
+            ) as err:
+                if attempt == self.retries:
+                    raise DownloadException(f"Unable to download {url}: {err}")
+                _LOGGER.warning(
+                    f"Download of {url} failed (attempt {attempt + 1}): {err}. Retrying..."
+                )
+                time.sleep(DOWNLOAD_RETRY_DELAY * (attempt + 1))
+            except Exception as err:
+                # unexpected errors are not retried, but reported the same way
+                raise DownloadException(f"Unable to download {url}: {err}")
+
+    def download_files(
+        self,
+        items: List[DownloadItem],
+        workers: int = DOWNLOAD_WORKERS,
+        no_fail: bool = False,
+    ) -> List[Union[str, None]]:
+        """
+        Download files in parallel
+
+        :param items: files to download
+        :param workers: maximum number of files downloaded at the same time
+        :param no_fail: if True, failed downloads are logged and their paths are None
+        :return: paths of the downloaded files, in the order of items
+        :raises DownloadException: if any file can't be downloaded (and not no_fail)
+        """
+        with ThreadPoolExecutor(
+            max_workers=max(workers, 1), thread_name_prefix="download"
+        ) as pool:
+            futures = [
+                pool.submit(self.download, item.url, item.path, item.size, item.md5)
+                for item in items
+            ]
+            paths = []
+            for future in futures:
+                try:
+                    paths.append(future.result())
+                except DownloadException as err:
+                    if not no_fail:
+                        for other in futures:
+                            other.cancel()
+                        raise
+                    _LOGGER.error(str(err))
+                    paths.append(None)
+        return paths
+
+    def _verify(self, part_path: str, size: Union[int, None], md5: str = None) -> None:
+        """
+        Check size and md5 checksum of the downloaded file. File that doesn't match
+        is removed, so the next attempt downloads it from the beginning.
+        """
+        actual_size = os.path.getsize(part_path)
+        if size is not None and actual_size != size:
+            if actual_size > size:
+                os.remove(part_path)
+            # smaller file is resumed in the next attempt
+            raise DownloadException(
+                f"Size of the downloaded file {actual_size} doesn't match expected size {size}"
+            )
+        if md5 and _file_md5(part_path) != md5.lower():
+            os.remove(part_path)
+            raise DownloadException(
+                "md5 checksum of the downloaded file doesn't match expected checksum"
+            )
+
+    def _fetch(self, url: str, part_path: str) -> Union[int, None]:
+        """
+        Download (or resume) file to the part file
+
+        :return: size of the remote file, if the server reported it
+        """
+        scheme = urlparse(url).scheme.lower()
+        if scheme in ("http", "https"):
+            return self._fetch_http(url, part_path)
+        if scheme == "ftp":
+            return self._fetch_ftp(url, part_path)
+        # other schemes (e.g. file://) are copied without resume
+        with urllib.request.urlopen(url, timeout=self.timeout) as response, open(
+            part_path, "wb"
+        ) as f:
+            shutil.copyfileobj(response, f, self.chunk_size)
+        return None
+
+    def _session(self, url: str) -> requests.Session:
+        """
+        Get session of the host, that keeps its connections open
+        """
+        parsed = urlparse(url)
+        host = f"{parsed.scheme}://{parsed.netloc}"
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount(host, adapter)
+                self._sessions[host] = session
+            return self._sessions[host]
+
+    def _fetch_http(self, url: str, part_path: str) -> Union[int, None]:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        # file is requested as it is stored: size and byte ranges of a compressed
+        # (Content-Encoding) representation don't match the file
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        with self._session(url).get(
+            url, headers=headers, stream=True, timeout=self.timeout
+        ) as response:
+            if offset and response.status_code == 416:
+                # nothing left to download: part file is complete (or invalid)
+                total = re.search(r"/(\d+)$", response.headers.get("Content-Range", ""))
+                if total and int(total.group(1)) == offset:
+                    return offset
+                os.remove(part_path)
+                raise DownloadException("Partial file doesn't match the remote file")
+            if 400 <= response.status_code < 500 and (
+                response.status_code not in RETRY_STATUS_CODES
+            ):
+                raise _PermanentError(f"HTTP {response.status_code}")
+            response.raise_for_status()
+
+            encoded = response.headers.get("Content-Encoding", "identity") != "identity"
+            if encoded and response.status_code == 206:
+                # range of the compressed representation can't be appended to the file
+                os.remove(part_path)
+                raise DownloadException("Server sent encoded range of the file")
+            if encoded:
+                # server ignored Accept-Encoding: content is decoded, and its size
+                # is unknown, so it is downloaded from the beginning
+                offset = 0
+                remote_size = None
+            elif response.status_code == 206:
+                total = re.search(r"/(\d+)$", response.headers.get("Content-Range", ""))
+                remote_size = int(total.group(1)) if total else None
+            else:
+                # server doesn't support ranges: download from the beginning
+                offset = 0
+                length = response.headers.get("Content-Length")
+                remote_size = int(length) if length else None
+
+            with open(part_path, "ab" if offset else "wb") as f:
+                for chunk in response.raw.stream(
+                    self.chunk_size, decode_content=encoded
+                ):
+                    f.write(chunk)
+        return remote_size
+
+    def _ftp_connect(self, key: Tuple[str, int, str], password: str) -> ftplib.FTP:
+        """
+        Get idle connection to the FTP server from the pool, or open a new one
+        """
+        while True:
+            with self._lock:
+                idle = self._ftp_connections.get(key)
+                ftp = idle.pop() if idle else None
+            if ftp is None:
+                break
+            try:
+                ftp.voidcmd("NOOP")
+                return ftp
+            except ftplib.all_errors:
+                # connection was closed by the server
+                ftp.close()
+
+        host, port, user = key
+        ftp = ftplib.FTP(timeout=self.timeout)
+        ftp.connect(host, port)
+        ftp.login(user, password)
+        return ftp
+
+    def _ftp_release(self, key: Tuple[str, int, str], ftp: ftplib.FTP) -> None:
+        with self._lock:
+            idle = self._ftp_connections.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(ftp)
+                return
+        ftp.close()
+
+    def _fetch_ftp(self, url: str, part_path: str) -> Union[int, None]:
+        parsed = urlparse(url)
+        key = (
+            parsed.hostname,
+            parsed.port or ftplib.FTP_PORT,
+            parsed.username or "anonymous",
+        )
+        remote_path = unquote(parsed.path)
+
+        ftp = self._ftp_connect(key, unquote(parsed.password or ""))
+        try:
+            ftp.voidcmd("TYPE I")
+            try:
+                remote_size = ftp.size(remote_path)
+            except ftplib.error_perm as err:
+                if str(err).startswith("550"):
+                    raise _PermanentError(str(err))
+                # SIZE command is not supported
+                remote_size = None
+
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            if remote_size is not None and offset > remote_size:
+                offset = 0
+            if remote_size is None or offset < remote_size:
+                with open(part_path, "ab" if offset else "wb") as f:
+                    ftp.retrbinary(
+                        f"RETR {remote_path}",
+                        f.write,
+                        blocksize=self.chunk_size,
+                        rest=offset or None,
+                    )
+        except BaseException:
+            # connection state is unknown after an error, so it is not reused
+            ftp.close()
+            raise
+        self._ftp_release(key, ftp)
+        return remote_size
+
+    def close(self) -> None:
+        """
+        Close all pooled connections
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            connections = [c for idle in self._ftp_connections.values() for c in idle]
+            self._sessions.clear()
+            self._ftp_connections.clear()
+        for session in sessions:
+            session.close()
+        for ftp in connections:
+            try:
+                ftp.quit()
+            except ftplib.all_errors:
+                ftp.close()
+
+
+def get_downloader() -> Downloader:
+    """
+    Get downloader shared by the process, so connections are reused by all downloads
+
+    :return: Downloader
+    """
+    global _DOWNLOADER
+    with _LOCK:
+        if _DOWNLOADER is None:
+            _DOWNLOADER = Downloader()
+        return _DOWNLOADER
@@ -37,6 +37,18 @@ class QualityException(BedBossException):
         super(QualityException, self).__init__(reason)
 
 
+class RWorkerException(BedBossException):
+    """Exception, when persistent R worker is not available or crashed."""
+
+    def __init__(self, reason: str = ""):
+        """
+        Optionally provide explanation for exceptional condition.
+
+        :param str reason: some context why R worker failed
+        """
+        super(RWorkerException, self).__init__(reason)
+
+
 class RequirementsException(BedBossException):
     """Exception, when requirement packages are not installed."""
 
@@ -72,3 +84,15 @@ class ValidatorException(BedBossException):
         :param str reason: some context why error occurred
         """
         super(BedTypeException, self).__init__(reason)
+
+
+class DownloadException(BedBossException):
+    """Exception, when remote file can't be downloaded or verified."""
+
+    def __init__(self, reason: str = ""):
+        """
+        Optionally provide explanation for exceptional condition.
+
+        :param str reason: some context why download failed
+        """
+        super(DownloadException, self).__init__(reason)
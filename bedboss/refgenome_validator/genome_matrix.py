@@ -0,0 +1,236 @@
+from typing import Dict, List
+
+import numpy as np
+
+from bedboss.refgenome_validator.genome_model import GenomeModel
+from bedboss.refgenome_validator.models import (
+    ChromLengthStats,
+    ChromNameStats,
+    CompatibilityStats,
+    RatingModel,
+    SequenceFitStats,
+)
+
+# (upper bound, points) for xs and oobr sensitivity
+SENSITIVITY_POINTS = ((0.3, 6), (0.5, 5), (0.7, 4), (1, 3))
+
+
+class GenomeMatrix:
+    """
+    Matrix representation of genome models: chrom name vocabulary x genomes, holding chrom lengths.
+    Compatibility stats of a bed file against all genomes are calculated at once.
+    """
+
+    def __init__(self, genome_models: List[GenomeModel]):
+        """
+        :param genome_models: list of genome models
+        """
+        self.genome_aliases = [model.genome_alias for model in genome_models]
+
+        self.vocabulary: Dict[str, int] = {}
+        for model in genome_models:
+            for chrom in model.chrom_sizes:
+                self.vocabulary.setdefault(chrom, len(self.vocabulary))
+
+        self.lengths = np.zeros(
+            (len(self.vocabulary), len(genome_models)), dtype=np.int64
+        )
+        self.present = np.zeros(self.lengths.shape, dtype=bool)
+        for genome_index, model in enumerate(genome_models):
+            chrom_indices = [self.vocabulary[chrom] for chrom in model.chrom_sizes]
+            self.lengths[chrom_indices, genome_index] = list(model.chrom_sizes.values())
+            self.present[chrom_indices, genome_index] = True
+
+        self._set_totals()
+
+    @classmethod
+    def from_arrays(
+        cls,
+        genome_aliases: List[str],
+        chrom_names: List[str],
+        lengths: np.ndarray,
+        present: np.ndarray,
+    ) -> "GenomeMatrix":
+        """
+        Create matrix from already compiled arrays (e.g. loaded from cache)
+
+        :param genome_aliases: aliases of genomes (columns)
+        :param chrom_names: chrom name vocabulary (rows)
+        :param lengths: chrom lengths, shape (chroms, genomes)
+        :param present: whether chrom is in the genome, shape (chroms, genomes)
+        :return: GenomeMatrix
+        """
+        matrix = cls.__new__(cls)
+        matrix.genome_aliases = list(genome_aliases)
+        matrix.vocabulary = {chrom: index for index, chrom in enumerate(chrom_names)}
+        matrix.lengths = np.asarray(lengths, dtype=np.int64)
+        matrix.present = np.asarray(present, dtype=bool)
+        matrix._set_totals()
+        return matrix
+
+    def _set_totals(self):
+        self.genome_chrom_counts = self.present.sum(axis=0)
+        self.genome_total_lengths = self.lengths.sum(axis=0)
+
+    def __len__(self) -> int:
+        return len(self.genome_aliases)
+
+    @property
+    def chrom_names(self) -> List[str]:
+        """
+        Chrom name vocabulary, in order of matrix rows
+        """
+        return list(self.vocabulary)
+
+    def get_chrom_sizes(self, genome_index: int) -> Dict[str, int]:
+        """
+        Chrom sizes of one genome
+
+        :param genome_index: index of the genome (column)
+        :return: dict of chrom names and lengths
+        """
+        chrom_names = self.chrom_names
+        rows = np.flatnonzero(self.present[:, genome_index])
+        return {
+            chrom_names[row]: length
+            for row, length in zip(
+                rows.tolist(), self.lengths[rows, genome_index].tolist()
+            )
+        }
+
+    def calculate_stats(
+        self, bed_chrom_sizes: dict, genome_mask: np.ndarray = None
+    ) -> Dict[str, CompatibilityStats]:
+        """
+        Calculate chrom name, chrom length and sequence fit stats and compatibility rating
+        of the bed file for all genomes. Results are the same as
+        ReferenceValidator.calculate_chrom_stats + ReferenceValidator.calculate_rating for each genome.
+
+        :param bed_chrom_sizes: dict of a bedfile's chrom sizes (max end position of each chrom)
+        :param genome_mask: boolean array, genomes to include [Default: all genomes]
+        :return: dict of genome alias and CompatibilityStats
+        """
+        if genome_mask is None:
+            genome_mask = np.ones(len(self), dtype=bool)
+        lengths = self.lengths[:, genome_mask]
+        present = self.present[:, genome_mask]
+        genome_chrom_counts = self.genome_chrom_counts[genome_mask]
+        genome_total_lengths = self.genome_total_lengths[genome_mask]
+
+        # bed chroms, that exist in at least one genome
+        known = [
+            (self.vocabulary[chrom], size)
+            for chrom, size in bed_chrom_sizes.items()
+            if chrom in self.vocabulary
+        ]
+        known_indices = np.array([index for index, _ in known], dtype=np.int64)
+        known_sizes = np.array([size for _, size in known], dtype=np.int64)
+        bed_chrom_count = len(bed_chrom_sizes)
+
+        # Layer 1: chrom names
+        in_genome = present[known_indices]
+        q_and_m = in_genome.sum(axis=0)
+        q_and_not_m = bed_chrom_count - q_and_m
+        not_q_and_m = genome_chrom_counts - q_and_m
+        passed_chrom_names = q_and_not_m == 0
+        xs = q_and_m / (q_and_m + q_and_not_m)
+        jaccard_index = q_and_m / bed_chrom_count
+        jaccard_binary = q_and_m / (q_and_m + not_q_and_m + q_and_not_m)
+
+        # Layer 2: chrom lengths, only meaningful if layer 1 is passing
+        beyond = in_genome & (known_sizes[:, None] > lengths[known_indices])
+        num_of_chrom_beyond = beyond.sum(axis=0)
+        num_chrom_within_bounds = q_and_m - num_of_chrom_beyond
+        with np.errstate(divide="ignore", invalid="ignore"):
+            oobr = num_chrom_within_bounds / (
+                num_chrom_within_bounds + num_of_chrom_beyond
+            )
+
+        # Layer 3: sequence fit
+        bed_sums = np.where(in_genome, lengths[known_indices], 0).sum(axis=0)
+        sequence_fit = bed_sums / genome_total_lengths
+        has_sequence_fit = q_and_m > 0
+
+        # Rating
+        points = self._sensitivity_points(xs)
+        points += np.where(passed_chrom_names, self._sensitivity_points(oobr), 0)
+        rated_fit = has_sequence_fit & (sequence_fit != 0)
+        points += np.where(
+            rated_fit,
+            (sequence_fit < 0.90).astype(int) + 2 * (sequence_fit < 0.60),
+            4,
+        )
+        tier_ranking = np.select([points == 0, points <= 3, points <= 6], [1, 2, 3], 4)
+
+        aliases = [
+            alias
+            for alias, selected in zip(self.genome_aliases, genome_mask)
+            if selected
+        ]
+        # python types for pydantic models
+        stats = {
+            name: array.tolist()
+            for name, array in dict(
+                xs=xs,
+                q_and_m=q_and_m,
+                q_and_not_m=q_and_not_m,
+                not_q_and_m=not_q_and_m,
+                jaccard_index=jaccard_index,
+                jaccard_index_binary=jaccard_binary,
+                passed_chrom_names=passed_chrom_names,
+                oobr=oobr,
+                num_of_chrom_beyond=num_of_chrom_beyond,
+                genome_chrom_count=genome_chrom_counts,
+                sequence_fit=np.where(has_sequence_fit, sequence_fit, np.nan),
+                assigned_points=points,
+                tier_ranking=tier_ranking,
+            ).items()
+        }
+
+        results = {}
+        for i, alias in enumerate(aliases):
+            num_of_chrom_beyond_i = stats["num_of_chrom_beyond"][i]
+            if stats["passed_chrom_names"][i]:
+                length_stats = ChromLengthStats(
+                    oobr=stats["oobr"][i],
+                    beyond_range=num_of_chrom_beyond_i > 0,
+                    num_of_chrom_beyond=num_of_chrom_beyond_i,
+                    percentage_bed_chrom_beyond=(
+                        100 * num_of_chrom_beyond_i / bed_chrom_count
+                    ),
+                    percentage_genome_chrom_beyond=(
+                        100 * num_of_chrom_beyond_i / stats["genome_chrom_count"][i]
+                    ),
+                )
+            else:
+                length_stats = ChromLengthStats()
+
+            sequence_fit_i = stats["sequence_fit"][i]
+            results[alias] = CompatibilityStats(
+                chrom_name_stats=ChromNameStats(
+                    **{name: stats[name][i] for name in ChromNameStats.model_fields}
+                ),
+                chrom_length_stats=length_stats,
+                chrom_sequence_fit_stats=SequenceFitStats(
+                    sequence_fit=(None if np.isnan(sequence_fit_i) else sequence_fit_i)
+                ),
+                compatibility=RatingModel(
+                    assigned_points=stats["assigned_points"][i],
+                    tier_ranking=stats["tier_ranking"][i],
+                ),
+            )
+        return results
+
+    @staticmethod
+    def _sensitivity_points(sensitivity: np.ndarray) -> np.ndarray:
+        """
+        Points assigned for xs or oobr sensitivity, 1 is considered great and no points are assigned
+
+        :param sensitivity: array of sensitivities
+        :return: array of points
+        """
+        return np.select(
+            [sensitivity < bound for bound, _ in SENSITIVITY_POINTS],
+            [points for _, points in SENSITIVITY_POINTS],
+            0,
+        )
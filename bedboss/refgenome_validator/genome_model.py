@@ -10,13 +10,17 @@ class GenomeModel:
         self,
         genome_alias: str,
         chrom_sizes_file: str,
+        chrom_sizes: dict = None,
         # common_aliases: Optional[List] = None,
         # refgenomeconf: Optional[refgenconf.refgenconf.RefGenConf] = None,
         # exclude_ranges_names: Optional[List] = None,
     ):
         self._genome_alias = genome_alias
         self.chrom_sizes_file = chrom_sizes_file
-        self._chrom_sizes = self.get_chrom_sizes()
+        # chrom sizes can be provided, if they were already loaded (e.g. from cache)
+        self._chrom_sizes = (
+            chrom_sizes if chrom_sizes is not None else self.get_chrom_sizes()
+        )
         # self.common_aliases = common_aliases  # What are the other names for the other this reference genomes
         # self.rgc = refgenomeconf
         # self.excluded_ranges_names = exclude_ranges_names  # Which bed file digests from the excluded ranges are associated with this reference genome?
@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import List, Tuple
+
+import numpy as np
+
+from bedboss.const import BEDBOSS_CACHE_ENV_VAR, DEFAULT_BEDBOSS_CACHE_PATH, PKG_NAME
+from bedboss.refgenome_validator.genome_matrix import GenomeMatrix
+from bedboss.refgenome_validator.genome_model import GenomeModel
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+CHROM_SIZES_FOLDER = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "chrom_sizes"
+)
+# increase if format of the compiled cache changes
+CACHE_FORMAT_VERSION = 1
+
+_LOCK = threading.Lock()
+_DEFAULT_MODELS: List[GenomeModel] = None
+_DEFAULT_MATRIX: GenomeMatrix = None
+
+
+def get_default_genome_models() -> List[GenomeModel]:
+    """
+    Get default genome models (built from the chrom.sizes folder).
+    Models are built once per process, and loaded from the compiled cache if it is up to date.
+
+    :return: list of GenomeModels
+    """
+    return list(_get_default_registry()[0])
+
+
+def get_default_genome_matrix() -> GenomeMatrix:
+    """
+    Get GenomeMatrix of the default genome models.
+
+    :return: GenomeMatrix
+    """
+    return _get_default_registry()[1]
+
+
+def _get_default_registry() -> Tuple[List[GenomeModel], GenomeMatrix]:
+    global _DEFAULT_MODELS, _DEFAULT_MATRIX
+
+    with _LOCK:
+        if _DEFAULT_MODELS is None:
+            _DEFAULT_MODELS, _DEFAULT_MATRIX = _load_default_registry()
+        return _DEFAULT_MODELS, _DEFAULT_MATRIX
+
+
+def get_chrom_sizes_files(folder: str = CHROM_SIZES_FOLDER) -> List[str]:
+    """
+    Find all chrom sizes files in the folder (recursively)
+
+    :param folder: path to the folder with chrom sizes files
+    :return: sorted list of paths to the chrom sizes files
+    """
+    chrom_sizes_files = []
+    for root, dirs, files in os.walk(folder):
+        for file in files:
+            if file.endswith(".sizes"):
+                chrom_sizes_files.append(os.path.join(root, file))
+    return sorted(chrom_sizes_files)
+
+
+def build_genome_models(chrom_sizes_files: List[str]) -> List[GenomeModel]:
+    """
+    Build GenomeModels from chrom sizes files. Uses file names as genome alias.
+
+    :param chrom_sizes_files: list of paths to the chrom sizes files
+    :return: list of GenomeModels
+    """
+    return [
+        GenomeModel(genome_alias=os.path.basename(file), chrom_sizes_file=file)
+        for file in chrom_sizes_files
+    ]
+
+
+def get_cache_folder() -> str:
+    """
+    Get folder for bedboss caches, can be changed with BEDBOSS_CACHE environment variable
+
+    :return: path to the cache folder
+    """
+    return os.path.expanduser(
+        os.getenv(BEDBOSS_CACHE_ENV_VAR) or DEFAULT_BEDBOSS_CACHE_PATH
+    )
+
+
+def _cache_key(chrom_sizes_files: List[str]) -> str:
+    """
+    Cache key of the compiled genome models, changes if content of any source file
+    changes (also if the modification time is preserved, e.g. by package installers)
+
+    :param chrom_sizes_files: list of paths to the chrom sizes files
+    :return: hex digest
+    """
+    key = hashlib.sha256(str(CACHE_FORMAT_VERSION).encode())
+    for file in chrom_sizes_files:
+        with open(file, "rb") as f:
+            content_digest = hashlib.sha256(f.read()).hexdigest()
+        key.update(f"{file}\t{content_digest}\n".encode())
+    return key.hexdigest()[:32]
+
+
+def _load_default_registry() -> Tuple[List[GenomeModel], GenomeMatrix]:
+    """
+    Load default genome models from the compiled cache, or build them from
+    chrom sizes files and save the cache.
+
+    :return: list of GenomeModels and their GenomeMatrix
+    """
+    chrom_sizes_files = get_chrom_sizes_files()
+    cache_path = os.path.join(
+        get_cache_folder(), f"genome_models_{_cache_key(chrom_sizes_files)}.npz"
+    )
+
+    if os.path.exists(cache_path):
+        try:
+            matrix = _read_compiled_matrix(cache_path)
+            models = [
+                GenomeModel(
+                    genome_alias=alias,
+                    chrom_sizes_file=file,
+                    chrom_sizes=matrix.get_chrom_sizes(index),
+                )
+                for index, (alias, file) in enumerate(
+                    zip(matrix.genome_aliases, chrom_sizes_files)
+                )
+            ]
+            return models, matrix
+        except (OSError, ValueError, KeyError) as err:
+            _LOGGER.warning(f"Unable to read genome models cache {cache_path}: {err}")
+
+    models = build_genome_models(chrom_sizes_files)
+    matrix = GenomeMatrix(models)
+    try:
+        _write_compiled_matrix(matrix, cache_path)
+    except OSError as err:
+        _LOGGER.warning(f"Unable to write genome models cache {cache_path}: {err}")
+    return models, matrix
+
+
+def _read_compiled_matrix(cache_path: str) -> GenomeMatrix:
+    """
+    Read GenomeMatrix from the compiled (.npz) file
+
+    :param cache_path: path to the compiled file
+    :return: GenomeMatrix
+    """
+    with np.load(cache_path, allow_pickle=False) as data:
+        return GenomeMatrix.from_arrays(
+            genome_aliases=data["genome_aliases"].tolist(),
+            chrom_names=data["chrom_names"].tolist(),
+            lengths=data["lengths"],
+            present=data["present"],
+        )
+
+
+def _write_compiled_matrix(matrix: GenomeMatrix, cache_path: str) -> None:
+    """
+    Save GenomeMatrix to the compiled (.npz) file. File is written atomically.
+
+    :param matrix: GenomeMatrix
+    :param cache_path: path to the compiled file
+    """
+    cache_folder = os.path.dirname(cache_path)
+    os.makedirs(cache_folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=".npz.tmp", dir=cache_folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                genome_aliases=np.array(matrix.genome_aliases, dtype=str),
+                chrom_names=np.array(matrix.chrom_names, dtype=str),
+                lengths=matrix.lengths,
+                present=matrix.present,
+            )
+        os.replace(temp_path, cache_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -2,9 +2,19 @@ import logging
 import os
 from typing import Dict, List, Optional, Union
 
+import numpy as np
+
+from bedboss.bed_regions import BedRegions
 from bedboss.exceptions import ValidatorException
 from bedboss.refgenome_validator.const import GENOME_FILES
+from bedboss.refgenome_validator.genome_matrix import GenomeMatrix
 from bedboss.refgenome_validator.genome_model import GenomeModel
+from bedboss.refgenome_validator.genome_registry import (
+    build_genome_models,
+    get_chrom_sizes_files,
+    get_default_genome_matrix,
+    get_default_genome_models,
+)
 from bedboss.refgenome_validator.models import (
     ChromLengthStats,
     ChromNameStats,
@@ -40,8 +50,10 @@ class ReferenceValidator:
             if not provided these metrics are not computed. Default: None
         """
 
+        genome_matrix = None
         if not genome_models:
-            genome_models = self._build_default_models()
+            genome_models = get_default_genome_models()
+            genome_matrix = get_default_genome_matrix()
         elif isinstance(genome_models, str):
             genome_models = list(genome_models)
         elif not isinstance(genome_models, list):
@@ -50,6 +62,7 @@ class ReferenceValidator:
             )
 
         self.genome_models: List[GenomeModel] = genome_models
+        self.genome_matrix = genome_matrix or GenomeMatrix(genome_models)
         self.igd_path = igd_path
 
     @staticmethod
@@ -221,14 +234,14 @@ class ReferenceValidator:
 
     def determine_compatibility(
         self,
-        bedfile: str,
+        bedfile: Union[str, BedRegions],
         ref_filter: Optional[List[str]] = None,
         concise: Optional[bool] = False,
     ) -> Union[Dict[str, CompatibilityStats], Dict[str, CompatibilityConcise]]:
         """
         Determine compatibility of the bed file.
 
-        :param bedfile: path to bedfile
+        :param bedfile: path to bedfile or BedRegions object
         :param ref_filter: list of ref genome aliases to filter on.
         :param concise: if True, only return a concise list of compatibility stats. Default: False
         :return: a dict with CompatibilityStats, or CompatibilityConcise model (depends if concise is set to True)
@@ -238,40 +251,37 @@ class ReferenceValidator:
 
         if ref_filter:
             # Filter out unwanted reference genomes to assess
-            for genome_model in self.genome_models:
-                if genome_model.genome_alias in ref_filter:
-                    self.genome_models.remove(genome_model)
+            genome_mask = np.array(
+                [alias not in ref_filter for alias in self.genome_matrix.genome_aliases]
+            )
+        else:
+            genome_mask = None
 
         bed_chrom_info = get_bed_chrom_info(bedfile)
 
         if not bed_chrom_info:
             raise ValidatorException("Incorrect bed file provided")
 
-        model_compat_stats = {}
-
-        for genome_model in self.genome_models:
-            # First and Second Layer of Compatibility
-            model_compat_stats[genome_model.genome_alias]: CompatibilityStats = (
-                self.calculate_chrom_stats(bed_chrom_info, genome_model.chrom_sizes)
-            )
+        # First and Second Layer of Compatibility, and compatibility rating for all genomes
+        model_compat_stats: Dict[str, CompatibilityStats] = (
+            self.genome_matrix.calculate_stats(bed_chrom_info, genome_mask=genome_mask)
+        )
 
-            # Third layer - IGD, only if layer 1 and layer 2 have passed
+        # Third layer - IGD, only if layer 1 and layer 2 have passed
+        igd_stats = None
+        for compat_stats in model_compat_stats.values():
             if (
-                model_compat_stats[
-                    genome_model.genome_alias
-                ].chrom_name_stats.passed_chrom_names
-                and not model_compat_stats[
-                    genome_model.genome_alias
-                ].chrom_length_stats.beyond_range
+                compat_stats.chrom_name_stats.passed_chrom_names
+                and not compat_stats.chrom_length_stats.beyond_range
             ):
-                model_compat_stats[genome_model.genome_alias].igd_stats = (
-                    self.get_igd_overlaps(bedfile)
-                )
+                if igd_stats is None:
+                    igd_stats = self.get_igd_overlaps(
+                        bedfile.path if isinstance(bedfile, BedRegions) else bedfile
+                    )
+                compat_stats.igd_stats = igd_stats
+                if igd_stats:
+                    self._process_igd_stats(igd_stats)
 
-            # Calculate compatibility rating
-            model_compat_stats[genome_model.genome_alias].compatibility = (
-                self.calculate_rating(model_compat_stats[genome_model.genome_alias])
-            )
         if concise:
             concise_dict = {}
             for name, stats in model_compat_stats.items():
@@ -383,20 +393,7 @@ class ReferenceValidator:
 
         return list[GenomeModel]
         """
-        dir_path = os.path.dirname(os.path.realpath(__file__))
-
-        chrm_sizes_directory = os.path.join(dir_path, "chrom_sizes")
-
-        all_genome_models = []
-        for root, dirs, files in os.walk(chrm_sizes_directory):
-            for file in files:
-                if file.endswith(".sizes"):
-                    curr_genome_model = GenomeModel(
-                        genome_alias=file, chrom_sizes_file=os.path.join(root, file)
-                    )
-                    all_genome_models.append(curr_genome_model)
-
-        return all_genome_models
+        return build_genome_models(get_chrom_sizes_files())
 
     @staticmethod
     def _create_concise_output(output: CompatibilityStats) -> CompatibilityConcise:
@@ -4,16 +4,20 @@ from typing import List, Union
 
 from geniml.io import RegionSet
 
+from bedboss.bed_regions import BedRegions
+
 _LOGGER = logging.getLogger("bedboss")
 
 
-def get_bed_chrom_info(bedfile: Union[str, RegionSet]) -> dict:
+def get_bed_chrom_info(bedfile: Union[str, RegionSet, BedRegions]) -> dict:
     """
     Determine chrom lengths for bed file
 
-    :param bedfile: RegionSet object or path to bed file
+    :param bedfile: BedRegions object, RegionSet object or path to bed file
     returns dict: returns dictionary where keys are chrom names and values are the max end position of that chromosome.
     """
+    if isinstance(bedfile, BedRegions):
+        return bedfile.chrom_max_ends()
     if isinstance(bedfile, RegionSet):
         df = bedfile.to_pandas()
     else:
@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Union
+
+from bedboss.const import (
+    PKG_NAME,
+    STAGE_CACHE_EVICT_INTERVAL,
+    STAGE_CACHE_FOLDER,
+    STAGE_CACHE_MAX_SIZE,
+    STAGE_VERSIONS,
+)
+from bedboss.refgenome_validator.genome_registry import get_cache_folder
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+RESULT_FILE_NAME = "result.json"
+FILES_FOLDER_NAME = "files"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_LOCK = threading.Lock()
+_STAGE_CACHES: Dict[str, "StageCache"] = {}
+
+
+def stage_cache_key(bed_digest: str, stage: str, params: dict = None) -> str:
+    """
+    Key of the stage result: digest of the bed file, stage name, stage version
+    (STAGE_VERSIONS, changed when the stage output changes) and parameters
+    that change the result (e.g. genome)
+
+    :param bed_digest: digest of the bed file
+    :param stage: stage name
+    :param params: stage parameters, JSON-serializable
+    :return: key (sha256 hex digest)
+    """
+    return hashlib.sha256(
+        json.dumps(
+            {
+                "bed_digest": bed_digest,
+                "stage": stage,
+                "version": STAGE_VERSIONS[stage],
+                "params": params or {},
+            },
+            sort_keys=True,
+        ).encode()
+    ).hexdigest()
+
+
+def file_digest(file_path: Union[str, None]) -> Union[str, None]:
+    """
+    Digest of the file content, used in the stage key instead of the file path,
+    so a changed (or different, but identically named) input file changes the key
+
+    :param file_path: path to the file
+    :return: sha256 hex digest, or None if the file is not provided or doesn't exist
+    """
+    if not file_path or not os.path.isfile(file_path):
+        return None
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _to_json(value: Any) -> Any:
+    """
+    Convert values that json can't serialize: pydantic models and numpy scalars
+    """
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def plot_files(result: dict) -> List[str]:
+    """
+    Files of plots in the stage result (plot dicts with path and thumbnail_path)
+
+    :param result: stage result
+    :return: list of paths
+    """
+    files = []
+    for value in result.values():
+        if isinstance(value, dict):
+            files += [value[k] for k in ("path", "thumbnail_path") if value.get(k)]
+    return files
+
+
+class StageCache:
+    """
+    Content-addressed cache of pipeline stage results, shared by all output folders
+    (and machines, if the folder is shared). Entry is a folder with the result dict
+    and output files of the stage. Paths of the files are stored relative to
+    the output folder, so they are restored to the same place in any output folder.
+
+    Entries are written atomically. Least recently used entries are evicted,
+    when the cache is larger than the size limit.
+    """
+
+    def __init__(self, folder: str = None, max_size: int = STAGE_CACHE_MAX_SIZE):
+        """
+        :param folder: cache folder [Default: <BEDBOSS_CACHE>/stages]
+        :param max_size: maximum size of the cache (bytes)
+        """
+        self.folder = folder or os.path.join(get_cache_folder(), STAGE_CACHE_FOLDER)
+        self.max_size = max_size
+        self._last_eviction = 0.0
+
+    def _entry_folder(self, key: str) -> str:
+        return os.path.join(self.folder, key[:2], key)
+
+    def get(self, key: str, outfolder: str) -> Union[Any, None]:
+        """
+        Get result of the stage, and restore its files to the output folder
+
+        :param key: stage key (stage_cache_key)
+        :param outfolder: output folder of the pipeline
+        :return: stage result, or None if it is not in the cache
+        """
+        entry_folder = self._entry_folder(key)
+        result_path = os.path.join(entry_folder, RESULT_FILE_NAME)
+        try:
+            with open(result_path, "r") as f:
+                entry = json.load(f)
+            for file in entry["files"]:
+                source = os.path.join(entry_folder, FILES_FOLDER_NAME, file)
+                target = os.path.join(outfolder, file)
+                os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+                # copied, not linked: files in the output folder can be overwritten
+                shutil.copyfile(source, target)
+            # last use time of the entry, for LRU eviction
+            os.utime(result_path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as err:
+            _LOGGER.warning(f"Unable to read stage cache entry {entry_folder}: {err}")
+            return None
+        _LOGGER.info(f"Stage result restored from cache: {key}")
+        return entry["result"]
+
+    def put(
+        self, key: str, result: Any, outfolder: str, files: Iterable[str] = ()
+    ) -> None:
+        """
+        Store result of the stage and its files. Errors are logged, not raised:
+        the pipeline doesn't depend on the cache.
+
+        :param key: stage key (stage_cache_key)
+        :param result: stage result, JSON-serializable (pydantic models and numpy scalars are converted)
+        :param outfolder: output folder of the pipeline
+        :param files: output files of the stage, absolute or relative to the output folder
+        """
+        entry_folder = self._entry_folder(key)
+        if os.path.exists(os.path.join(entry_folder, RESULT_FILE_NAME)):
+            return
+        temp_folder = None
+        try:
+            os.makedirs(os.path.dirname(entry_folder), exist_ok=True)
+            temp_folder = tempfile.mkdtemp(
+                suffix=".tmp", dir=os.path.dirname(entry_folder)
+            )
+            relative_files = []
+            size = 0
+            for file in files:
+                relative_file = os.path.relpath(
+                    os.path.join(outfolder, file), outfolder
+                )
+                if relative_file.startswith(os.pardir):
+                    raise ValueError(f"File is not in the output folder: {file}")
+                target = os.path.join(temp_folder, FILES_FOLDER_NAME, relative_file)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(os.path.join(outfolder, relative_file), target)
+                relative_files.append(relative_file)
+                size += os.path.getsize(target)
+
+            result_json = json.dumps(
+                {"result": result, "files": relative_files, "size": size},
+                default=_to_json,
+            )
+            with open(os.path.join(temp_folder, RESULT_FILE_NAME), "w") as f:
+                f.write(result_json)
+            try:
+                os.rename(temp_folder, entry_folder)
+            except OSError:
+                # entry was stored by another process in the meantime
+                if not os.path.exists(os.path.join(entry_folder, RESULT_FILE_NAME)):
+                    raise
+        except (OSError, TypeError, ValueError) as err:
+            _LOGGER.warning(f"Unable to store stage result in cache: {err}")
+        finally:
+            if temp_folder:
+                shutil.rmtree(temp_folder, ignore_errors=True)
+
+        if time.time() - self._last_eviction > STAGE_CACHE_EVICT_INTERVAL:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries, until the cache is smaller than max_size
+
+        :return: number of removed entries
+        """
+        self._last_eviction = time.time()
+        entries = []
+        total_size = 0
+        if not os.path.isdir(self.folder):
+            return 0
+        for prefix in os.scandir(self.folder):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name.endswith(".tmp"):
+                    # entry being written
+                    continue
+                result_path = os.path.join(entry.path, RESULT_FILE_NAME)
+                try:
+                    last_used = os.stat(result_path).st_mtime
+                    with open(result_path, "r") as f:
+                        size = json.load(f)["size"] + os.path.getsize(result_path)
+                except (OSError, ValueError, KeyError):
+                    continue
+                entries.append((last_used, size, entry.path))
+                total_size += size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+            removed += 1
+        if removed:
+            _LOGGER.info(f"Removed {removed} least recently used stage cache entries")
+        return removed
+
+
+def get_stage_cache(folder: str = None) -> StageCache:
+    """
+    Get stage cache of the folder, one object per process
+
+    :param folder: cache folder [Default: <BEDBOSS_CACHE>/stages]
+    :return: StageCache
+    """
+    folder = folder or os.path.join(get_cache_folder(), STAGE_CACHE_FOLDER)
+    with _LOCK:
+        if folder not in _STAGE_CACHES:
+            _STAGE_CACHES[folder] = StageCache(folder)
+        return _STAGE_CACHES[folder]
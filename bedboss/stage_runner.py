@@ -0,0 +1,146 @@
+import logging
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Callable, Dict, List, Literal, NamedTuple, Tuple
+
+from bedboss.const import PKG_NAME
+from bedboss.exceptions import BedBossException
+
+_LOGGER = logging.getLogger(PKG_NAME)
+
+
+class Stage(NamedTuple):
+    """
+    One step of the pipeline.
+
+    name: unique name of the stage
+    func: function that will be executed
+    kwargs: keyword arguments of the function
+    depends_on: names of stages that have to be finished before this stage starts
+    executor: "thread" for subprocess or I/O bound stages, "process" for CPU bound stages
+        (function and arguments have to be picklable)
+    """
+
+    name: str
+    func: Callable
+    kwargs: dict = {}
+    depends_on: Tuple[str, ...] = ()
+    executor: Literal["thread", "process"] = "thread"
+
+
+class StageTiming(NamedTuple):
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def run_stages(
+    stages: List[Stage], max_workers: int = None
+) -> Tuple[Dict[str, Any], Dict[str, StageTiming]]:
+    """
+    Run pipeline stages concurrently, respecting dependencies between them.
+    If any stage fails, stages that were not started yet are cancelled and the exception is raised.
+
+    :param stages: list of stages
+    :param max_workers: maximum number of stages running at the same time [Default: number of stages]
+    :return: tuple of results of all stages (stage name -> returned value)
+        and timings of all stages (stage name -> StageTiming)
+    """
+    stage_names = [stage.name for stage in stages]
+    for stage in stages:
+        for dependency in stage.depends_on:
+            if dependency not in stage_names:
+                raise BedBossException(
+                    f"Stage '{stage.name}' depends on unknown stage '{dependency}'"
+                )
+
+    max_workers = max_workers or max(len(stages), 1)
+    results = {}
+    timings = {}
+    pending = list(stages)
+    running: Dict[Future, Stage] = {}
+    started: Dict[str, float] = {}
+
+    thread_pool = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="bedboss-stage"
+    )
+    process_pool = None
+    if any(stage.executor == "process" for stage in stages):
+        process_pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    try:
+        while pending or running:
+            for stage in list(pending):
+                if len(running) >= max_workers:
+                    break
+                if all(dependency in results for dependency in stage.depends_on):
+                    pending.remove(stage)
+                    pool = process_pool if stage.executor == "process" else thread_pool
+                    started[stage.name] = time.time()
+                    running[pool.submit(stage.func, **stage.kwargs)] = stage
+
+            if not running:
+                raise BedBossException(
+                    f"Circular dependency between stages: {[s.name for s in pending]}"
+                )
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                timings[stage.name] = StageTiming(
+                    start=started[stage.name], end=time.time()
+                )
+                # raises exception of the failed stage
+                results[stage.name] = future.result()
+    finally:
+        thread_pool.shutdown(wait=True, cancel_futures=True)
+        if process_pool:
+            process_pool.shutdown(wait=True, cancel_futures=True)
+
+    report_stage_timings(stages, timings)
+    return results, timings
+
+
+def report_stage_timings(
+    stages: List[Stage], timings: Dict[str, StageTiming]
+) -> List[str]:
+    """
+    Log wall time of each stage and the critical path (chain of dependent stages that
+    determined the total wall time).
+
+    :param stages: list of stages
+    :param timings: timings of the stages
+    :return: list of stage names on the critical path
+    """
+    if not timings:
+        return []
+
+    for name, timing in timings.items():
+        _LOGGER.info(f"Stage '{name}' finished in {timing.duration:.2f} seconds")
+
+    dependencies = {stage.name: stage.depends_on for stage in stages}
+    critical_path = [max(timings, key=lambda name: timings[name].end)]
+    while True:
+        finished_dependencies = [
+            dep for dep in dependencies.get(critical_path[0], ()) if dep in timings
+        ]
+        if not finished_dependencies:
+            break
+        critical_path.insert(
+            0, max(finished_dependencies, key=lambda name: timings[name].end)
+        )
+
+    total = timings[critical_path[-1]].end - min(t.start for t in timings.values())
+    _LOGGER.info(
+        f"Critical path: {' -> '.join(critical_path)} ({total:.2f} seconds in total)"
+    )
+    return critical_path
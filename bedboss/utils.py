@@ -2,7 +2,6 @@ import glob
 import logging
 import os
 import time
-import urllib.request
 from functools import wraps
 
 import peppy
@@ -12,6 +11,8 @@ from pephubclient.files_manager import FilesManager
 from peppy.const import SAMPLE_RAW_DICT_KEY
 from pypiper import PipelineManager
 
+from bedboss.downloader import get_downloader
+from bedboss.exceptions import DownloadException
 from bedboss.refgenome_validator.main import ReferenceValidator
 
 _LOGGER = logging.getLogger("bedboss")
@@ -51,25 +52,29 @@ def standardize_genome_name(input_genome: str, bedfile: str = None) -> str:
         return input_genome
 
 
-def download_file(url: str, path: str, no_fail: bool = False) -> None:
+def download_file(
+    url: str, path: str, no_fail: bool = False, size: int = None, md5: str = None
+) -> bool:
     """
-    Download file from the url to specific location
+    Download file from the url to specific location. Partially downloaded file is
+    kept in `<path>.part` (and resumed by the next download), never in `path`.
 
     :param url: URL of the file
     :param path: Local path with filename
     :param no_fail: If True, do not raise exception if download fails
-    :return: NoReturn
+    :param size: expected size of the file in bytes (verified, if provided)
+    :param md5: expected md5 checksum of the file (verified, if provided)
+    :return: True if the file was downloaded
     """
-    _LOGGER.info(f"Downloading remote file: {url}")
-    _LOGGER.info(f"Local path: {os.path.abspath(path)}")
     try:
-        urllib.request.urlretrieve(url, path)
-        _LOGGER.info("File downloaded successfully!")
-    except Exception as e:
-        _LOGGER.error("File download failed.")
+        get_downloader().download(url, path, size=size, md5=md5)
+    except DownloadException as e:
+        _LOGGER.error(f"File download failed: {e}")
         if not no_fail:
             raise e
         _LOGGER.error("File download failed. Continuing anyway...")
+        return False
+    return True
 
 
 def get_genome_digest(genome: str) -> str:
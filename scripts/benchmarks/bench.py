@@ -0,0 +1,274 @@
+# Micro-benchmarks of bedboss hot paths on synthetic BED files.
+#
+# Run benchmarks and save results:
+#   python scripts/benchmarks/bench.py run --sizes 10000 1000000 --output results.json
+# Compare two result files (exit code is 1 if any benchmark is slower than threshold):
+#   python scripts/benchmarks/bench.py compare base.json results.json --threshold 0.2
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from generate import generate_bed
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.2
+
+
+class BenchmarkContext:
+    """
+    Synthetic input files of one size, generated lazily and reused by benchmarks
+    """
+
+    def __init__(self, data_dir: str, n_regions: int):
+        self.data_dir = data_dir
+        self.n_regions = n_regions
+        self._files = {}
+        self._cache = {}
+
+    def bed_file(self, bed_format: str = "bed", gz: bool = True) -> str:
+        key = (bed_format, gz)
+        if key not in self._files:
+            extension = {
+                "bed": "bed",
+                "narrowpeak": "narrowPeak",
+                "broadpeak": "broadPeak",
+            }
+            path = os.path.join(
+                self.data_dir,
+                f"synthetic_{self.n_regions}.{extension[bed_format]}{'.gz' if gz else ''}",
+            )
+            if not os.path.exists(path):
+                print(f"  generating {os.path.basename(path)}")
+                generate_bed(path, self.n_regions, bed_format=bed_format)
+            self._files[key] = path
+        return self._files[key]
+
+    def cached(self, key: str, func: Callable):
+        if key not in self._cache:
+            self._cache[key] = func()
+        return self._cache[key]
+
+
+def bench_get_bed_type(ctx: BenchmarkContext) -> Callable:
+    from bedboss.bedclassifier.bedclassifier import get_bed_type
+
+    files = [
+        ctx.bed_file(bed_format) for bed_format in ("bed", "narrowpeak", "broadpeak")
+    ]
+    return lambda: [get_bed_type(file) for file in files]
+
+
+def bench_bedqc(ctx: BenchmarkContext) -> Callable:
+    from bedboss.bedqc.bedqc import bedqc
+
+    file = ctx.bed_file()
+    outfolder = os.path.join(ctx.data_dir, "bedqc")
+    return lambda: bedqc(file, outfolder=outfolder, max_region_number=ctx.n_regions * 2)
+
+
+def bench_bed_regions(ctx: BenchmarkContext) -> Callable:
+    from bedboss.bed_regions import BedRegions
+
+    file = ctx.bed_file("narrowpeak")
+    return lambda: BedRegions.from_file(file).identifier
+
+
+def bench_get_bed_chrom_info(ctx: BenchmarkContext) -> Callable:
+    from bedboss.refgenome_validator.utils import get_bed_chrom_info
+
+    file = ctx.bed_file()
+    return lambda: get_bed_chrom_info(file)
+
+
+def bench_determine_compatibility(ctx: BenchmarkContext) -> Callable:
+    from bedboss.refgenome_validator.main import ReferenceValidator
+
+    file = ctx.bed_file()
+    return lambda: ReferenceValidator().determine_compatibility(file, concise=True)
+
+
+def bench_calculate_chrom_stats(ctx: BenchmarkContext) -> Callable:
+    from bedboss.refgenome_validator.main import ReferenceValidator
+    from bedboss.refgenome_validator.utils import get_bed_chrom_info
+
+    validator = ReferenceValidator()
+    chrom_info = ctx.cached("chrom_info", lambda: get_bed_chrom_info(ctx.bed_file()))
+
+    def run():
+        for genome_model in validator.genome_models:
+            validator.calculate_chrom_stats(chrom_info, genome_model.chrom_sizes)
+
+    return run
+
+
+def bench_sort_bed(ctx: BenchmarkContext) -> Callable:
+    from bedboss.bedmaker.bed_sort import sort_bed
+
+    file = ctx.bed_file()
+    output = os.path.join(ctx.data_dir, "sorted.bed")
+    return lambda: sort_bed(file, output, temp_dir=ctx.data_dir)
+
+
+def bench_skipper(ctx: BenchmarkContext) -> Callable:
+    from bedboss.skipper import Skipper
+
+    folder = os.path.join(ctx.data_dir, "skipper")
+    os.makedirs(folder, exist_ok=True)
+    name = f"skipper_{ctx.n_regions}"
+    log_file = os.path.join(folder, f"{name}.log")
+    with open(log_file, "w") as f:
+        f.writelines(f"gsm{i},{i:032x}\n" for i in range(ctx.n_regions))
+    log_size = os.path.getsize(log_file)
+    n_appends = min(ctx.n_regions, 10_000)
+
+    def run():
+        skipper = Skipper(output_path=folder, name=name)
+        for i in range(n_appends):
+            skipper.add_processed(f"new_gsm{i}", f"{i:032x}")
+        # restore original log, so every repeat starts from the same state
+        with open(log_file, "r+") as f:
+            f.truncate(log_size)
+
+    return run
+
+
+BENCHMARKS: Dict[str, Callable[[BenchmarkContext], Callable]] = {
+    "get_bed_type": bench_get_bed_type,
+    "bedqc": bench_bedqc,
+    "bed_regions": bench_bed_regions,
+    "get_bed_chrom_info": bench_get_bed_chrom_info,
+    "determine_compatibility": bench_determine_compatibility,
+    "calculate_chrom_stats": bench_calculate_chrom_stats,
+    "sort_bed": bench_sort_bed,
+    "skipper_load_append": bench_skipper,
+}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return "unknown"
+
+
+def run_benchmarks(
+    sizes: List[int], names: List[str], repeat: int, data_dir: str
+) -> dict:
+    results = {name: {} for name in names}
+    for size in sizes:
+        print(f"Size: {size} regions")
+        ctx = BenchmarkContext(data_dir, size)
+        for name in names:
+            try:
+                func = BENCHMARKS[name](ctx)
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    func()
+                    timings.append(time.perf_counter() - start)
+            except Exception as err:
+                print(f"  {name}: failed with {type(err).__name__}: {err}")
+                results[name][str(size)] = {"error": str(err)}
+                continue
+            results[name][str(size)] = {
+                "min": min(timings),
+                "median": statistics.median(timings),
+                "repeat": repeat,
+            }
+            print(f"  {name}: {min(timings):.4f} s (min of {repeat})")
+
+    return {
+        "metadata": {
+            "commit": _git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare_results(base: dict, new: dict, threshold: float) -> bool:
+    """
+    Print comparison of two result files
+
+    :return: True if any benchmark is slower than threshold
+    """
+    regression = False
+    print(f"{'benchmark':<26}{'size':>10}{'base [s]':>12}{'new [s]':>12}{'change':>10}")
+    for name, sizes in new["results"].items():
+        for size, timing in sizes.items():
+            base_timing = base["results"].get(name, {}).get(size)
+            if not base_timing or "min" not in base_timing or "min" not in timing:
+                continue
+            change = timing["min"] / base_timing["min"] - 1
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regression = True
+            print(
+                f"{name:<26}{size:>10}{base_timing['min']:>12.4f}{timing['min']:>12.4f}"
+                f"{change:>+10.1%}{flag}"
+            )
+    return regression
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bedboss micro-benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    run_parser.add_argument(
+        "--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS)
+    )
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument(
+        "--data-dir",
+        default=None,
+        help="Folder for synthetic files, reused between runs [Default: temporary folder]",
+    )
+    run_parser.add_argument("--output", default="benchmark_results.json")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        if args.data_dir:
+            os.makedirs(args.data_dir, exist_ok=True)
+            results = run_benchmarks(args.sizes, args.only, args.repeat, args.data_dir)
+        else:
+            with tempfile.TemporaryDirectory() as data_dir:
+                results = run_benchmarks(args.sizes, args.only, args.repeat, data_dir)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.output}")
+
+    elif args.command == "compare":
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        if compare_results(base, new, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
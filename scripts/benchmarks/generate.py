@@ -0,0 +1,124 @@
+# Generators of synthetic BED files for benchmarks
+import gzip
+import os
+from typing import Dict
+
+import numpy as np
+
+CHROM_SIZES_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "..",
+    "bedboss",
+    "refgenome_validator",
+    "chrom_sizes",
+    "ucsc_hg38.chrom.sizes",
+)
+
+BED_FORMATS = ("bed", "narrowpeak", "broadpeak")
+# number of regions written at once
+WRITE_CHUNK = 100_000
+
+
+def read_chrom_sizes(path: str = CHROM_SIZES_FILE) -> Dict[str, int]:
+    """
+    Read chrom sizes file
+
+    :param path: path to the chrom sizes file
+    :return: dict of chrom names and lengths
+    """
+    chrom_sizes = {}
+    with open(path) as f:
+        for line in f:
+            chrom, size = line.split()[:2]
+            chrom_sizes[chrom] = int(size)
+    return chrom_sizes
+
+
+def _format_chunk(
+    rng: np.random.Generator,
+    bed_format: str,
+    chroms: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    first_index: int,
+) -> str:
+    n = len(starts)
+    names = (f"region_{i}" for i in range(first_index, first_index + n))
+    if bed_format == "bed":
+        columns = [chroms, starts, ends]
+    else:
+        scores = rng.integers(0, 1001, n)
+        signal = rng.uniform(1, 100, n).round(5)
+        p_values = rng.uniform(0, 300, n).round(5)
+        q_values = rng.uniform(0, 300, n).round(5)
+        columns = [
+            chroms,
+            starts,
+            ends,
+            list(names),
+            scores,
+            ["."] * n,
+            signal,
+            p_values,
+            q_values,
+        ]
+        if bed_format == "narrowpeak":
+            columns.append(rng.integers(0, 200, n))
+    return "".join("\t".join(map(str, row)) + "\n" for row in zip(*columns))
+
+
+def generate_bed(
+    path: str,
+    n_regions: int,
+    bed_format: str = "bed",
+    sort: bool = False,
+    seed: int = 42,
+    mean_width: int = 500,
+) -> str:
+    """
+    Generate synthetic BED file with regions on hg38 chromosomes.
+    Files ending with .gz are gzipped.
+
+    :param path: path to the output file
+    :param n_regions: number of regions
+    :param bed_format: bed, narrowpeak or broadpeak
+    :param sort: sort regions by chromosome and start
+    :param seed: seed of the random generator
+    :param mean_width: mean width of regions
+    :return: path to the generated file
+    """
+    if bed_format not in BED_FORMATS:
+        raise ValueError(f"Unknown bed format: {bed_format}. Use one of {BED_FORMATS}")
+
+    rng = np.random.default_rng(seed)
+    chrom_sizes = read_chrom_sizes()
+    chrom_names = np.array(list(chrom_sizes))
+    lengths = np.array(list(chrom_sizes.values()), dtype=np.int64)
+
+    # chromosomes are chosen proportionally to their length
+    chrom_codes = rng.choice(
+        len(chrom_names), size=n_regions, p=lengths / lengths.sum()
+    )
+    widths = rng.integers(mean_width // 10, mean_width * 2, n_regions)
+    starts = (rng.random(n_regions) * (lengths[chrom_codes] - widths)).astype(np.int64)
+    if sort:
+        order = np.lexsort((starts, chrom_names[chrom_codes]))
+        chrom_codes, starts, widths = chrom_codes[order], starts[order], widths[order]
+    ends = starts + widths
+
+    open_func = gzip.open if path.endswith(".gz") else open
+    with open_func(path, "wt") as f:
+        for first in range(0, n_regions, WRITE_CHUNK):
+            last = first + WRITE_CHUNK
+            f.write(
+                _format_chunk(
+                    rng,
+                    bed_format,
+                    chrom_names[chrom_codes[first:last]],
+                    starts[first:last],
+                    ends[first:last],
+                    first,
+                )
+            )
+    return path
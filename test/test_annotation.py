@@ -0,0 +1,93 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from bedboss.bed_regions import BedRegions
+from bedboss.bedstat.annotation import (
+    TSSIndex,
+    ensembl_to_ucsc,
+    get_tss_index,
+    median_tss_distance,
+    read_gtf,
+    tss_distance_histogram,
+)
+
+GTF = (
+    "#!genome-build GRCh38\n"
+    '1\tensembl\tgene\t1001\t2000\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\texon\t1001\t1200\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\tgene\t5001\t6000\t.\t-\t.\tgene_id "g2"; gene_biotype "protein_coding";\n'
+    '1\tensembl\tgene\t3001\t3500\t.\t+\t.\tgene_id "g3"; gene_biotype "lncRNA";\n'
+    'MT\tensembl\tgene\t101\t200\t.\t+\t.\tgene_id "g4"; gene_biotype "protein_coding";\n'
+)
+
+
+@pytest.fixture
+def gtf_file(tmp_path):
+    path = tmp_path / "genes.gtf.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(GTF)
+    return str(path)
+
+
+@pytest.fixture
+def regions(tmp_path):
+    bed_file = tmp_path / "regions.bed"
+    bed_file.write_text(
+        "chr1\t900\t1000\n"  # mid 950, TSS 1000
+        "chr1\t5500\t5700\n"  # mid 5600, TSS 5999
+        "chr1\t3000\t3100\n"  # mid 3050, between 1000 and 5999
+        "chrM\t90\t110\n"  # mid 100, TSS 100
+        "chr2\t0\t100\n"  # no TSS on chr2
+    )
+    return BedRegions.from_file(bed_file)
+
+
+class TestAnnotation:
+    @pytest.mark.parametrize(
+        "chrom, expected", [("1", "chr1"), ("MT", "chrM"), ("chrX", "chrX")]
+    )
+    def test_ensembl_to_ucsc(self, chrom, expected):
+        assert ensembl_to_ucsc(chrom) == expected
+
+    def test_read_gtf(self, gtf_file):
+        genes = read_gtf(gtf_file, features=["gene"])
+        assert genes["chrom"].tolist() == ["chr1", "chr1", "chrM"]
+        assert genes["start"].tolist() == [1000, 5000, 100]
+        assert genes["end"].tolist() == [2000, 6000, 200]
+
+    def test_tss_from_gtf(self, gtf_file):
+        index = TSSIndex.from_gtf(gtf_file)
+        assert index.tss["chr1"].tolist() == [1000, 5999]
+        assert index.tss["chrM"].tolist() == [100]
+
+    def test_distances(self, gtf_file, regions):
+        distances = TSSIndex.from_gtf(gtf_file).distances(regions)
+        assert distances[:4].tolist() == [-50, -399, 2050, 0]
+        assert np.isnan(distances[4])
+        assert median_tss_distance(distances) == 224.5
+
+    def test_distances_brute_force(self, tmp_path):
+        rng = np.random.default_rng(0)
+        tss = np.sort(rng.integers(0, 1_000_000, 200))
+        starts = rng.integers(0, 1_000_000, 1000)
+        bed_file = tmp_path / "random.bed"
+        bed_file.write_text(
+            "".join(f"chr1\t{start}\t{start + 100}\n" for start in starts)
+        )
+        distances = TSSIndex({"chr1": tss}).distances(BedRegions.from_file(bed_file))
+        mids = starts + 50
+        expected = np.abs(mids[:, None] - tss[None, :]).min(axis=1)
+        assert np.array_equal(np.abs(distances), expected)
+
+    def test_index_is_reused(self, gtf_file, tmp_path, monkeypatch):
+        monkeypatch.setenv("BEDBOSS_CACHE", str(tmp_path / "cache"))
+        assert get_tss_index(gtf_file) is get_tss_index(gtf_file)
+
+    def test_histogram(self):
+        counts, edges = tss_distance_histogram(
+            np.array([-150_000, -10, 10, 99_999, np.nan]), limit=100_000, bins=4
+        )
+        assert counts.tolist() == [0, 1, 1, 1]
+        assert edges[0] == -100_000
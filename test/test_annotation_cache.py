@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from bedboss.bed_regions import BedRegions
+from bedboss.bedstat.annotation import TSSIndex
+from bedboss.bedstat.annotation_cache import (
+    AnnotationCache,
+    build_annotation_cache,
+    get_annotation_cache,
+)
+from bedboss.bedstat.partitions import PartitionMap
+
+GTF = (
+    '1\tensembl\tgene\t10001\t20000\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\texon\t10001\t11000\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\tfive_prime_utr\t10001\t10100\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\texon\t19001\t20000\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\tthree_prime_utr\t19501\t20000\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '2\tensembl\tgene\t5001\t6000\t.\t-\t.\tgene_id "g2"; gene_biotype "protein_coding";\n'
+)
+
+
+@pytest.fixture
+def gtf_file(tmp_path):
+    path = tmp_path / "genes.gtf"
+    path.write_text(GTF)
+    return str(path)
+
+
+@pytest.fixture
+def regions(tmp_path):
+    bed_file = tmp_path / "regions.bed"
+    bed_file.write_text(
+        "chr1\t9950\t9960\n" "chr1\t15000\t15100\n" "chr2\t5500\t5600\n" "chr3\t0\t10\n"
+    )
+    return BedRegions.from_file(bed_file)
+
+
+class TestAnnotationCache:
+    def test_features(self, gtf_file):
+        annotation = AnnotationCache.from_gtf(gtf_file)
+        assert annotation.chrom_names == ["chr1", "chr2"]
+        genes = annotation.features["genes"].to_dataframe(annotation.chrom_names)
+        assert genes.values.tolist() == [
+            ["chr1", 10000, 20000, "+"],
+            ["chr2", 5000, 6000, "-"],
+        ]
+        introns = annotation.features["introns"]
+        assert introns.starts.tolist() == [11000, 5000]
+        assert introns.ends.tolist() == [19000, 6000]
+
+    def test_saved_cache_is_memory_mapped(self, gtf_file, regions, tmp_path):
+        folder = build_annotation_cache(gtf_file, cache_folder=str(tmp_path / "cache"))
+        annotation = AnnotationCache.load(folder)
+        assert isinstance(annotation.tss_index.keys, np.memmap)
+        assert isinstance(annotation.features["exons"].starts, np.memmap)
+
+        tss_distances = annotation.tss_index.distances(regions)
+        expected = TSSIndex.from_gtf(gtf_file).distances(regions)
+        assert np.array_equal(tss_distances, expected, equal_nan=True)
+
+        result = annotation.partition_map.calculate(regions, genome_size=100_000)
+        expected = PartitionMap.from_gtf(gtf_file).calculate(
+            regions, genome_size=100_000
+        )
+        assert result.observed.tolist() == expected.observed.tolist()
+        assert np.allclose(result.expected, expected.expected)
+
+    def test_cache_is_content_addressed(self, gtf_file, tmp_path):
+        cache_folder = str(tmp_path / "cache")
+        copy = tmp_path / "copy.gtf"
+        copy.write_text(GTF)
+        assert build_annotation_cache(
+            gtf_file, cache_folder=cache_folder
+        ) == build_annotation_cache(str(copy), cache_folder=cache_folder)
+
+    def test_annotation_is_reused(self, gtf_file, tmp_path):
+        cache_folder = str(tmp_path / "cache")
+        annotation = get_annotation_cache(gtf_file, cache_folder=cache_folder)
+        assert get_annotation_cache(gtf_file, cache_folder=cache_folder) is annotation
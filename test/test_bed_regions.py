@@ -0,0 +1,61 @@
+import gzip
+import os
+
+import pytest
+from geniml.io import RegionSet
+
+from bedboss.bed_regions import BedRegions
+from bedboss.exceptions import BedBossException
+from bedboss.refgenome_validator.utils import get_bed_chrom_info
+
+FILE_DIR = os.path.dirname(os.path.realpath(__file__))
+HG19_CORRECT_DIR = os.path.join(FILE_DIR, "test_data", "bed", "hg19", "correct")
+FILE_PATH = f"{HG19_CORRECT_DIR}/hg19_example1.bed"
+
+NARROWPEAK = (
+    "track name=peaks\n"
+    "chr1\t100\t200\t.\t0\t.\t2.5\t-1\t3.1\t10\n"
+    "chr3\t10\t50\t.\t0\t.\t2.5\t-1\t3.1\t10\n"
+    "chr1\t300\t900\t.\t0\t.\t2.5\t-1\t3.1\t10\n"
+)
+
+
+@pytest.fixture
+def gz_narrowpeak(tmp_path):
+    path = tmp_path / "peaks.narrowPeak.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(NARROWPEAK)
+    return str(path)
+
+
+@pytest.mark.parametrize("path", [FILE_PATH, "gz_narrowpeak"])
+def test_identifier_equals_regionset(path, request):
+    if path == "gz_narrowpeak":
+        path = request.getfixturevalue(path)
+    assert BedRegions.from_file(path).identifier == RegionSet(path).identifier
+
+
+def test_columns(gz_narrowpeak):
+    regions = BedRegions.from_file(gz_narrowpeak)
+
+    assert len(regions) == 3
+    assert regions.chroms.tolist() == ["chr1", "chr3", "chr1"]
+    assert regions.widths.tolist() == [100, 40, 600]
+    assert regions.extra.shape == (3, 7)
+    assert regions.to_pandas().shape == (3, 10)
+
+
+def test_chrom_info(gz_narrowpeak):
+    regions = BedRegions.from_file(gz_narrowpeak)
+
+    assert get_bed_chrom_info(regions) == {"chr1": 900, "chr3": 50}
+    assert get_bed_chrom_info(FILE_PATH) == get_bed_chrom_info(
+        BedRegions.from_file(FILE_PATH)
+    )
+
+
+def test_unparsable_file(tmp_path):
+    path = tmp_path / "bad.bed"
+    path.write_text("a\tb\tc\n" * 10)
+    with pytest.raises(BedBossException):
+        BedRegions.from_file(str(path))
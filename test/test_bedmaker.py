@@ -0,0 +1,94 @@
+import gzip
+import random
+
+import pytest
+
+import bedboss.bedmaker.bedmaker as bedmaker_module
+from bedboss.bedmaker.bed_sort import is_bed_sorted, sort_bed
+
+CHROMS = ["chr1", "chr10", "chr2", "chrX", "chr1_random", "Chr3"]
+
+
+def _expected_order(lines):
+    return sorted(
+        lines, key=lambda line: (line.split("\t")[0].encode(), int(line.split("\t")[1]))
+    )
+
+
+@pytest.fixture
+def unsorted_bed(tmp_path):
+    random.seed(1)
+    lines = [
+        f"{random.choice(CHROMS)}\t{start}\t{start + 10}\tname{i}\n"
+        for i, start in enumerate(random.sample(range(100000), 2000))
+    ]
+    path = tmp_path / "unsorted.bed.gz"
+    with gzip.open(path, "wt") as f:
+        f.write("track name=test\n")
+        f.writelines(lines)
+    return str(path), lines
+
+
+@pytest.mark.parametrize("max_memory", [10**9, 4096])
+def test_sort_bed(unsorted_bed, tmp_path, max_memory):
+    path, lines = unsorted_bed
+    output = sort_bed(path, tmp_path / "sorted.bed", max_memory=max_memory)
+
+    with open(output) as f:
+        assert f.readlines() == _expected_order(lines)
+    assert is_bed_sorted(output)
+    assert list(tmp_path.glob("sort_chunk_*")) == []
+
+
+def test_sort_bed_columns(unsorted_bed, tmp_path):
+    path, lines = unsorted_bed
+    output = sort_bed(path, tmp_path / "sorted.bed", columns=3, max_memory=4096)
+
+    with open(output) as f:
+        assert f.readlines() == [
+            "\t".join(line.split("\t")[:3]) + "\n" for line in _expected_order(lines)
+        ]
+
+
+def test_sorted_bed_is_not_copied(tmp_path):
+    path = tmp_path / "sorted.bed"
+    path.write_text("chr1\t5\t10\nchr1\t7\t10\nchr2\t1\t10\n")
+
+    assert is_bed_sorted(path)
+    assert sort_bed(path, tmp_path / "output.bed") == str(path)
+    assert not (tmp_path / "output.bed").exists()
+
+
+def test_is_bed_sorted(tmp_path):
+    path = tmp_path / "unsorted.bed"
+    path.write_text("chr2\t5\t10\nchr10\t7\t10\n")
+    assert not is_bed_sorted(path)
+
+
+class FakePipelineManager:
+    def stop_pipeline(self):
+        pass
+
+
+def test_make_all_sort_options(tmp_path, monkeypatch):
+    bed_path = tmp_path / "input.bed"
+    bed_path.write_text("chr1\t10\t20\nchr1\t5\t8\n")
+    calls = []
+    # bed file is used as it is (not added to the bbclient cache)
+    monkeypatch.setattr(bedmaker_module, "make_bed", lambda **kwargs: str(bed_path))
+    monkeypatch.setattr(bedmaker_module, "get_bed_type", lambda bed: ("bed3", "bed"))
+    monkeypatch.setattr(
+        bedmaker_module, "make_bigbed", lambda **kwargs: calls.append(kwargs)
+    )
+    bedmaker_module.make_all(
+        input_file=str(bed_path),
+        input_type="bed",
+        output_path=str(tmp_path / "out"),
+        genome="hg38",
+        check_qc=False,
+        pm=FakePipelineManager(),
+        sort_memory=1024,
+        sort_temp_dir=str(tmp_path),
+    )
+    assert calls[0]["sort_memory"] == 1024
+    assert calls[0]["temp_dir"] == str(tmp_path)
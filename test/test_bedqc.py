@@ -0,0 +1,72 @@
+import gzip
+
+import pytest
+
+from bedboss.bedqc.bedqc import bedqc, scan_bed
+from bedboss.exceptions import QualityException
+
+REGIONS = (
+    "track name=test\n"
+    "# comment\n"
+    "chr1\t100\t200\tpeak1\n"
+    "chr1\t300\t350\tpeak_with_long_name\n"
+    "\n"
+    "chr2\t10\t1010\tpeak3\n"
+)
+
+
+@pytest.fixture
+def bed_file(tmp_path):
+    path = tmp_path / "regions.bed"
+    path.write_text(REGIONS)
+    return str(path)
+
+
+@pytest.fixture
+def gz_bed_file(tmp_path):
+    path = tmp_path / "regions.bed.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(REGIONS)
+    return str(path)
+
+
+@pytest.mark.parametrize("file_fixture", ["bed_file", "gz_bed_file"])
+def test_scan_bed(file_fixture, request):
+    path = request.getfixturevalue(file_fixture)
+    result = scan_bed(path)
+
+    assert result.number_of_regions == 3
+    assert result.mean_region_width == pytest.approx(1150 / 3)
+    assert result.min_region_width == 50
+    assert result.max_region_width == 1000
+    assert result.file_size > 0
+    assert not result.truncated
+
+
+def test_scan_bed_stops_early(bed_file):
+    result = scan_bed(bed_file, max_region_number=1)
+
+    assert result.number_of_regions == 2
+    assert result.truncated
+
+
+def test_scan_bed_malformed(tmp_path):
+    path = tmp_path / "malformed.bed"
+    path.write_text("chr1\t100\n")
+    with pytest.raises(QualityException):
+        scan_bed(str(path))
+
+
+def test_bedqc_passes(gz_bed_file, tmp_path):
+    assert bedqc(gz_bed_file, outfolder=str(tmp_path / "qc"))
+
+
+def test_bedqc_too_many_regions(bed_file, tmp_path):
+    with pytest.raises(QualityException):
+        bedqc(bed_file, outfolder=str(tmp_path / "qc"), max_region_number=2)
+    assert (tmp_path / "qc" / "failed_qc.csv").exists()
+
+
+def test_bedqc_narrow_regions(bed_file, tmp_path):
+    with pytest.raises(QualityException):
+        bedqc(bed_file, outfolder=str(tmp_path / "qc"), min_region_width=500)
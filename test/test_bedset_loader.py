@@ -0,0 +1,62 @@
+import gzip
+
+import pytest
+from geniml.bbclient import BBClient
+from geniml.io import RegionSet
+from geniml.io.utils import compute_md5sum_bedset
+
+from bedboss.bed_regions import BedRegions
+from bedboss.bedbuncher import bedset_loader
+from bedboss.bedbuncher.bedset_loader import load_bedset
+from bedboss.downloader import Downloader
+from bedboss.exceptions import BedBossException
+
+
+@pytest.fixture
+def bbclient(tmp_path):
+    # unreachable API: only files that are already in the cache can be loaded
+    return BBClient(
+        cache_folder=str(tmp_path / "cache"), bedbase_api="http://127.0.0.1:9"
+    )
+
+
+@pytest.fixture
+def bed_ids(tmp_path, bbclient):
+    bed_ids = []
+    for index in range(5):
+        bed_file = tmp_path / f"file{index}.bed"
+        bed_file.write_text(
+            "".join(f"chr{index + 1}\t{i * 100}\t{i * 100 + 50}\n" for i in range(10))
+        )
+        bed_id = BedRegions.from_file(bed_file).identifier
+        with gzip.open(bbclient._bedfile_path(bed_id), "wb") as f:
+            f.write(bed_file.read_bytes())
+        bed_ids.append(bed_id)
+    return bed_ids
+
+
+class TestBedsetLoader:
+    @pytest.mark.parametrize("parse_workers", [1, 2])
+    def test_load_bedset(self, bbclient, bed_ids, parse_workers):
+        bedset = load_bedset(bed_ids, bbclient=bbclient, parse_workers=parse_workers)
+        assert bedset.bed_ids == bed_ids
+        assert bedset.paths == [bbclient._bedfile_path(bed_id) for bed_id in bed_ids]
+        assert bedset.identifier == compute_md5sum_bedset(
+            [RegionSet(path).identifier for path in bedset.paths]
+        )
+        # parsed regions are returned, in order of bed ids
+        assert [regions.identifier for regions in bedset.regions] == bed_ids
+        assert all(len(regions) == 10 for regions in bedset.regions)
+
+    def test_order_changes_identifier(self, bbclient, bed_ids):
+        assert (
+            load_bedset(bed_ids, bbclient=bbclient, parse_workers=1).identifier
+            != load_bedset(bed_ids[::-1], bbclient=bbclient, parse_workers=1).identifier
+        )
+
+    def test_download_error(self, bbclient, bed_ids, monkeypatch):
+        monkeypatch.setattr(
+            bedset_loader, "get_downloader", lambda: Downloader(retries=0)
+        )
+        with pytest.raises(BedBossException, match="not_cached"):
+            load_bedset(bed_ids + ["not_cached"], bbclient=bbclient, parse_workers=1)
@@ -0,0 +1,131 @@
+import json
+import os
+import re
+
+import pytest
+
+from bedboss.bed_regions import BedRegions
+from bedboss.bedstat.bedstat import bedstat_batch, get_python_plot_ids
+from bedboss.const import BEDSTAT_OUTPUT, OUTPUT_FOLDER_NAME
+from bedboss.exceptions import BedBossException
+
+
+class FakePipelineManager:
+    """
+    Runs regionstat.R manifest jobs: writes statistics of every file, except 'fail.bed'
+    """
+
+    def __init__(self):
+        self.manifests = []
+
+    def run(self, cmd: str, lock_name: str = None):
+        manifest_path = re.search(r"--manifest=(\S+)", cmd).group(1)
+        with open(manifest_path) as f:
+            rows = [line.rstrip("\n").split("\t") for line in f]
+        self.manifests.append(rows)
+        for bedfile, digest, _, output_folder, *_ in rows[1:]:
+            if os.path.basename(bedfile) != "fail.bed":
+                with open(os.path.join(output_folder, f"{digest}.json"), "w") as f:
+                    json.dump({"number_of_regions": [1]}, f)
+
+    def stop_pipeline(self):
+        pass
+
+
+@pytest.fixture
+def bedfiles(tmp_path):
+    bedfiles = []
+    for index, name in enumerate(["a.bed", "b.bed", "fail.bed"]):
+        path = tmp_path / name
+        path.write_text(f"chr1\t{index}\t100\n")
+        bedfiles.append(str(path))
+    return bedfiles
+
+
+class TestBedstatBatch:
+    def test_manifest(self, tmp_path, bedfiles):
+        pm = FakePipelineManager()
+        outfolder = str(tmp_path / "out")
+        results = bedstat_batch(
+            bedfiles,
+            genome=["hg38", "mm10", "hg38"],
+            outfolder=outfolder,
+            collect=False,
+            pm=pm,
+        )
+        digests = [BedRegions.from_file(path).identifier for path in bedfiles]
+        # failed file is not in the results
+        assert results == {digests[0]: None, digests[1]: None}
+
+        header, *rows = pm.manifests[0]
+        assert header == [
+            "bedfilePath",
+            "digest",
+            "genome",
+            "outputFolder",
+            "ensdb",
+            "skipPlots",
+        ]
+        assert [row[:3] for row in rows] == [
+            [os.path.abspath(bedfiles[0]), digests[0], "hg38"],
+            [os.path.abspath(bedfiles[1]), digests[1], "mm10"],
+            [os.path.abspath(bedfiles[2]), digests[2], "hg38"],
+        ]
+        assert rows[0][3] == os.path.abspath(
+            os.path.join(outfolder, OUTPUT_FOLDER_NAME, BEDSTAT_OUTPUT, digests[0])
+        )
+        assert rows[0][4] == "None"
+
+    def test_existing_statistics_skipped(self, tmp_path, bedfiles):
+        pm = FakePipelineManager()
+        outfolder = str(tmp_path / "out")
+        bedstat_batch(
+            bedfiles[:1], genome="hg38", outfolder=outfolder, collect=False, pm=pm
+        )
+        bedstat_batch(
+            bedfiles, genome="hg38", outfolder=outfolder, collect=False, pm=pm
+        )
+        assert [row[0] for row in pm.manifests[1][1:]] == [
+            os.path.abspath(path) for path in bedfiles[1:]
+        ]
+
+        # R is not started, if all files have statistics
+        bedstat_batch(
+            bedfiles[:2], genome="hg38", outfolder=outfolder, collect=False, pm=pm
+        )
+        assert len(pm.manifests) == 2
+
+    def test_different_lengths(self, tmp_path, bedfiles):
+        with pytest.raises(BedBossException):
+            bedstat_batch(bedfiles, genome=["hg38"], outfolder=str(tmp_path))
+
+
+class TestPythonPlotIds:
+    def test_chrombins(self):
+        assert "chrombins" in get_python_plot_ids("hg38")
+        assert "chrombins" in get_python_plot_ids("dm6")
+        # no bundled chrom sizes: regionstat.R creates the plot
+        assert "chrombins" not in get_python_plot_ids("dm3")
+        assert "widths_histogram" in get_python_plot_ids("dm3")
+
+    def test_tss_distance(self, tmp_path):
+        ensdb = tmp_path / "annotation.gtf"
+        ensdb.write_text("")
+        # reference TSS annotation of regionstat.R is used for the main genomes
+        assert "tss_distance" not in get_python_plot_ids("hg38", str(ensdb))
+        assert "tss_distance" in get_python_plot_ids("dm6", str(ensdb))
+        assert "tss_distance" not in get_python_plot_ids("dm6")
+
+    def test_partitions(self, tmp_path):
+        ensdb = tmp_path / "annotation.gtf"
+        ensdb.write_text("")
+        partition_plots = ["partitions", "cumulative_partitions", "expected_partitions"]
+        # reference partitions of regionstat.R are used for the main genomes
+        plot_ids = get_python_plot_ids("hg38", str(ensdb))
+        assert not set(partition_plots) & set(plot_ids)
+        # mm9 has no reference partitions, only reference TSS
+        assert set(partition_plots) <= set(get_python_plot_ids("mm9", str(ensdb)))
+        assert set(partition_plots) <= set(get_python_plot_ids("dm6", str(ensdb)))
+        # genome size is unknown, so expected partitions are created by regionstat.R
+        plot_ids = get_python_plot_ids("dm3", str(ensdb))
+        assert "partitions" in plot_ids and "expected_partitions" not in plot_ids
@@ -0,0 +1,35 @@
+from bedboss.checkpoint import Checkpoint
+
+
+class TestCheckpoint:
+    def test_resume(self, tmp_path):
+        file_path = str(tmp_path / "checkpoint.jsonl")
+        checkpoint = Checkpoint(file_path)
+        checkpoint.add("bed1", success=True)
+        checkpoint.add("bed2", success=False, error="boom")
+
+        resumed = Checkpoint(file_path)
+        assert resumed.is_done("bed1")
+        assert resumed.is_done("bed2")
+        assert not resumed.is_done("bed2", retry_failed=True)
+        assert not resumed.is_done("bed3")
+        assert [record["id"] for record in resumed.failed] == ["bed2"]
+
+    def test_latest_record_wins(self, tmp_path):
+        file_path = str(tmp_path / "checkpoint.jsonl")
+        Checkpoint(file_path).add("bed1", success=False, error="boom")
+        Checkpoint(file_path).add("bed1", success=True)
+        assert Checkpoint(file_path).failed == []
+
+    def test_broken_line(self, tmp_path):
+        file_path = tmp_path / "checkpoint.jsonl"
+        Checkpoint(str(file_path)).add("bed1", success=True)
+        # line that was being written when the process was killed
+        with open(file_path, "a") as file:
+            file.write('{"id": "bed2", "sta')
+        checkpoint = Checkpoint(str(file_path))
+        assert checkpoint.is_done("bed1")
+        assert not checkpoint.is_done("bed2")
+
+        checkpoint.add("bed3", success=True)
+        assert Checkpoint(str(file_path)).is_done("bed3")
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+import bedboss.bedbuncher.bedbuncher as bedbuncher_module
+from bedboss.bed_regions import BedRegions
+from bedboss.bedbuncher.bedset_loader import LoadedBedSet
+from bedboss.bedbuncher.commonality import (
+    RegionCommonality,
+    RegionUniverse,
+    calculate_region_commonality,
+)
+from bedboss.bedstat.plot_renderer import PlotRenderer
+
+
+@pytest.fixture
+def bed_files(tmp_path):
+    contents = [
+        "chr1\t0\t100\nchr1\t150\t200\nchr2\t10\t20\n",
+        "chr1\t50\t120\nchr1\t300\t400\n",
+        "chr1\t400\t500\nchr3\t5\t5\n",
+    ]
+    paths = []
+    for index, content in enumerate(contents):
+        path = tmp_path / f"file{index}.bed"
+        path.write_text(content)
+        paths.append(str(path))
+    return paths
+
+
+def _random_regions(rng, path) -> BedRegions:
+    n = rng.integers(1, 200)
+    starts = rng.integers(0, 100_000, n)
+    return BedRegions(
+        path=path,
+        chrom_names=np.array(["chr1", "chr2"], dtype=object),
+        chrom_codes=rng.integers(0, 2, n).astype(np.int32),
+        starts=starts,
+        ends=starts + rng.integers(0, 2_000, n),
+    )
+
+
+class TestRegionCommonality:
+    def test_universe(self, bed_files):
+        universe = RegionUniverse()
+        for path in bed_files:
+            universe.add(BedRegions.from_file(path))
+        # bookended regions (300-400, 400-500) are not merged
+        starts, ends = universe.intervals["chr1"]
+        assert starts.tolist() == [0, 150, 300, 400]
+        assert ends.tolist() == [120, 200, 400, 500]
+        assert len(universe) == 6
+
+    def test_region_commonality(self, bed_files):
+        commonality = calculate_region_commonality(bed_files)
+        # universe: chr1 0-120, 150-200, 300-400, 400-500; chr2 10-20; chr3 5-6
+        assert commonality.universe_size == 6
+        assert commonality.file_overlaps.tolist() == [3, 2, 2]
+        assert commonality.coverage.tolist() == [2, 1, 1, 1, 1, 1]
+
+        percentages, counts = commonality.curve()
+        assert percentages == pytest.approx([0, 100 / 3, 50])
+        assert counts.tolist() == [3, 3, 1]
+
+    def test_matches_dense_matrix(self):
+        rng = np.random.default_rng(0)
+        files = [_random_regions(rng, f"file{index}") for index in range(20)]
+        commonality = calculate_region_commonality(files)
+
+        universe = RegionUniverse()
+        for regions in files:
+            universe.add(regions)
+        # dense universe x files overlap matrix
+        matrix = np.zeros((len(universe), len(files)), dtype=bool)
+        offsets = universe.chrom_offsets
+        for column, regions in enumerate(files):
+            ends = np.maximum(regions.ends, regions.starts + 1)
+            for chrom, start, end in zip(regions.chroms, regions.starts, ends):
+                universe_starts, universe_ends = universe.intervals[chrom]
+                rows = np.flatnonzero((universe_starts < end) & (universe_ends > start))
+                matrix[offsets[chrom] + rows, column] = True
+
+        assert commonality.file_overlaps.tolist() == matrix.sum(axis=0).tolist()
+        assert commonality.coverage.tolist() == matrix.sum(axis=1).tolist()
+
+    def test_empty_universe(self):
+        commonality = RegionCommonality(
+            universe_size=0,
+            file_overlaps=np.zeros(2, dtype=np.int64),
+            coverage=np.zeros(0, dtype=np.int32),
+        )
+        percentages, counts = commonality.curve()
+        assert percentages.tolist() == [0]
+        assert counts.tolist() == [2]
+
+    def test_create_plots(self, tmp_path, bed_files, monkeypatch):
+        regions = [BedRegions.from_file(path) for path in bed_files]
+        monkeypatch.setattr(
+            bedbuncher_module,
+            "load_bedset",
+            lambda bedset: LoadedBedSet("bedset_id", bedset, bed_files, regions),
+        )
+        # plot is rendered in the rendering process
+        renderer = PlotRenderer(workers=1)
+        monkeypatch.setattr(bedbuncher_module, "get_plot_renderer", lambda: renderer)
+        try:
+            plot = bedbuncher_module.create_plots(["a", "b", "c"], str(tmp_path))
+        finally:
+            renderer.shutdown()
+        assert plot["name"] == "region_commonality"
+        assert (tmp_path / plot["path"]).exists()
+        assert (tmp_path / plot["thumbnail_path"]).exists()
@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bedboss.downloader import Downloader, DownloadItem
+from bedboss.exceptions import DownloadException
+from bedboss.utils import download_file
+
+CONTENT = b"chr1\t10\t20\n" * 1000
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    ranges = []
+    encodings = []
+
+    def do_GET(self):
+        if self.path != "/file.bed":
+            self.send_error(404)
+            return
+        accept_encoding = self.headers.get("Accept-Encoding", "")
+        _RangeHandler.encodings.append(accept_encoding)
+        if "gzip" in accept_encoding:
+            # compression on the fly, for clients that accept it
+            body = gzip.compress(CONTENT)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        start = 0
+        range_header = self.headers.get("Range")
+        _RangeHandler.ranges.append(range_header)
+        if range_header:
+            start = int(range_header.split("=")[1].rstrip("-"))
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(CONTENT) - start))
+        self.end_headers()
+        self.wfile.write(CONTENT[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _RangeHandler.ranges = []
+    _RangeHandler.encodings = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def downloader():
+    downloader = Downloader(retries=0)
+    yield downloader
+    downloader.close()
+
+
+class TestDownloader:
+    def test_resume(self, tmp_path, server, downloader):
+        path = str(tmp_path / "file.bed")
+        with open(path + ".part", "wb") as f:
+            f.write(CONTENT[:1234])
+
+        downloader.download(
+            f"{server}/file.bed", path, md5=hashlib.md5(CONTENT).hexdigest()
+        )
+        assert _RangeHandler.ranges == ["bytes=1234-"]
+        assert _RangeHandler.encodings == ["identity"]
+        with open(path, "rb") as f:
+            assert f.read() == CONTENT
+        assert not os.path.exists(path + ".part")
+
+    def test_not_encoded(self, tmp_path, server, downloader):
+        path = str(tmp_path / "file.bed")
+        downloader.download(f"{server}/file.bed", path, size=len(CONTENT))
+        assert _RangeHandler.encodings == ["identity"]
+        with open(path, "rb") as f:
+            assert f.read() == CONTENT
+
+    def test_verification_failed(self, tmp_path, server, downloader):
+        path = str(tmp_path / "file.bed")
+        with pytest.raises(DownloadException, match="md5"):
+            downloader.download(f"{server}/file.bed", path, md5="0" * 32)
+        with pytest.raises(DownloadException, match="size"):
+            downloader.download(f"{server}/file.bed", path, size=len(CONTENT) - 1)
+        assert not os.path.exists(path)
+        assert not os.path.exists(path + ".part")
+
+    def test_local_error(self, tmp_path, server, downloader):
+        # target folder can't be created
+        (tmp_path / "file").write_text("")
+        path = str(tmp_path / "file" / "file.bed")
+        with pytest.raises(DownloadException):
+            downloader.download(f"{server}/file.bed", path)
+        assert not download_file(f"{server}/file.bed", path, no_fail=True)
+
+    def test_download_files(self, tmp_path, server, downloader):
+        items = [
+            DownloadItem(f"{server}/file.bed", str(tmp_path / f"file{i}.bed"))
+            for i in range(3)
+        ]
+        items.append(DownloadItem(f"{server}/missing.bed", str(tmp_path / "m.bed")))
+
+        paths = downloader.download_files(items, workers=2, no_fail=True)
+        assert paths == [item.path for item in items[:3]] + [None]
+        with pytest.raises(DownloadException, match="404"):
+            downloader.download_files(items, workers=2)
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from bedboss.bed_regions import BedRegions
+from bedboss.bedstat import gc_content
+from bedboss.bedstat.gc_content import (
+    _split_chunks,
+    calculate_gc_content,
+    calculate_gc_density,
+    estimate_gc_content,
+)
+from bedboss.bedstat.genome_store import GC_BLOCK_SIZE, GenomeStore
+
+FASTA = ">chr1\nACGTACGTGGGGCCCCAAAATTTT\n>chr2\nGGGGGGGGAAAACCCC\n"
+
+
+@pytest.fixture
+def fasta_file(tmp_path, monkeypatch):
+    path = tmp_path / "genome.fa"
+    path.write_text(FASTA)
+    monkeypatch.setenv("BEDBOSS_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setattr(
+        gc_content, "get_genome_fasta_file", lambda genome, rfg_config=None: str(path)
+    )
+    return str(path)
+
+
+@pytest.fixture
+def bed_file(tmp_path):
+    path = tmp_path / "regions.bed"
+    path.write_text(
+        "chr2\t0\t8\n"
+        "chr1\t0\t4\n"
+        "chrUn\t0\t10\n"
+        "chr1\t8\t16\n"
+        "chr2\t8\t16\n"
+        "chr1\t16\t24\n"
+    )
+    return str(path)
+
+
+class TestGCContent:
+    def test_split_chunks(self, bed_file):
+        chunks = _split_chunks(BedRegions.from_file(bed_file), chunk_size=2)
+        assert [chunk.tolist() for chunk in chunks] == [[0, 4], [1, 3], [5], [2]]
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_original_order(self, fasta_file, bed_file, workers):
+        gc_contents = calculate_gc_content(bed_file, "test", workers=workers)
+        assert isinstance(gc_contents, np.ndarray)
+        assert gc_contents[[0, 1, 3, 4, 5]].tolist() == [1.0, 0.5, 1.0, 0.5, 0.0]
+        # chromosome is not in the assembly
+        assert np.isnan(gc_contents[2])
+
+    def test_gc_density(self):
+        gc_contents = np.random.default_rng(0).normal(0.45, 0.05, 5000)
+        grid, density = calculate_gc_density(gc_contents)
+        bandwidth = gc_contents.std(ddof=1) * len(gc_contents) ** (-1 / 5)
+        expected = np.exp(
+            -0.5 * ((grid[:, None] - gc_contents[None, :]) / bandwidth) ** 2
+        ).sum(axis=1) / (len(gc_contents) * bandwidth * np.sqrt(2 * np.pi))
+        assert np.abs(density - expected).max() < 0.01 * expected.max()
+        assert np.sum(density) * (grid[1] - grid[0]) == pytest.approx(1, abs=0.01)
+
+
+class TestGenomeStore:
+    def test_gc_content_as_gdrs(self, tmp_path):
+        rng = np.random.default_rng(0)
+        sequence = rng.choice(list("ACGTNacgtn"), 3 * GC_BLOCK_SIZE + 17)
+        fasta_file = tmp_path / "random.fa"
+        fasta_file.write_text(">chr1\n" + "".join(sequence) + "\n")
+        bed_file = tmp_path / "random.bed"
+        starts = rng.integers(0, len(sequence), 500)
+        ends = np.minimum(starts + rng.integers(1, 600, 500), len(sequence))
+        bed_file.write_text(
+            "".join(f"chr1\t{start}\t{end}\n" for start, end in zip(starts, ends))
+        )
+
+        store = GenomeStore.build(str(fasta_file), str(tmp_path / "store"))
+        gc_contents = store.gc_content(BedRegions.from_file(bed_file))
+        expected = gc_content.calc_gc_content(
+            str(bed_file), gc_content.GenomeAssembly(str(fasta_file))
+        )
+        assert np.allclose(gc_contents, expected)
+
+    def test_invalid_regions(self, fasta_file, tmp_path):
+        store = GenomeStore.build(fasta_file, str(tmp_path / "store"))
+        assert store.chrom_sizes == {"chr1": 24, "chr2": 16}
+        gc_contents = store.chrom_gc_content(
+            "chr2", np.array([0, 4, 10]), np.array([8, 4, 20])
+        )
+        assert gc_contents[0] == 1.0
+        assert np.isnan(gc_contents[1:]).all()
+
+    def test_estimate_gc_content(self, tmp_path):
+        rng = np.random.default_rng(1)
+        # GC rich first half of the chromosome
+        sequence = np.concatenate(
+            [rng.choice(list("GGCCA"), 50_000), rng.choice(list("ATTAC"), 50_000)]
+        )
+        fasta_file = tmp_path / "random.fa"
+        fasta_file.write_text(">chr1\n" + "".join(sequence) + "\n")
+        bed_file = tmp_path / "random.bed"
+        starts = rng.integers(0, 99_000, 20_000)
+        bed_file.write_text(
+            "".join(
+                f"chr1\t{start}\t{start + width}\n"
+                for start, width in zip(starts, rng.integers(10, 1000, 20_000))
+            )
+            + "chrUn\t0\t100\n"
+        )
+        regions = BedRegions.from_file(bed_file)
+        store = GenomeStore.build(str(fasta_file), str(tmp_path / "store"))
+
+        exact = np.nanmean(store.gc_content(regions))
+        estimate = estimate_gc_content(
+            regions, store, tolerance=0.005, initial_sample_size=500
+        )
+        assert estimate.error <= 0.005
+        assert estimate.sample_size == len(estimate.gc_contents) < 20_000
+        assert abs(estimate.mean - exact) <= 0.005
+
+        # all regions are sampled if the tolerance can't be reached
+        estimate = estimate_gc_content(regions, store, tolerance=0)
+        assert estimate.sample_size == 20_000
+        assert estimate.mean == pytest.approx(exact)
@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import peppy
+import pytest
+
+import bedboss.bedboss as bedboss_module
+from bedboss.bedboss import insert_pep
+from bedboss.exceptions import BedBossException
+
+SAMPLES = ["first", "broken", "failed", "last"]
+
+
+def fake_run_all(name: str, bedbase_config=None, pm=None, **kwargs) -> str:
+    if name == "broken":
+        raise ValueError("unexpected error")
+    if name == "failed":
+        raise BedBossException("bed file is not valid")
+    return f"digest_{name}"
+
+
+def thread_pool(max_workers, mp_context=None, initializer=None, initargs=()):
+    # workers in threads, so they use the stubbed functions of this process
+    return ThreadPoolExecutor(
+        max_workers=max_workers, initializer=initializer, initargs=initargs
+    )
+
+
+class FakePipelineManager:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def stop_pipeline(self):
+        pass
+
+
+@pytest.fixture
+def pep(tmp_path):
+    with open(tmp_path / "samples.csv", "w") as f:
+        f.write("sample_name,input_file,input_type,genome\n")
+        for name in SAMPLES:
+            f.write(f"{name},{tmp_path / name}.bed,bed,GRCh38\n")
+    # bed files of the samples, that are not stubbed to fail
+    for name in ["first", "last"]:
+        (tmp_path / f"{name}.bed").write_text("chr1\t10\t20\n")
+    with open(tmp_path / "config.yaml", "w") as f:
+        f.write("pep_version: 2.1.0\nname: test_pep\nsample_table: samples.csv\n")
+    return peppy.Project(str(tmp_path / "config.yaml"))
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    batches = []
+    monkeypatch.setattr(
+        bedboss_module, "bedstat_batch", lambda **kwargs: batches.append(kwargs)
+    )
+    return batches
+
+
+@pytest.fixture
+def bedsets(monkeypatch, batches):
+    bedsets = []
+    monkeypatch.setattr(bedboss_module, "run_all", fake_run_all)
+    monkeypatch.setattr(bedboss_module, "BedBaseAgent", lambda config: None)
+    monkeypatch.setattr(bedboss_module, "validate_project", lambda *args: None)
+    monkeypatch.setattr(bedboss_module, "ProcessPoolExecutor", thread_pool)
+    monkeypatch.setattr(bedboss_module.pypiper, "PipelineManager", FakePipelineManager)
+    monkeypatch.setattr(
+        bedboss_module,
+        "run_bedbuncher",
+        lambda bed_set, **kwargs: bedsets.append(bed_set),
+    )
+    return bedsets
+
+
+class TestInsertPep:
+    def test_parallel_failed_samples(self, tmp_path, pep, bedsets):
+        output_folder = str(tmp_path)
+        insert_pep(
+            bedbase_config="config.yaml",
+            output_folder=output_folder,
+            pep=pep,
+            create_bedset=True,
+            workers=2,
+        )
+        # failed samples don't stop processing, and the bedset keeps the PEP order
+        assert bedsets == [["digest_first", "digest_last"]]
+
+        with open(tmp_path / "test_pep_fail.log") as f:
+            failed = [line.split(",")[0] for line in f]
+        assert sorted(failed) == ["broken", "failed"]
+
+        # processed samples are skipped in the next run
+        insert_pep(
+            bedbase_config="config.yaml",
+            output_folder=output_folder,
+            pep=pep,
+            create_bedset=True,
+            workers=2,
+        )
+        assert bedsets[-1] == ["digest_first", "digest_last"]
+
+    def test_statistics_precomputed(self, tmp_path, pep, bedsets, batches):
+        insert_pep(
+            bedbase_config="config.yaml",
+            output_folder=str(tmp_path),
+            pep=pep,
+            workers=2,
+            stats_workers=3,
+        )
+        # existing bed files in one batch, with genome names used by run_all
+        assert len(batches) == 1
+        assert batches[0]["bedfiles"] == [
+            str(tmp_path / "first.bed"),
+            str(tmp_path / "last.bed"),
+        ]
+        assert batches[0]["genome"] == ["hg38", "hg38"]
+        assert batches[0]["workers"] == 3
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bedboss.bed_regions import BedRegions
+from bedboss.bedstat.partitions import PARTITION_NAMES, PartitionMap
+
+GTF = (
+    '1\tensembl\tgene\t10001\t20000\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\texon\t10001\t11000\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\tfive_prime_utr\t10001\t10100\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\texon\t19001\t20000\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+    '1\tensembl\tthree_prime_utr\t19501\t20000\t.\t+\t.\tgene_id "g1"; gene_biotype "protein_coding";\n'
+)
+
+
+def _labels(partition_map, chrom):
+    boundaries, labels = partition_map.segments[chrom]
+    return [
+        (int(start), int(end), PARTITION_NAMES[label])
+        for start, end, label in zip(boundaries[:-1], boundaries[1:], labels)
+    ]
+
+
+@pytest.fixture
+def partition_map(tmp_path):
+    gtf_file = tmp_path / "genes.gtf"
+    gtf_file.write_text(GTF)
+    return PartitionMap.from_gtf(str(gtf_file))
+
+
+@pytest.fixture
+def regions(tmp_path):
+    bed_file = tmp_path / "regions.bed"
+    bed_file.write_text(
+        "chr1\t9950\t9960\n"  # core promoter
+        "chr1\t9000\t9100\n"  # proximal promoter
+        "chr1\t9890\t10500\n"  # core promoter, 5' UTR and exon: core promoter
+        "chr1\t15000\t15100\n"  # intron
+        "chr1\t18900\t19100\n"  # intron and exon: exon
+        "chr1\t19600\t19700\n"  # 3' UTR
+        "chr1\t50000\t50100\n"  # intergenic
+        "chr2\t100\t200\n"  # not annotated chromosome: intergenic
+    )
+    return BedRegions.from_file(bed_file)
+
+
+class TestPartitions:
+    def test_flattened_map(self, partition_map):
+        assert _labels(partition_map, "chr1")[:-1] == [
+            (0, 8000, "intergenic"),
+            (8000, 9900, "promoterProx"),
+            (9900, 10000, "promoterCore"),
+            (10000, 10100, "fiveUTR"),
+            (10100, 11000, "exon"),
+            (11000, 19000, "intron"),
+            (19000, 19500, "exon"),
+            (19500, 20000, "threeUTR"),
+        ]
+
+    def test_priority(self):
+        partitions = {
+            "exon": pd.DataFrame({"chrom": ["chr1"], "start": [0], "end": [100]}),
+            "intron": pd.DataFrame({"chrom": ["chr1"], "start": [50], "end": [200]}),
+        }
+        partition_map = PartitionMap.from_partition_list(partitions)
+        assert _labels(partition_map, "chr1")[:-1] == [
+            (0, 100, "exon"),
+            (100, 200, "intron"),
+        ]
+
+    def test_observed(self, partition_map, regions):
+        result = partition_map.calculate(regions)
+        observed = dict(zip(PARTITION_NAMES, result.observed.tolist()))
+        assert observed == {
+            "promoterCore": 2,
+            "promoterProx": 1,
+            "threeUTR": 1,
+            "fiveUTR": 0,
+            "exon": 1,
+            "intron": 1,
+            "intergenic": 2,
+        }
+        stats = result.to_stats()
+        assert stats["promotercore_frequency"] == 2
+        assert stats["intergenic_percentage"] == 0.25
+        assert np.isnan(result.expected).all()
+
+    def test_expected(self, partition_map, regions):
+        genome_size = 100_000
+        result = partition_map.calculate(regions, genome_size=genome_size)
+        sizes = partition_map.partition_sizes(genome_size)
+        assert sizes.sum() == genome_size
+        assert sizes[PARTITION_NAMES.index("intron")] == 8000
+        assert result.expected.sum() == pytest.approx(len(regions))
+        assert len(result.pvalues) == len(PARTITION_NAMES)
+
+    def test_cumulative(self, partition_map, regions):
+        result = partition_map.calculate(regions, genome_size=100_000)
+        sizes, fractions = result.cumulative["exon"]
+        # exon pieces: 10100-10500 and 19000-19100
+        assert sizes.tolist() == [100, 400]
+        assert fractions[-1] == pytest.approx(500 / 1400)
+        assert "fiveUTR" in result.cumulative
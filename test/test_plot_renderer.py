@@ -0,0 +1,56 @@
+import subprocess
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+from bedboss.bedstat.plot_renderer import PlotRenderer, resolve_plots
+
+
+def create_plot(name: str, outfolder: str = None) -> dict:
+    return {
+        "name": name,
+        "title": name.title(),
+        "thumbnail_path": f"{outfolder}/{name}.png",
+        "path": f"{outfolder}/{name}.pdf",
+    }
+
+
+def failing_plot(name: str) -> dict:
+    raise ValueError(f"No data for {name}")
+
+
+class TestPlotRenderer:
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_submit(self, workers):
+        renderer = PlotRenderer(workers=workers)
+        try:
+            future = renderer.submit(create_plot, "widths", outfolder="out")
+            assert isinstance(future, Future)
+            assert future.result(timeout=60)["path"] == "out/widths.pdf"
+        finally:
+            renderer.shutdown()
+
+    def test_resolve_plots(self):
+        renderer = PlotRenderer(workers=1)
+        try:
+            data = {
+                "number_of_regions": 10,
+                "widths": renderer.submit(create_plot, "widths"),
+                "failing": renderer.submit(failing_plot, "failing"),
+            }
+            assert resolve_plots(data) is data
+        finally:
+            renderer.shutdown()
+        assert data["number_of_regions"] == 10
+        assert data["widths"]["name"] == "widths"
+        assert "failing" not in data
+
+    def test_backend_not_changed(self):
+        # only rendering processes switch to Agg, importing plots keeps the backend
+        code = (
+            "import matplotlib; matplotlib.use('template'); "
+            "import bedboss.bedstat.plots; "
+            "assert matplotlib.get_backend() == 'template'"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
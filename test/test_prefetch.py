@@ -0,0 +1,116 @@
+import os
+import threading
+
+import pytest
+
+from bedboss.bbuploader import prefetch
+from bedboss.bbuploader.prefetch import GeoFilePrefetcher, PrefetchItem
+
+
+class FakeDownloads:
+    """
+    Replaces download_file: files are written with the size of the item, 'fail' urls
+    are not downloaded (like download_file with no_fail), and urls with a gate wait
+    until the gate is opened
+    """
+
+    def __init__(self):
+        self.urls = []
+        self.gates = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, path, no_fail=False, size=None):
+        with self._lock:
+            self.urls.append(url)
+        if url in self.gates:
+            self.gates[url].wait(timeout=10)
+        if url.startswith("fail"):
+            return False
+        with open(path, "wb") as f:
+            f.write(b"x" * (size or 1))
+        return True
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    downloads = FakeDownloads()
+    monkeypatch.setattr(prefetch, "download_file", downloads)
+    return downloads
+
+
+def _items(tmp_path, sizes: dict):
+    return [
+        PrefetchItem(key=key, url=key, path=str(tmp_path / key), size=size)
+        for key, size in sizes.items()
+    ]
+
+
+class TestGeoFilePrefetcher:
+    def test_size_budget(self, tmp_path, downloads):
+        downloads.gates["a"] = threading.Event()
+        items = _items(tmp_path, {"a": 60, "b": 60, "c": 10})
+        with GeoFilePrefetcher(items, depth=3, max_size=100) as prefetcher:
+            # b doesn't fit in the budget next to a, c waits for b (order is kept)
+            assert list(prefetcher._futures) == ["a"]
+            downloads.gates["a"].set()
+            assert prefetcher.get("a") == items[0].path
+            assert prefetcher.get("b") == items[1].path
+            assert prefetcher.get("c") == items[2].path
+            assert prefetcher.get("unknown") is None
+        assert downloads.urls == ["a", "b", "c"]
+
+    def test_depth(self, tmp_path, downloads):
+        downloads.gates["a"] = threading.Event()
+        items = _items(tmp_path, {key: 1 for key in "abcd"})
+        with GeoFilePrefetcher(items, depth=2) as prefetcher:
+            assert list(prefetcher._futures) == ["a", "b"]
+            downloads.gates["a"].set()
+            assert prefetcher.get("a") == items[0].path
+            assert list(prefetcher._futures) == ["b", "c"]
+
+    def test_first_file_over_budget(self, tmp_path, downloads):
+        items = _items(tmp_path, {"big": 500, "small": 1})
+        with GeoFilePrefetcher(items, depth=2, max_size=100) as prefetcher:
+            assert os.path.getsize(prefetcher.get("big")) == 500
+            assert os.path.exists(prefetcher.get("small"))
+
+    def test_discard_not_scheduled(self, tmp_path, downloads):
+        items = _items(tmp_path, {"a": 1, "b": 1, "c": 1})
+        with GeoFilePrefetcher(items, depth=1) as prefetcher:
+            prefetcher.discard("b")
+            assert prefetcher.get("a") == items[0].path
+            assert prefetcher.get("c") == items[2].path
+        assert "b" not in downloads.urls
+        assert not os.path.exists(items[1].path)
+
+    def test_discard_in_flight(self, tmp_path, downloads):
+        downloads.gates["b"] = threading.Event()
+        items = _items(tmp_path, {"a": 1, "b": 50, "c": 60})
+        with GeoFilePrefetcher(items, depth=2, max_size=100) as prefetcher:
+            assert prefetcher.get("a") == items[0].path
+            # c doesn't fit in the budget until b is released
+            assert list(prefetcher._futures) == ["b"]
+            prefetcher.discard("b")
+            downloads.gates["b"].set()
+            assert prefetcher.get("c") == items[2].path
+        assert downloads.urls == ["a", "b", "c"]
+
+    def test_get_not_scheduled(self, tmp_path, downloads):
+        downloads.gates["a"] = threading.Event()
+        items = _items(tmp_path, {"a": 1, "b": 1, "c": 1})
+        with GeoFilePrefetcher(items, depth=1) as prefetcher:
+            # c is downloaded on demand, without waiting for a
+            assert prefetcher.get("c") == items[2].path
+            downloads.gates["a"].set()
+            assert prefetcher.get("a") == items[0].path
+            assert prefetcher.get("b") == items[1].path
+
+    def test_failed_download(self, tmp_path, downloads):
+        items = _items(tmp_path, {"fail": 1, "b": 1})
+        with GeoFilePrefetcher(items, depth=1) as prefetcher:
+            # path of the failed file is returned, but the file doesn't exist
+            path = prefetcher.get("fail")
+            assert path == items[0].path
+            assert not os.path.exists(path)
+            assert prefetcher.get("b") == items[1].path
+            assert not prefetcher._reserved
@@ -0,0 +1,103 @@
+import json
+import sys
+
+import pytest
+
+from bedboss.bedstat.r_worker import RESPONSE_PREFIX, RegionStatWorker
+from bedboss.exceptions import BedBossException, RWorkerException
+
+# python script that speaks the regionstat_worker.R protocol
+FAKE_WORKER = f"""
+import json, os, sys, time
+
+PREFIX = "{RESPONSE_PREFIX}"
+
+def respond(response):
+    print(PREFIX + json.dumps(response), flush=True)
+
+print("loading libraries", flush=True)
+time.sleep(float(os.environ.get("FAKE_WORKER_STARTUP", 0)))
+respond({{"status": "ready"}})
+for line in sys.stdin:
+    job = json.loads(line)
+    path = job["bedfilePath"]
+    if path == "crash":
+        os._exit(1)
+    if path == "slow":
+        time.sleep(10)
+    if path == "error":
+        respond({{"id": job["id"], "status": "error", "message": "bad file"}})
+        continue
+    with open(os.path.join(job["outputFolder"], job["fileId"] + ".json"), "w") as f:
+        json.dump({{"pid": os.getpid()}}, f)
+    respond({{"id": job["id"], "status": "ok"}})
+"""
+
+
+@pytest.fixture
+def worker(tmp_path):
+    script = tmp_path / "worker.py"
+    script.write_text(FAKE_WORKER)
+    worker = RegionStatWorker(
+        job_timeout=2,
+        startup_timeout=5,
+        rscript=sys.executable,
+        script_path=str(script),
+    )
+    yield worker
+    worker.stop()
+
+
+def _run(worker, tmp_path, bedfile, digest="digest"):
+    worker.run(bedfile=bedfile, digest=digest, outfolder=str(tmp_path), genome="hg38")
+    with open(tmp_path / f"{digest}.json") as f:
+        return json.load(f)["pid"]
+
+
+class TestRegionStatWorker:
+    def test_jobs_share_process(self, worker, tmp_path):
+        first = _run(worker, tmp_path, "a.bed", "a")
+        second = _run(worker, tmp_path, "b.bed", "b")
+        assert first == second
+        assert worker.alive
+
+    def test_job_error(self, worker, tmp_path):
+        with pytest.raises(BedBossException, match="bad file"):
+            worker.run(
+                bedfile="error", digest="d", outfolder=str(tmp_path), genome="hg38"
+            )
+        assert worker.alive
+
+    def test_restart_after_crash(self, worker, tmp_path):
+        first = _run(worker, tmp_path, "a.bed")
+        with pytest.raises(RWorkerException):
+            worker.run(
+                bedfile="crash", digest="d", outfolder=str(tmp_path), genome="hg38"
+            )
+        assert not worker.alive
+        assert _run(worker, tmp_path, "a.bed") != first
+
+    def test_timeout(self, worker, tmp_path):
+        with pytest.raises(RWorkerException, match="didn't respond"):
+            worker.run(
+                bedfile="slow", digest="d", outfolder=str(tmp_path), genome="hg38"
+            )
+        assert not worker.alive
+        _run(worker, tmp_path, "a.bed")
+
+    def test_startup_timeout(self, worker, tmp_path, monkeypatch):
+        # slow loading of R libraries: bedstat falls back to Rscript on RWorkerException
+        monkeypatch.setenv("FAKE_WORKER_STARTUP", "10")
+        worker.startup_timeout = 1
+        with pytest.raises(RWorkerException, match="didn't respond"):
+            worker.run(
+                bedfile="a.bed", digest="d", outfolder=str(tmp_path), genome="hg38"
+            )
+        assert not worker.alive
+
+    def test_missing_rscript(self, tmp_path):
+        worker = RegionStatWorker(rscript="not-existing-rscript")
+        with pytest.raises(RWorkerException):
+            worker.run(
+                bedfile="a.bed", digest="d", outfolder=str(tmp_path), genome="hg38"
+            )
@@ -1,5 +1,9 @@
 import os
 
+import numpy as np
+import pytest
+
+from bedboss.refgenome_validator import genome_registry
 from bedboss.refgenome_validator.main import ReferenceValidator
 
 FILE_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -23,3 +27,88 @@ def test_main():
     # result
 
     assert dict_result
+
+
+BED_CHROM_INFO = [
+    {"chr1": 1000, "chr2": 5000, "chrX": 300},
+    {"chr1": 1000, "chr2": 500000000},
+    {"chr1": 1000, "chrUn_random_unknown": 10},
+    {"1": 1000, "2": 2000, "MT": 10},
+    {"unknown_chrom": 100},
+]
+
+
+def _legacy_stats(validator, bed_chrom_info):
+    results = {}
+    for genome_model in validator.genome_models:
+        stats = validator.calculate_chrom_stats(
+            bed_chrom_info, genome_model.chrom_sizes
+        )
+        stats.compatibility = validator.calculate_rating(stats)
+        results[genome_model.genome_alias] = stats
+    return results
+
+
+@pytest.mark.parametrize("bed_chrom_info", BED_CHROM_INFO)
+def test_genome_matrix_equals_chrom_stats(bed_chrom_info):
+    validator = ReferenceValidator()
+
+    assert validator.genome_matrix.calculate_stats(bed_chrom_info) == _legacy_stats(
+        validator, bed_chrom_info
+    )
+
+
+def test_genome_matrix_mask():
+    validator = ReferenceValidator()
+    mask = np.zeros(len(validator.genome_matrix), dtype=bool)
+    mask[1] = True
+
+    result = validator.genome_matrix.calculate_stats(
+        BED_CHROM_INFO[0], genome_mask=mask
+    )
+    assert list(result) == [validator.genome_matrix.genome_aliases[1]]
+
+
+def test_ref_filter_does_not_change_models(tmp_path):
+    path = tmp_path / "regions.bed"
+    path.write_text("chr1\t100\t200\nchr2\t100\t200\n")
+    validator = ReferenceValidator()
+    aliases = validator.genome_matrix.genome_aliases
+
+    result = validator.determine_compatibility(str(path), ref_filter=aliases[:2])
+
+    assert list(result) == aliases[2:]
+    assert len(validator.genome_models) == len(aliases)
+
+
+def test_compiled_genome_models_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("BEDBOSS_CACHE", str(tmp_path))
+
+    built_models, built_matrix = genome_registry._load_default_registry()
+    assert len(list(tmp_path.glob("genome_models_*.npz"))) == 1
+
+    cached_models, cached_matrix = genome_registry._load_default_registry()
+    assert [model.genome_alias for model in cached_models] == [
+        model.genome_alias for model in built_models
+    ]
+    for cached, built in zip(cached_models, built_models):
+        assert cached.chrom_sizes == built.chrom_sizes
+    assert (cached_matrix.lengths == built_matrix.lengths).all()
+    assert cached_matrix.vocabulary == built_matrix.vocabulary
+
+
+def test_cache_key_content(tmp_path):
+    chrom_sizes = tmp_path / "genome.chrom.sizes"
+    chrom_sizes.write_text("chr1\t1000\nchr2\t500\n")
+    key = genome_registry._cache_key([str(chrom_sizes)])
+    assert genome_registry._cache_key([str(chrom_sizes)]) == key
+
+    # the same size and modification time, but different content
+    stat = os.stat(chrom_sizes)
+    chrom_sizes.write_text("chr1\t1000\nchr2\t600\n")
+    os.utime(chrom_sizes, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert genome_registry._cache_key([str(chrom_sizes)]) != key
+
+
+def test_default_models_are_shared():
+    assert ReferenceValidator().genome_matrix is ReferenceValidator().genome_matrix
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from bedboss.bed_regions import BedRegions
+from bedboss.bedstat.region_stats import (
+    calculate_chrom_bins,
+    calculate_neighbor_distances,
+    calculate_region_stats,
+    calculate_widths_histogram,
+    get_genome_chrom_sizes,
+    signif,
+)
+
+
+@pytest.fixture
+def regions(tmp_path):
+    bed_file = tmp_path / "regions.bed"
+    bed_file.write_text(
+        "chr2\t100\t200\n"
+        "chr1\t500\t600\n"
+        "chr1\t0\t100\n"
+        "chr1\t550\t700\n"
+        "chr2\t1000\t1050\n"
+        "chrUn_KI270302v1\t10\t20\n"
+    )
+    return BedRegions.from_file(bed_file)
+
+
+class TestRegionStats:
+    def test_region_stats(self, regions):
+        stats = calculate_region_stats(regions)
+        assert stats["number_of_regions"] == 6
+        assert stats["mean_region_width"] == signif(
+            np.mean([100, 100, 100, 150, 50, 10])
+        )
+
+    def test_region_stats_from_file(self, regions):
+        assert calculate_region_stats(regions.path) == calculate_region_stats(regions)
+
+    @pytest.mark.parametrize(
+        "value, expected", [(1234.5678, 1235), (0.000123456, 0.0001235), (0, 0)]
+    )
+    def test_signif(self, value, expected):
+        assert signif(value) == pytest.approx(expected)
+
+    def test_neighbor_distances(self, regions):
+        distances = calculate_neighbor_distances(regions)
+        # chr1: 0-100, 500-600, 550-700 (overlap); chr2: 100-200, 1000-1050
+        assert sorted(distances.tolist()) == [0, 400, 800]
+
+    def test_widths_histogram(self):
+        widths = np.arange(1, 1001)
+        histogram = calculate_widths_histogram(widths, quant_threshold=0.1, bins=4)
+        assert histogram.lower_count + histogram.upper_count == 200
+        assert histogram.counts.sum() + 200 == len(widths)
+        assert len(histogram.edges) == 5
+
+    def test_chrom_bins(self, regions):
+        chrom_sizes = {"chr1": 1000, "chr2": 2000, "chrUn_KI270302v1": 100}
+        chrom_bins = calculate_chrom_bins(regions, chrom_sizes, bin_count=30)
+        assert chrom_bins.bin_size == 100
+        assert set(chrom_bins.counts) == {"chr1", "chr2"}
+        # midpoints: 50, 550, 625
+        assert chrom_bins.counts["chr1"].tolist() == [1, 0, 0, 0, 0, 1, 1, 0, 0, 0]
+
+    def test_bundled_chrom_sizes(self):
+        assert get_genome_chrom_sizes("hg38")["chr1"] == 248956422
+        assert get_genome_chrom_sizes("unknown_genome") is None
@@ -0,0 +1,136 @@
+from types import SimpleNamespace
+
+import pytest
+
+import bedboss.bedboss as bedboss_module
+from bedboss.bedboss import reprocess_all
+from bedboss.checkpoint import Checkpoint
+from bedboss.exceptions import BedBossException
+
+BEDS = [f"bed{i}" for i in range(11)]
+FAILED = {"bed2", "bed7"}
+
+
+class FakeBedBase:
+    """
+    Unprocessed beds of the bedbase: beds leave the list when they are processed
+    """
+
+    def __init__(self, bed_ids):
+        self.unprocessed = list(bed_ids)
+        self.offsets = []
+        self.bed = self
+
+    def get_unprocessed(self, limit, offset):
+        self.offsets.append(offset)
+        return SimpleNamespace(
+            count=len(self.unprocessed),
+            results=[
+                SimpleNamespace(
+                    id=bed_id, name=bed_id, genome_alias="hg38", license_id=None
+                )
+                for bed_id in self.unprocessed[offset : offset + limit]
+            ],
+        )
+
+
+@pytest.fixture
+def bedbase(monkeypatch, tmp_path):
+    bedbase = FakeBedBase(BEDS)
+    bedbase.processed = []
+    bedbase.batches = []
+
+    def fake_run_all(name, bedbase_config=None, pm=None, **kwargs):
+        bedbase.processed.append(name)
+        if name in FAILED:
+            raise ValueError("bed file is not valid")
+        bedbase.unprocessed.remove(name)
+        return name
+
+    def fake_fetch_bed(bbclient, bed_id):
+        path = tmp_path / f"{bed_id}.bed"
+        path.write_text("chr1\t10\t20\n")
+        return str(path)
+
+    monkeypatch.setattr(bedboss_module, "BedBaseAgent", lambda config: bedbase)
+    monkeypatch.setattr(bedboss_module, "BBClient", lambda: None)
+    monkeypatch.setattr(bedboss_module, "fetch_bed", fake_fetch_bed)
+    monkeypatch.setattr(bedboss_module, "run_all", fake_run_all)
+    monkeypatch.setattr(
+        bedboss_module,
+        "bedstat_batch",
+        lambda **kwargs: bedbase.batches.append(kwargs["bed_digests"]),
+    )
+    monkeypatch.setattr(bedboss_module, "REPROCESS_STATS_BATCH_SIZE", 2)
+    return bedbase
+
+
+class TestReprocessAll:
+    def test_paging(self, tmp_path, bedbase):
+        reprocess_all(
+            bedbase_config="config.yaml",
+            output_folder=str(tmp_path),
+            limit=0,
+            no_fail=True,
+            page_size=3,
+        )
+        # beds are requested page by page, and offsets skip beds that stay
+        # unprocessed (failed or queued): every bed is processed once
+        assert len(bedbase.offsets) > len(BEDS) // 3
+        assert bedbase.offsets == sorted(bedbase.offsets)
+        assert bedbase.processed == BEDS
+        assert bedbase.unprocessed == sorted(FAILED)
+        # statistics of every page are calculated in batches
+        assert [bed for batch in bedbase.batches for bed in batch] == BEDS
+        assert max(len(batch) for batch in bedbase.batches) == 2
+
+        checkpoint = Checkpoint(str(tmp_path / "reprocess_checkpoint.jsonl"))
+        assert sorted(record["id"] for record in checkpoint.failed) == sorted(FAILED)
+
+    def test_resume(self, tmp_path, bedbase):
+        reprocess_all(
+            bedbase_config="config.yaml",
+            output_folder=str(tmp_path),
+            limit=4,
+            no_fail=True,
+            page_size=3,
+        )
+        assert bedbase.processed == BEDS[:4]
+
+        # beds in the checkpoint (also failed) are skipped in the next run
+        reprocess_all(
+            bedbase_config="config.yaml",
+            output_folder=str(tmp_path),
+            limit=0,
+            no_fail=True,
+            page_size=3,
+        )
+        assert bedbase.processed == BEDS
+
+        # failed beds are processed again with retry_failed
+        bedbase.processed = []
+        reprocess_all(
+            bedbase_config="config.yaml",
+            output_folder=str(tmp_path),
+            limit=0,
+            no_fail=True,
+            page_size=3,
+            retry_failed=True,
+        )
+        assert bedbase.processed == sorted(FAILED)
+
+    def test_no_fail(self, tmp_path, bedbase):
+        # failed beds don't stop processing by default
+        reprocess_all(
+            bedbase_config="config.yaml", output_folder=str(tmp_path), limit=4
+        )
+        assert bedbase.processed == BEDS[:4]
+
+        with pytest.raises(BedBossException, match="bed7"):
+            reprocess_all(
+                bedbase_config="config.yaml",
+                output_folder=str(tmp_path),
+                limit=0,
+                no_fail=False,
+            )
+        assert bedbase.processed == BEDS[:8]
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+from bedboss.const import STAGE_VERSIONS
+from bedboss.stage_cache import StageCache, file_digest, plot_files, stage_cache_key
+
+
+def _write(path, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(str(tmp_path / "cache"))
+
+
+class TestStageCache:
+    def test_restore_in_other_folder(self, tmp_path, cache):
+        outfolder = str(tmp_path / "run1")
+        _write(os.path.join(outfolder, "output", "plots", "a_plot.png"), "png")
+        result = {
+            "mean_region_width": np.float64(10.5),
+            "plot": {"name": "plot", "thumbnail_path": "output/plots/a_plot.png"},
+        }
+        key = stage_cache_key("digest", "bedstat", params={"genome": "hg38"})
+        cache.put(key, result, outfolder, files=plot_files(result))
+
+        other_outfolder = str(tmp_path / "run2")
+        assert cache.get(key, other_outfolder) == {
+            "mean_region_width": 10.5,
+            "plot": {"name": "plot", "thumbnail_path": "output/plots/a_plot.png"},
+        }
+        with open(os.path.join(other_outfolder, "output", "plots", "a_plot.png")) as f:
+            assert f.read() == "png"
+
+    def test_key(self, monkeypatch):
+        key = stage_cache_key("digest", "bedstat", params={"genome": "hg38"})
+        assert key != stage_cache_key("digest", "bedstat", params={"genome": "mm10"})
+        assert key != stage_cache_key("other", "bedstat", params={"genome": "hg38"})
+        monkeypatch.setitem(STAGE_VERSIONS, "bedstat", STAGE_VERSIONS["bedstat"] + 1)
+        assert key != stage_cache_key("digest", "bedstat", params={"genome": "hg38"})
+
+    def test_input_file_digest(self, tmp_path):
+        # files with the same name, but different content
+        _write(str(tmp_path / "a" / "genome.chrom.sizes"), "chr1\t100\n")
+        _write(str(tmp_path / "b" / "genome.chrom.sizes"), "chr1\t200\n")
+        digest_a = file_digest(str(tmp_path / "a" / "genome.chrom.sizes"))
+        digest_b = file_digest(str(tmp_path / "b" / "genome.chrom.sizes"))
+        assert digest_a != digest_b
+        assert stage_cache_key(
+            "digest", "bigbed", params={"chrom_sizes": digest_a}
+        ) != stage_cache_key("digest", "bigbed", params={"chrom_sizes": digest_b})
+        assert file_digest(None) is None
+        assert file_digest(str(tmp_path / "missing")) is None
+
+    def test_miss(self, tmp_path, cache):
+        key = stage_cache_key("digest", "bedstat")
+        assert cache.get(key, str(tmp_path)) is None
+        # result that can't be serialized is not stored
+        cache.put(key, {"value": object()}, str(tmp_path))
+        assert cache.get(key, str(tmp_path)) is None
+
+    def test_file_outside_of_outfolder(self, tmp_path, cache):
+        _write(str(tmp_path / "outside.txt"), "x")
+        key = stage_cache_key("digest", "bigbed")
+        cache.put(
+            key, "x", str(tmp_path / "run"), files=[str(tmp_path / "outside.txt")]
+        )
+        assert cache.get(key, str(tmp_path / "run")) is None
+
+    def test_lru_eviction(self, tmp_path):
+        cache = StageCache(str(tmp_path / "cache"), max_size=2500)
+        outfolder = str(tmp_path / "run")
+        keys = []
+        for index in range(3):
+            _write(os.path.join(outfolder, f"file{index}"), "x" * 1000)
+            keys.append(stage_cache_key(f"digest{index}", "bigbed"))
+            cache.put(keys[-1], f"file{index}", outfolder, files=[f"file{index}"])
+            # entries are used in order: 0, 2, 1 (1 is the most recently used)
+            os.utime(
+                os.path.join(cache._entry_folder(keys[-1]), "result.json"),
+                (index, [0, 2, 1][index]),
+            )
+
+        assert cache.evict() == 1
+        assert cache.get(keys[0], outfolder) is None
+        assert cache.get(keys[1], outfolder) == "file1"
+        assert cache.get(keys[2], outfolder) == "file2"
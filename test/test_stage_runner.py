@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from bedboss.exceptions import BedBossException
+from bedboss.stage_runner import Stage, run_stages
+
+
+def _sleep_and_return(value, seconds=0.2):
+    time.sleep(seconds)
+    return value
+
+
+def _fail():
+    raise ValueError("stage failed")
+
+
+def test_independent_stages_run_concurrently():
+    stages = [
+        Stage(name="a", func=_sleep_and_return, kwargs=dict(value=1)),
+        Stage(name="b", func=_sleep_and_return, kwargs=dict(value=2)),
+        Stage(name="c", func=_sleep_and_return, kwargs=dict(value=3)),
+    ]
+    start = time.time()
+    results, timings = run_stages(stages)
+
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert set(timings) == {"a", "b", "c"}
+    assert time.time() - start < 0.5
+
+
+def test_dependencies_are_respected():
+    stages = [
+        Stage(
+            name="second",
+            func=_sleep_and_return,
+            kwargs=dict(value=2),
+            depends_on=("first",),
+        ),
+        Stage(name="first", func=_sleep_and_return, kwargs=dict(value=1)),
+    ]
+    _, timings = run_stages(stages)
+
+    assert timings["second"].start >= timings["first"].end
+
+
+def test_failed_stage_raises():
+    with pytest.raises(ValueError):
+        run_stages([Stage(name="fail", func=_fail)])
+
+
+def test_unknown_dependency():
+    with pytest.raises(BedBossException):
+        run_stages([Stage(name="a", func=_fail, depends_on=("missing",))])
+
+
+def test_circular_dependency():
+    stages = [
+        Stage(name="a", func=_fail, depends_on=("b",)),
+        Stage(name="b", func=_fail, depends_on=("a",)),
+    ]
+    with pytest.raises(BedBossException):
+        run_stages(stages)
+
+
+def test_no_stages():
+    assert run_stages([]) == ({}, {})
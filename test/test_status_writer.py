@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import Integer, String, create_engine, func, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from bedboss.bbuploader.status_writer import StatusWriter
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class SampleStatus(Base):
+    __tablename__ = "sample_status"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    status: Mapped[str] = mapped_column(String)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'status.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _committed_count(engine) -> int:
+    with Session(engine) as session:
+        return session.scalar(select(func.count()).select_from(SampleStatus))
+
+
+def test_commits_in_batches(engine):
+    with Session(engine) as session:
+        writer = StatusWriter(session, batch_size=3, flush_interval=3600)
+        writer.add(SampleStatus(status="PROCESSING"))
+        writer.add(SampleStatus(status="PROCESSING"))
+        assert _committed_count(engine) == 0
+        assert writer.pending == 2
+
+        writer.add(SampleStatus(status="PROCESSING"))
+        assert _committed_count(engine) == 3
+        assert writer.pending == 0
+
+
+def test_commits_after_interval(engine):
+    with Session(engine) as session:
+        writer = StatusWriter(session, batch_size=100, flush_interval=0)
+        writer.add(SampleStatus(status="PROCESSING"))
+        assert _committed_count(engine) == 1
+
+
+def test_flushes_on_exit_and_error(engine):
+    with Session(engine) as session:
+        with pytest.raises(ValueError):
+            with StatusWriter(session, batch_size=100, flush_interval=3600) as writer:
+                writer.add(SampleStatus(status="PROCESSING"))
+                raise ValueError("processing failed")
+    assert _committed_count(engine) == 1
+
+
+def test_updates_are_committed(engine):
+    with Session(engine) as session:
+        with StatusWriter(session, batch_size=100, flush_interval=3600) as writer:
+            sample = SampleStatus(status="PROCESSING")
+            writer.add(sample)
+            writer.flush()
+            sample.status = "SUCCESS"
+            writer.mark()
+
+    with Session(engine) as session:
+        assert session.scalar(select(SampleStatus.status)) == "SUCCESS"